@@ -0,0 +1,219 @@
+from __future__ import annotations
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from bitboard import Bits, position_index
+from solver import reachable_positions
+from tictactoe import TicTacToe
+from tictactoe_ai import AIS, create_ai
+
+"""This module contains a benchmark which times every Tic Tac Toe AI on
+every position that can occur in a game, and compares the results with
+those of an earlier run, as well as code for running it from the
+command line.
+
+Classes:
+- Benchmark
+"""
+
+class Benchmark:
+    """A benchmark of the AIs over a set of positions, by default every
+    position that can occur in a game where the game isn't over.
+
+    Each AI is created afresh for each position, with empty caches, and
+    given a random number stream seeded the same way before each move
+    (see TicTacToeAI.set_rng), so that everything but the timings is
+    the same from run to run. Each find_move is timed repeat times and
+    the fastest is kept. The search statistics (see
+    TicTacToeAI.instrument) and peak memory are measured in a separate
+    run, since counting the search and tracing memory slow the AIs
+    down.
+
+    For each move the benchmark records the time taken, the search
+    statistics and the peak memory allocated, along with totals for
+    each AI.
+
+    Public Methods:
+    - run() -> None
+    - get_results() -> Dict[str, Any]
+    - save(path: str) -> None
+    - compare(results: Dict[str, Any], baseline: Dict[str, Any],
+      tolerance: float = 0.25) -> List[str]
+    """
+
+    def __init__(self, names: List[str], repeat: int = 1, seed: int = 0,
+                 positions: Optional[List[Tuple[Bits, str]]] = None
+                 ) -> None:
+        """Initialise a benchmark of the named AIs."""
+        for name in names:
+            if name not in AIS:
+                raise ValueError(f"Invalid AI {name} specified.")
+        if repeat < 1:
+            raise ValueError("Moves must be timed at least once.")
+        self._names = list(names)
+        self._repeat = repeat
+        self._seed = seed
+        if positions == None:
+            positions = reachable_positions()
+        self._positions = positions
+        self._results = {}
+
+    def run(self) -> None:
+        """Benchmark every AI on every position."""
+        self._results = {"positions": len(self._positions),
+                         "repeat": self._repeat,
+                         "ais": {name: self._run_ai(name)
+                                 for name in self._names}}
+
+    def get_results(self) -> Dict[str, Any]:
+        """Return the results of the last run."""
+        return self._results
+
+    def save(self, path: str) -> None:
+        """Save the results of the last run to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self._results, f, indent=1)
+
+    @staticmethod
+    def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+                tolerance: float = 0.25) -> List[str]:
+        """Return a description of every way the results are worse
+        than the baseline: an AI taking more than tolerance longer in
+        total, or using more than tolerance more peak memory, or
+        searching more nodes at all."""
+        regressions = []
+        for name, ai in results["ais"].items():
+            if name not in baseline["ais"]:
+                continue
+            new = ai["summary"]
+            old = baseline["ais"][name]["summary"]
+            if new["time"] > old["time"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: time {old['time']:.4f}s -> "
+                    + f"{new['time']:.4f}s "
+                    + f"({new['time']/max(old['time'], 1e-9):.2f}x)")
+            if new["nodes"] > old["nodes"]:
+                regressions.append(f"{name}: nodes {old['nodes']} -> "
+                                   + f"{new['nodes']}")
+            if new["peak_memory"] > old["peak_memory"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: peak memory {old['peak_memory']} -> "
+                    + f"{new['peak_memory']} bytes")
+        return regressions
+
+    def _run_ai(self, name: str) -> Dict[str, Any]:
+        """Benchmark the named AI on every position and return the
+        results for each position along with their totals."""
+        game = TicTacToe()
+        # Find one move first so that anything loaded once for all AIs,
+        # like the solution table, isn't counted against one position
+        self._set_position(game, *self._positions[0])
+        create_ai(name, game, {}).find_move()
+        records = []
+        for bits, turn in self._positions:
+            self._set_position(game, bits, turn)
+            record = {"index": position_index(bits)}
+            record["time"] = min(self._time_move(name, game)
+                                 for i in range(self._repeat))
+            record.update(self._measure_move(name, game))
+            records.append(record)
+        times = sorted(record["time"] for record in records)
+        summary = {"time": sum(times),
+                   "median_time": times[len(times) // 2],
+                   "max_time": times[-1]}
+        for key in ["nodes", "cutoffs", "hits", "misses", "inserts"]:
+            summary[key] = sum(record[key] for record in records)
+        for key in ["max_depth", "peak_memory"]:
+            summary[key] = max(record[key] for record in records)
+        return {"summary": summary, "positions": records}
+
+    def _time_move(self, name: str, game: TicTacToe) -> float:
+        """Return the time a new AI takes to find a move."""
+        ai = create_ai(name, game, {})
+        ai.set_rng(random.Random(self._seed))
+        # As with timeit, don't let the garbage collector run during
+        # the move, so that it isn't charged for garbage made before
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            ai.find_move()
+            return time.perf_counter() - start
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _measure_move(self, name: str, game: TicTacToe) -> Dict[str, int]:
+        """Return the search statistics of a new AI finding a move,
+        along with the peak memory, in bytes, allocated meanwhile."""
+        ai = create_ai(name, game, {})
+        ai.instrument()
+        ai.set_rng(random.Random(self._seed))
+        tracemalloc.start()
+        try:
+            ai.find_move()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        stats = ai.get_stats()[-1]
+        del stats["time"]
+        stats["peak_memory"] = peak
+        return stats
+
+    def _set_position(self, game: TicTacToe, bits: Bits,
+                      turn: str) -> None:
+        """Set up the position on the game's board."""
+        for i in range(9):
+            piece = None
+            if bits[0] >> i & 1:
+                piece = "O"
+            elif bits[1] >> i & 1:
+                piece = "X"
+            game.set_square(i // 3, i % 3, piece)
+        game.set_turn(turn)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Benchmark the AIs on every position.")
+    parser.add_argument("-ais", nargs="+", default=list(AIS),
+                        help="AIs to benchmark")
+    parser.add_argument("-repeat", type=int, default=1,
+                        help="times to time each move, keeping the fastest")
+    parser.add_argument("-seed", type=int, default=0,
+                        help="seed for the AIs which play randomly")
+    parser.add_argument("-output", default="benchmark.json",
+                        help="where to save the results")
+    parser.add_argument("-baseline", default=None,
+                        help="results of an earlier run to compare with")
+    parser.add_argument("-tolerance", type=float, default=0.25,
+                        help="fraction of extra time or memory allowed")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.ais, args.repeat, args.seed)
+    benchmark.run()
+    benchmark.save(args.output)
+    results = benchmark.get_results()
+    print(f"{'AI':>15} {'time (s)':>9} {'nodes':>9} {'hits':>8} "
+          + f"{'misses':>8} {'peak (KB)':>9}")
+    for name, ai in results["ais"].items():
+        summary = ai["summary"]
+        print(f"{name:>15} {summary['time']:9.3f} {summary['nodes']:9} "
+              + f"{summary['hits']:8} {summary['misses']:8} "
+              + f"{summary['peak_memory']/1024:9.1f}")
+    print(f"Results saved to {args.output}.")
+    if args.baseline != None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = Benchmark.compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}.")
@@ -0,0 +1,265 @@
+from __future__ import annotations
+from array import array
+from typing import List, NamedTuple, Optional, Tuple
+
+"""This module contains a bitboard representation of the Tic Tac Toe
+board which AIs can use instead of the 3x3 matrix held by TicTacToe.
+
+A bitboard is a pair of 9-bit integers (O's pieces, X's pieces). The
+(x,y) square is stored in bit 3*x + y, so iterating over the bits in
+ascending order visits the squares in the same order as the nested
+x, y loops used throughout the AIs.
+
+A Snapshot is an immutable, hashable position: a bitboard along with
+whose turn it is, which TicTacToe hands out so that AIs and caches can
+use the position directly without copying the board.
+
+Positions can also be numbered by a base 3 index, where the i-th digit
+is 0 for an empty square, 1 for O and 2 for X in bit i. Positions that
+are rotations or mirrors of each other share a canonical index.
+
+Functions:
+- position_index(bits: Bits) -> int
+- canonical_index(bits: Bits) -> int
+- canonical_transform(bits: Bits) -> int
+
+Classes:
+- Snapshot
+- BitBoard
+"""
+
+# Type aliases
+Piece = Optional[str]
+Board = List[List[Piece]]
+Bits = Tuple[int, int]
+
+FULL = 0b111111111 # Mask with every square occupied
+
+# The 8 lines that win the game, in the order find_winner checks them
+LINES = (0b000000111, 0b000111000, 0b111000000, # Vertical lines
+         0b001001001, 0b010010010, 0b100100100, # Horizontal lines
+         0b100010001, 0b001010100)              # Diagonals
+
+# The (x,y) square held by each bit
+SQUARES = tuple((i // 3, i % 3) for i in range(9))
+
+# The lines through each square, so that a win can be checked for
+# along just the lines through the last move
+LINES_THROUGH = tuple(tuple(line for line in LINES if line >> i & 1)
+                      for i in range(9))
+
+# The bits set in every 9-bit mask, in ascending order
+BITS_OF = tuple(tuple(i for i in range(9) if mask >> i & 1)
+                for mask in range(FULL + 1))
+
+def _transform_table(square_map) -> Tuple[int, ...]:
+    """Return a lookup table mapping every 9-bit mask to its image
+    under the transformation which sends the (x,y) square to
+    square_map(x, y)."""
+    table = []
+    for mask in range(FULL + 1):
+        image = 0
+        for i, (x, y) in enumerate(SQUARES):
+            if mask >> i & 1:
+                new_x, new_y = square_map(x, y)
+                image |= 1 << (3*new_x + new_y)
+        table.append(image)
+    return tuple(table)
+
+# Lookup tables for the symmetries of the board. ROTATE turns the board
+# 90 degrees clockwise and MIRROR_H mirrors it across the y axis
+ROTATE = _transform_table(lambda x, y: (2 - y, x))
+MIRROR_H = _transform_table(lambda x, y: (2 - x, y))
+
+# The 8 symmetries of the board (the dihedral group D4): the identity,
+# the three clockwise rotations and the mirror image of each of them
+TRANSFORMS = (tuple(range(FULL + 1)), ROTATE)
+for i in range(2):
+    TRANSFORMS += (tuple(ROTATE[mask] for mask in TRANSFORMS[-1]),)
+TRANSFORMS += tuple(tuple(MIRROR_H[t[mask]] for mask in range(FULL + 1))
+                    for t in TRANSFORMS)
+
+# INVERSE[t] is the index of the transform which undoes TRANSFORMS[t]
+INVERSE = tuple(next(j for j, u in enumerate(TRANSFORMS)
+                     if all(u[t[1 << i]] == 1 << i for i in range(9)))
+                for t in TRANSFORMS)
+
+# _TERNARY[mask] is the base 3 index of the position whose only pieces
+# are O's on mask
+_TERNARY = tuple(sum(3**i for i in range(9) if mask >> i & 1)
+                 for mask in range(FULL + 1))
+
+def position_index(bits: Bits) -> int:
+    """Return the base 3 index of a bitboard."""
+    return _TERNARY[bits[0]] + 2*_TERNARY[bits[1]]
+
+# Canonical index of every base 3 index and the index of the transform
+# which takes the position there, built the first time they are needed
+_canonical = None
+_canonical_transform = None
+
+def _build_canonical() -> None:
+    """Fill in the canonical index and transform of every position."""
+    global _canonical, _canonical_transform
+    _canonical = array("H", bytes(2 * 3**9))
+    _canonical_transform = array("B", bytes(3**9))
+    for o in range(FULL + 1):
+        rest = FULL & ~o
+        # Loop over every subset x of the squares O doesn't occupy
+        x = rest
+        while True:
+            index = _TERNARY[o] + 2*_TERNARY[x]
+            _canonical[index], _canonical_transform[index] = min(
+                (_TERNARY[t[o]] + 2*_TERNARY[t[x]], i)
+                for i, t in enumerate(TRANSFORMS))
+            if x == 0:
+                break
+            x = (x - 1) & rest
+
+def canonical_index(bits: Bits) -> int:
+    """Return the smallest base 3 index among the rotations and
+    mirrors of a bitboard."""
+    if _canonical == None:
+        _build_canonical()
+    return _canonical[_TERNARY[bits[0]] + 2*_TERNARY[bits[1]]]
+
+def canonical_transform(bits: Bits) -> int:
+    """Return the index in TRANSFORMS of a transform which takes the
+    bitboard to its canonical index."""
+    if _canonical == None:
+        _build_canonical()
+    return _canonical_transform[_TERNARY[bits[0]] + 2*_TERNARY[bits[1]]]
+
+# The empty squares of every mask of empty squares, as (x,y) tuples
+_EMPTY_SQUARES = tuple(tuple(SQUARES[i] for i in BITS_OF[mask])
+                       for mask in range(FULL + 1))
+# Whether a player's pieces, as a 9-bit mask, contain a line
+_HAS_LINE = tuple(any(mask & line == line for line in LINES)
+                  for mask in range(FULL + 1))
+
+class Snapshot(NamedTuple):
+    """An immutable, hashable snapshot of a position: the bitboard and
+    whose turn it is ("O" or "X"). Snapshots of the same position are
+    equal, so they can be used as keys directly.
+
+    Public Methods:
+    - get_empty() -> Tuple[Tuple[int, int], ...]
+    - get_winner() -> Optional[str]
+    - is_over() -> bool
+    - play(x: int, y: int) -> Snapshot
+    """
+
+    pieces: Bits
+    turn: str
+
+    def get_empty(self) -> Tuple[Tuple[int, int], ...]:
+        """Return the empty squares in the order legal_moves lists
+        them."""
+        return _EMPTY_SQUARES[FULL & ~(self.pieces[0] | self.pieces[1])]
+
+    def get_winner(self) -> Optional[str]:
+        """Return the player with a line, or None if neither has
+        one."""
+        if _HAS_LINE[self.pieces[0]]:
+            return "O"
+        elif _HAS_LINE[self.pieces[1]]:
+            return "X"
+        return None
+
+    def is_over(self) -> bool:
+        """Return whether the game is over, i.e. it has been won or
+        the board is full."""
+        return (self.pieces[0] | self.pieces[1] == FULL
+                or _HAS_LINE[self.pieces[0]] or _HAS_LINE[self.pieces[1]])
+
+    def play(self, x: int, y: int) -> Snapshot:
+        """Return the snapshot after the player whose turn it is moves
+        on the (x,y) square, which must be empty."""
+        o, x_bits = self.pieces
+        bit = 1 << (3*x + y) if 0 <= x <= 2 and 0 <= y <= 2 else 0
+        if not bit or (o | x_bits) & bit:
+            raise ValueError("Invalid move specified.")
+        if self.turn == "O":
+            return Snapshot((o | bit, x_bits), "X")
+        return Snapshot((o, x_bits | bit), "O")
+
+class BitBoard:
+    """Board operations on bitboards.
+
+    The methods mirror the board methods of TicTacToe so that an AI
+    can use either representation through the same calls.
+
+    Public Methods:
+    - from_board(board: Board) -> Bits
+    - to_board(bits: Bits) -> Board
+    - get_square(bits: Bits, x: int, y: int) -> Piece
+    - make_move(bits: Bits, x: int, y: int, turn: str) -> Bits
+    - find_winner(bits: Bits) -> Optional[str]
+    - board_full(bits: Bits) -> bool
+    - legal_moves(bits: Bits) -> List[Tuple[int, int]]
+    - symmetries(bits: Bits) -> List[Bits]
+    """
+
+    def from_board(self, board: Board) -> Bits:
+        """Return the bitboard for the specified 3x3 board."""
+        o = 0
+        x = 0
+        for i, (i_x, i_y) in enumerate(SQUARES):
+            if board[i_x][i_y] == "O":
+                o |= 1 << i
+            elif board[i_x][i_y] == "X":
+                x |= 1 << i
+        return (o, x)
+
+    def to_board(self, bits: Bits) -> Board:
+        """Return the 3x3 board for the specified bitboard."""
+        return [[self.get_square(bits, x, y) for y in range(3)]
+                for x in range(3)]
+
+    def get_square(self, bits: Bits, x: int, y: int) -> Piece:
+        """Return the piece in the (x,y) square."""
+        bit = 1 << (3*x + y)
+        if bits[0] & bit:
+            return "O"
+        elif bits[1] & bit:
+            return "X"
+        return None
+
+    def make_move(self, bits: Bits, x: int, y: int, turn: str) -> Bits:
+        """If the specified move is valid on the specified bitboard,
+        return the bitboard after that move is made; otherwise return
+        an empty tuple."""
+        if not(0 <= x <= 2 and 0 <= y <= 2): # Invalid square specified
+            return ()
+        bit = 1 << (3*x + y)
+        o, x_bits = bits
+        if (o | x_bits) & bit: # Invalid move since square already taken
+            return ()
+        if turn == "O":
+            return (o | bit, x_bits)
+        return (o, x_bits | bit)
+
+    def find_winner(self, bits: Bits) -> Optional[str]:
+        """If there is a winner return one; otherwise, return None."""
+        o, x = bits
+        for line in LINES:
+            if o & line == line:
+                return "O"
+            if x & line == line:
+                return "X"
+        return None
+
+    def board_full(self, bits: Bits) -> bool:
+        """Return whether or not the bitboard is full."""
+        return bits[0] | bits[1] == FULL
+
+    def legal_moves(self, bits: Bits) -> List[Tuple[int, int]]:
+        """Return the empty squares of the bitboard in row-major
+        order."""
+        empty = FULL & ~(bits[0] | bits[1])
+        return [SQUARES[i] for i in range(9) if empty >> i & 1]
+
+    def symmetries(self, bits: Bits) -> List[Bits]:
+        """Return the 8 rotations and mirrors of the bitboard."""
+        o, x = bits
+        return [(t[o], t[x]) for t in TRANSFORMS]
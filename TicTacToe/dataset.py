@@ -0,0 +1,168 @@
+from __future__ import annotations
+import struct
+import argparse
+from typing import Iterator, Tuple
+
+from bitboard import BitBoard, Bits
+from solver import POSITIONS, SolutionTable, side_to_move
+from tictactoe_ai import other_factors
+
+"""This module contains an exporter which labels every reachable Tic
+Tac Toe position for training models on, as well as code for exporting
+the labels from the command line.
+
+Classes:
+- PositionDataset
+"""
+
+MAGIC = b"TTTD"
+# Version 2 counts the diagonals in other_factors, which version 1
+# never did
+VERSION = 2
+HEADER = struct.Struct("<4sBxxxI") # Magic, version and record count
+# Position index, mask of optimal moves, minimax value, side to move
+# (0 for O, 1 for X) and the other factors score
+RECORD = struct.Struct("<HHbBBx")
+
+# Type alias for a labelled position: the bitboard, side to move,
+# minimax value, mask of optimal moves and other factors score
+Label = Tuple[Bits, str, int, int, int]
+
+def _bits_of_index(index: int) -> Bits:
+    """Return the bitboard with the specified base 3 index."""
+    o = 0
+    x = 0
+    for i in range(9):
+        index, digit = divmod(index, 3)
+        if digit == 1:
+            o |= 1 << i
+        elif digit == 2:
+            x |= 1 << i
+    return (o, x)
+
+class PositionDataset:
+    """The labels of every position that can occur in a game, ordered
+    by base 3 index, held as fixed-size binary records.
+
+    Each position is labelled with the side to move, its minimax value
+    for the side to move (1 for a win, 0 for a draw and -1 for a loss),
+    the mask of every optimal move (see bitboard.py for the square
+    ordering), which is 0 when the game is over, and other_factors (see
+    tictactoe_ai.py) scored for the player who made the last move,
+    which is how UltimateAI rates moving into the position.
+
+    The values and optimal moves all come from one solve of the game
+    tree (see solver.py), rather than a search per position.
+
+    Public Methods:
+    - build() -> PositionDataset
+    - load(path: str) -> PositionDataset
+    - save(path: str) -> None
+    - save_npz(path: str) -> None
+    - __getitem__(i: int) -> Label
+    - __iter__() -> Iterator[Label]
+    - __len__() -> int
+    """
+
+    def __init__(self, records: bytes) -> None:
+        """Initialise a dataset from its packed records."""
+        if len(records) % RECORD.size:
+            raise ValueError("Records are not a whole number of records.")
+        self._records = bytes(records)
+
+    @classmethod
+    def build(cls) -> PositionDataset:
+        """Label every position reachable from the empty board."""
+        solution = SolutionTable.solve()
+        rules = BitBoard()
+        records = bytearray()
+        for index in range(POSITIONS):
+            bits = _bits_of_index(index)
+            turn = side_to_move(bits)
+            entry = solution.lookup(bits, turn)
+            if entry == None: # Position cannot occur in a game
+                continue
+            value, best = entry
+            if rules.find_winner(bits) != None:
+                best = 0 # Game is already over
+            mover = "X" if turn == "O" else "O"
+            records += RECORD.pack(index, best, value, turn == "X",
+                                   other_factors(bits, mover))
+        return cls(records)
+
+    @classmethod
+    def load(cls, path: str) -> PositionDataset:
+        """Load a dataset that was saved to the specified path."""
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"{path} is not a position dataset.")
+            magic, version, count = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a position dataset.")
+            if version != VERSION:
+                raise ValueError(f"{path} has an unsupported version.")
+            records = f.read()
+        if len(records) != count * RECORD.size:
+            raise ValueError(f"{path} is truncated.")
+        return cls(records)
+
+    def save(self, path: str) -> None:
+        """Save the dataset to the specified path as a header followed
+        by one RECORD per position."""
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self)))
+            f.write(self._records)
+
+    def save_npz(self, path: str) -> None:
+        """Save the dataset as a NumPy .npz file of arrays with one row
+        per position: board (9 squares, 1 for O, -1 for X and 0 if
+        empty), side (1 for O, -1 for X), value, optimal (9 booleans),
+        other_factors and index (the base 3 index)."""
+        import numpy as np # Only needed for this format
+        fields = np.frombuffer(self._records, dtype=np.dtype(
+            [("index", "<u2"), ("best", "<u2"), ("value", "i1"),
+             ("side", "u1"), ("other_factors", "u1"), ("pad", "u1")]))
+        squares = np.arange(9)
+        digits = fields["index"][:, None] // 3**squares % 3
+        board = np.where(digits == 2, -1, digits).astype(np.int8)
+        np.savez_compressed(
+            path, board=board,
+            side=np.where(fields["side"] == 1, -1, 1).astype(np.int8),
+            value=fields["value"],
+            optimal=(fields["best"][:, None] >> squares & 1).astype(bool),
+            other_factors=fields["other_factors"].astype(np.int8),
+            index=fields["index"])
+
+    def __getitem__(self, i: int) -> Label:
+        """Return the ith labelled position."""
+        if not 0 <= i < len(self):
+            raise IndexError("Position index out of range.")
+        index, best, value, side, factors = RECORD.unpack_from(
+            self._records, i * RECORD.size)
+        return (_bits_of_index(index), "X" if side else "O", value, best,
+                factors)
+
+    def __iter__(self) -> Iterator[Label]:
+        """Return an iterator over the labelled positions."""
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        """Return the number of positions in the dataset."""
+        return len(self._records) // RECORD.size
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Label every reachable Tic Tac Toe position.")
+    parser.add_argument("-o", "--output", default="positions.npz",
+                        help="where to save the dataset; a .npz file "
+                             + "needs NumPy, anything else is saved as "
+                             + "fixed-size binary records")
+    args = parser.parse_args()
+    dataset = PositionDataset.build()
+    if args.output.endswith(".npz"):
+        dataset.save_npz(args.output)
+    else:
+        dataset.save(args.output)
+    print(f"Labelled {len(dataset)} positions and saved them to "
+          + f"{args.output}.")
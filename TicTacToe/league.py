@@ -0,0 +1,200 @@
+from __future__ import annotations
+import json
+import math
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from bitboard import Snapshot
+from tictactoe import TicTacToe
+from tictactoe_ai import AIS, PerfectAI, SolvedAI, TicTacToeAI, create_ai
+
+"""This module contains a round-robin league between the Tic Tac Toe
+AIs which rates them from their results, as well as code for running
+a league from the command line.
+
+Classes:
+- League
+"""
+
+# Caches kept by each worker process between pairings: the tables of
+# the caching AIs and the moves found by the deterministic AIs
+_tables = {}
+_moves = {}
+
+# AIs which search without a cache but find exactly the moves stored in
+# the solution table, so the league looks their moves up instead
+_SOLVED = {"perfect", "alpha-beta"}
+
+# AIs only in the league when asked for, so that the default league
+# finishes in seconds: MCTS takes tens of milliseconds per move, and the
+# learned AI trains itself first if no value table has been saved
+_SLOW = {"mcts", "learned"}
+DEFAULT_AIS = [name for name in AIS if name not in _SLOW]
+
+class _RememberingAI(TicTacToeAI):
+    """A wrapper for a deterministic AI which remembers the move it
+    found for every position, so that later games in the same process
+    never search the same position twice."""
+
+    SNAPSHOTS = True # Moves are remembered by snapshot
+
+    def __init__(self, game: TicTacToe, ai: TicTacToeAI,
+                 moves: Dict[Snapshot, Tuple[int, int]]) -> None:
+        super().__init__(game)
+        self._ai = ai
+        self._moves = moves
+
+    def find_move(self) -> Option[Tuple[int, int]]:
+        key = self._game.get_snapshot()
+        if key not in self._moves:
+            self._moves[key] = self._ai.find_move()
+        return self._moves[key]
+
+def _play_pairing(ai_O: str, ai_X: str, games: int,
+                  seed: Optional[int]) -> Tuple[int, int, int]:
+    """Play games between the two named AIs and return the number of O
+    wins, X wins and draws."""
+    game = TicTacToe()
+    for piece, name in [("O", ai_O), ("X", ai_X)]:
+        if name in _SOLVED:
+            ai = SolvedAI(game)
+        else:
+            ai = create_ai(name, game, _tables)
+        # PerfectAI and its subclasses always play the same move in the
+        # same position
+        if isinstance(ai, PerfectAI):
+            ai = _RememberingAI(game, ai, _moves.setdefault(name, {}))
+        game.load(ai, piece)
+    return game._play_shard(0, games, seed)
+
+class League:
+    """A round-robin league in which every AI plays every other AI
+    both as O and as X.
+
+    Within each process, the caches of the caching AIs and the moves of
+    the deterministic AIs are kept from one pairing to the next.
+
+    The AIs are rated with the Bradley-Terry model, counting a draw as
+    half a win for each AI, and the ratings are given on the Elo scale
+    with an average of 1500. Every pair of AIs is credited with one
+    extra drawn game so that the ratings stay finite when an AI never
+    loses.
+
+    Public Methods:
+    - play(workers: int = 1, seed: Optional[int] = None) -> None
+    - get_results() -> Dict[str, Dict[str, Dict[str, int]]]
+    - get_ratings() -> Dict[str, float]
+    - save(path: str) -> None
+    """
+
+    def __init__(self, names: List[str], games: int) -> None:
+        """Initialise a league between the named AIs where each AI
+        plays the specified number of games against each other AI as
+        O and the same number as X."""
+        for name in names:
+            if name not in AIS:
+                raise ValueError(f"Invalid AI {name} specified.")
+        if len(names) < 2:
+            raise ValueError("A league needs at least two AIs.")
+        self._names = list(names)
+        self._games = games
+        self._pairings = [(o, x) for o in names for x in names if o != x]
+        self._counts = {} # Maps (O, X) to (O wins, X wins, draws)
+
+    def play(self, workers: int = 1, seed: Optional[int] = None) -> None:
+        """Play every pairing, spreading them between the specified
+        number of processes. If a seed is specified, each pairing is
+        played with a different seed derived from it."""
+        if seed == None:
+            seeds = [None] * len(self._pairings)
+        else:
+            master = random.Random(seed)
+            seeds = [master.getrandbits(64) for pairing in self._pairings]
+        args = ([o for o, x in self._pairings],
+                [x for o, x in self._pairings],
+                [self._games] * len(self._pairings), seeds)
+        if workers == 1:
+            results = list(map(_play_pairing, *args))
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(_play_pairing, *args))
+        self._counts = dict(zip(self._pairings, results))
+
+    def get_results(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Return the number of wins, draws and losses of every AI
+        against every other AI, playing as either piece."""
+        results = {a: {b: {"wins": 0, "draws": 0, "losses": 0}
+                       for b in self._names if b != a}
+                   for a in self._names}
+        for (o, x), (O_wins, X_wins, draws) in self._counts.items():
+            results[o][x]["wins"] += O_wins
+            results[o][x]["losses"] += X_wins
+            results[x][o]["wins"] += X_wins
+            results[x][o]["losses"] += O_wins
+            results[o][x]["draws"] += draws
+            results[x][o]["draws"] += draws
+        return results
+
+    def get_ratings(self) -> Dict[str, float]:
+        """Return the rating of every AI."""
+        results = self.get_results()
+        # Points scored by each AI and games played between each pair,
+        # including the extra drawn game
+        points = {a: sum(r["wins"] + (r["draws"] + 1)/2
+                         for r in results[a].values())
+                  for a in self._names}
+        games = {a: {b: sum(r.values()) + 1 for b, r in results[a].items()}
+                 for a in self._names}
+        # Fit the Bradley-Terry strengths with the MM algorithm
+        strength = {a: 1.0 for a in self._names}
+        for i in range(10000):
+            new = {a: points[a] / sum(n / (strength[a] + strength[b])
+                                      for b, n in games[a].items())
+                   for a in self._names}
+            mean = math.exp(sum(map(math.log, new.values())) / len(new))
+            new = {a: s / mean for a, s in new.items()}
+            converged = all(abs(new[a] - strength[a]) < 1e-12 * new[a]
+                            for a in self._names)
+            strength = new
+            if converged:
+                break
+        return {a: 1500 + 400*math.log10(s) for a, s in strength.items()}
+
+    def save(self, path: str) -> None:
+        """Save the results and ratings to a JSON file."""
+        pairings = [{"O": o, "X": x, "O_wins": O_wins, "X_wins": X_wins,
+                     "draws": draws}
+                    for (o, x), (O_wins, X_wins, draws)
+                    in self._counts.items()]
+        with open(path, "w") as f:
+            json.dump({"games": self._games,
+                       "pairings": pairings,
+                       "results": self.get_results(),
+                       "ratings": self.get_ratings()}, f, indent=2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Play a round-robin league between the AIs.")
+    parser.add_argument("-games", type=int, default=100,
+                        help="games per pairing and side")
+    parser.add_argument("-ais", nargs="+", default=DEFAULT_AIS,
+                        help="AIs to include in the league (by default "
+                             + "all but " + " and ".join(sorted(_SLOW))
+                             + ")")
+    parser.add_argument("-workers", type=int, default=1,
+                        help="number of processes to play the league with")
+    parser.add_argument("-seed", type=int, default=None,
+                        help="seed for a reproducible league")
+    parser.add_argument("-output", default="league.json",
+                        help="where to save the results")
+    args = parser.parse_args()
+
+    league = League(args.ais, args.games)
+    league.play(args.workers, args.seed)
+    league.save(args.output)
+    ratings = league.get_ratings()
+    for name in sorted(ratings, key=ratings.get, reverse=True):
+        print(f"{name:>15} {ratings[name]:7.1f}")
+    print(f"Results saved to {args.output}.")
@@ -0,0 +1,224 @@
+from __future__ import annotations
+import os
+import sys
+import time
+import argparse
+from array import array
+from typing import Dict, Optional
+try:
+    import numpy as np
+except ImportError: # Only needed for training
+    np = None
+
+from bitboard import Bits, FULL, LINES, position_index
+
+"""This module contains a trainer which learns the value of every Tic
+Tac Toe position by playing many games against itself at once using
+NumPy, the table of values it learns, which LearnedAI plays from, and
+code for training and saving a table from the command line.
+
+Classes:
+- ValueTable
+- SelfPlayTrainer
+
+Functions:
+- get_values(path: str = DEFAULT_PATH) -> ValueTable
+"""
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "values.bin")
+
+MAGIC = b"TTTV"
+VERSION = 1
+HEADER = 8 # Bytes before the first value, keeping the values aligned
+POSITIONS = 3**9 # One value per base 3 index
+
+# Games played in memory by get_values if no table has been saved
+DEFAULT_GAMES = 200000
+
+class ValueTable:
+    """The learned value of every position, as the expected result of
+    the game for the player who moved into it: 1 for a win, -1 for a
+    loss and 0 for a draw. A player picks their move by looking up the
+    position each legal move leads to and playing the most valuable.
+
+    The table is a fixed-layout binary file: an 8 byte header holding
+    MAGIC, the VERSION and three reserved zero bytes, followed by one
+    little-endian 32-bit float per position in base 3 index order (see
+    bitboard.py).
+
+    Public Methods:
+    - load(path: str) -> ValueTable
+    - save(path: str) -> None
+    - get(bits: Bits) -> float
+    """
+
+    def __init__(self, values: array) -> None:
+        """Initialise a table from an array of POSITIONS floats."""
+        if values.typecode != "f" or len(values) != POSITIONS:
+            raise ValueError("Table has the wrong number of values.")
+        self._values = values
+
+    @classmethod
+    def load(cls, path: str) -> ValueTable:
+        """Load the table saved at the specified path."""
+        with open(path, "rb") as f:
+            header = f.read(HEADER)
+            if len(header) != HEADER or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a value table.")
+            if header[len(MAGIC)] != VERSION:
+                raise ValueError(f"{path} has an unsupported version.")
+            values = array("f")
+            try:
+                values.fromfile(f, POSITIONS)
+            except EOFError:
+                raise ValueError(f"{path} is truncated.") from None
+        if sys.byteorder == "big":
+            values.byteswap()
+        return cls(values)
+
+    def save(self, path: str) -> None:
+        """Save the table to the specified path."""
+        values = array("f", self._values)
+        if sys.byteorder == "big":
+            values.byteswap()
+        header = MAGIC + bytes([VERSION])
+        with open(path, "wb") as f:
+            f.write(header + bytes(HEADER - len(header)))
+            values.tofile(f)
+
+    def get(self, bits: Bits) -> float:
+        """Return the value of the position for the player who made the
+        last move."""
+        return self._values[position_index(bits)]
+
+class SelfPlayTrainer:
+    """A trainer which learns a ValueTable by Monte Carlo self-play.
+
+    Each step plays a batch of games in lockstep, as LockstepSimulator
+    does (see simulator.py), with the games held as an array of base 3
+    indices. Both players move to the most valuable position by the
+    current values, except that with probability epsilon they explore a
+    random move instead. Once every game in the batch is over, the value
+    of each position reached moves towards the mean result of the games
+    it was reached in, by the learning rate per game it was reached in.
+
+    Public Methods:
+    - train(n: int) -> float
+    - get_values() -> ValueTable
+    """
+
+    def __init__(self, seed: Optional[int] = None, batch: int = 10000,
+                 learning_rate: float = 0.01, epsilon: float = 0.3) -> None:
+        """Initialise a trainer which plays batch games per step."""
+        if np == None:
+            raise ImportError("Training needs NumPy (pip install numpy).")
+        if batch < 1:
+            raise ValueError("Batch size must be positive.")
+        self._batch = batch
+        self._learning_rate = learning_rate
+        self._epsilon = epsilon
+        self._rng = np.random.default_rng(seed)
+        self._values = np.zeros(POSITIONS, dtype=np.float32)
+        # Whose pieces, as a bitboard, contain a line
+        self._winning = np.array([any(pieces & line == line
+                                      for line in LINES)
+                                  for pieces in range(FULL + 1)])
+        self._bits = 1 << np.arange(9, dtype=np.int16)
+        self._powers = 3 ** np.arange(9, dtype=np.int32)
+
+    def train(self, n: int) -> float:
+        """Play n games against itself, learning from each batch of
+        them, and return the number of games played per second."""
+        start = time.perf_counter()
+        for first in range(0, n, self._batch):
+            self._step(min(self._batch, n - first))
+        return n / (time.perf_counter() - start)
+
+    def get_values(self) -> ValueTable:
+        """Return the values learned so far."""
+        return ValueTable(array("f", self._values.tobytes()))
+
+    def _step(self, n: int) -> None:
+        """Play n games from the empty board and learn from them."""
+        indices = np.zeros(n, dtype=np.int32)
+        pieces = np.zeros((2, n), dtype=np.int16) # O's and X's bitboards
+        results = np.zeros(n, dtype=np.int8) # 1 if O won, -1 if X won
+        reached = np.zeros((9, n), dtype=np.int32) # Position after each move
+        games = np.arange(n) # Which game each row holds
+        for ply in range(9):
+            turn = ply % 2
+            empty = (FULL & ~(pieces[0] | pieces[1]))[:, None]
+            legal = (empty & self._bits) != 0
+            children = indices[:, None] + (turn + 1) * self._powers
+            # Break ties between equally valuable moves at random
+            scores = (self._values[np.where(legal, children, 0)]
+                      + self._rng.random(legal.shape, dtype=np.float32)
+                      * 1e-6)
+            explore = self._rng.random(len(games)) < self._epsilon
+            scores[explore] = self._rng.random(
+                (np.count_nonzero(explore), 9), dtype=np.float32)
+            squares = np.where(legal, scores, -np.inf).argmax(axis=1)
+            rows = np.arange(len(games))
+            indices = children[rows, squares]
+            pieces[turn] |= self._bits[squares]
+            reached[ply, games] = indices
+            if ply >= 4: # Nobody can have three in a row before then
+                won = self._winning[pieces[turn]]
+                results[games[won]] = 1 - 2*turn
+                # Only keep the games which are still going
+                indices = indices[~won]
+                pieces = pieces[:, ~won]
+                games = games[~won]
+        # No move leads to the empty board, so it marks the plies after
+        # a game ended
+        plies = np.nonzero(reached)
+        # The result for the player who moved into each position
+        returns = (results[plies[1]]
+                   * np.where(plies[0] % 2, -1, 1)).astype(np.float64)
+        positions = reached[plies]
+        counts = np.bincount(positions, minlength=POSITIONS)
+        totals = np.bincount(positions, weights=returns,
+                             minlength=POSITIONS)
+        seen = counts > 0
+        rate = np.minimum(1.0, self._learning_rate * counts[seen])
+        self._values[seen] += (rate * (totals[seen] / counts[seen]
+                                       - self._values[seen]))
+
+# Tables which have been loaded, keyed by the path they were loaded from
+_tables: Dict[str, ValueTable] = {}
+
+def get_values(path: str = DEFAULT_PATH) -> ValueTable:
+    """Return the table saved at the specified path, loading it the
+    first time it is requested. If there is no table at the path, one
+    is trained in memory instead, which needs NumPy."""
+    if path not in _tables:
+        if os.path.exists(path):
+            _tables[path] = ValueTable.load(path)
+        else:
+            trainer = SelfPlayTrainer(seed=0)
+            trainer.train(DEFAULT_GAMES)
+            _tables[path] = trainer.get_values()
+    return _tables[path]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Learn the value of every position by self-play.")
+    parser.add_argument("-games", type=int, default=DEFAULT_GAMES,
+                        help="number of games to play")
+    parser.add_argument("-seed", type=int, default=None,
+                        help="seed for reproducible training")
+    parser.add_argument("-batch", type=int, default=10000,
+                        help="number of games to play at once")
+    parser.add_argument("-rate", type=float, default=0.01,
+                        help="learning rate per game a position is reached in")
+    parser.add_argument("-epsilon", type=float, default=0.3,
+                        help="chance of exploring a random move")
+    parser.add_argument("-o", "--output", default=DEFAULT_PATH,
+                        help="where to save the value table")
+    args = parser.parse_args()
+    trainer = SelfPlayTrainer(args.seed, args.batch, args.rate, args.epsilon)
+    rate = trainer.train(args.games)
+    trainer.get_values().save(args.output)
+    print(f"Played {args.games} games ({rate:.0f} games/sec) and saved "
+          + f"the values to {args.output}.")
@@ -0,0 +1,492 @@
+from __future__ import annotations
+import time
+import random
+import argparse
+from typing import List, Optional, Tuple
+
+from ordering import HeuristicOrdering, MoveOrdering
+from search import SearchCounters
+from tictactoe import BoardGame
+from tictactoe_ai import TicTacToeAI, RandomAI, WinningAI, WinningLosingAI
+from transposition import (EXACT, LOWER, UPPER, POLICIES, TranspositionTable,
+                           new_table)
+
+"""This module contains a generalisation of Tic Tac Toe to m,n,k-games,
+where players take turns on an m by n board to get k in a row, along
+with an AI that can play them on large boards, as well as code for
+running the program from the command line.
+
+Classes:
+- MNKGame
+- DeepeningAI
+"""
+
+# Type aliases
+Piece = Optional[str]
+Board = List[List[Piece]]
+Move = Tuple[int, int]
+
+# The directions a line can run in from a square
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+class MNKGame(BoardGame):
+    """This is a class for m,n,k-games, e.g. 4x4 with k=4 or Gomoku
+    (15x15 with k=5). The default is Tic Tac Toe.
+
+    It has the same methods as BoardGame, which work on boards of any
+    size, plus a win check which only looks at the lines through the
+    last move made.
+
+    Public Methods:
+    - get_k() -> int
+    - find_winner_at(board: Board, x: int, y: int) -> Optional[str]
+    - get_lines() -> List[List[Move]]
+    """
+
+    def __init__(self, m: int = 3, n: int = 3, k: int = 3) -> None:
+        """Initialise an m,n,k-game on an m by n board."""
+        if m < 1 or n < 1:
+            raise ValueError("Board must have at least one square.")
+        if not(1 <= k <= max(m, n)):
+            raise ValueError("Invalid k specified.")
+        self._m = m
+        self._n = n
+        self._k = k
+        self._lines = None
+        super().__init__()
+
+    def _new_board(self) -> Board:
+        """Return an empty board."""
+        return [[None for y in range(self._n)] for x in range(self._m)]
+
+    def get_k(self) -> int:
+        """Return how many pieces in a row are needed to win."""
+        return self._k
+
+    def make_move(self, board: Board, x: int, y: int,
+                  turn: str) -> Board:
+        """If the specified move is valid on the specified board,
+        return a copy of the board after that move is made; otherwise
+        return an empty list.
+
+        Note that the state of the input board is not changed.
+        """
+        if not(0 <= x < self._m and 0 <= y < self._n):
+            return []
+        elif board[x][y] != None:
+            return []
+        new_board = [column[:] for column in board]
+        new_board[x][y] = turn
+        return new_board
+
+    def find_winner(self, board: Board) -> Optional[str]:
+        """If there is a winner return one; otherwise, return None."""
+        for x in range(self._m):
+            for y in range(self._n):
+                if board[x][y] != None and self.find_winner_at(board, x, y):
+                    return board[x][y]
+        return None
+
+    def find_winner_at(self, board: Board, x: int, y: int) -> Optional[str]:
+        """Return the piece in the (x,y) square if it is part of k in a
+        row; otherwise, return None.
+
+        Only the lines through (x,y) are checked, so calling this with
+        the last move made finds whether that move won the game.
+        """
+        piece = board[x][y]
+        if piece == None:
+            return None
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                i = x + sign*dx
+                j = y + sign*dy
+                while (0 <= i < self._m and 0 <= j < self._n
+                       and board[i][j] == piece):
+                    count += 1
+                    i += sign*dx
+                    j += sign*dy
+            if count >= self._k:
+                return piece
+        return None
+
+    def board_full(self, board: Board) -> bool:
+        """Return whether or not the board is full."""
+        return all(None not in column for column in board)
+
+    def legal_moves(self, board: Board) -> List[Move]:
+        """Return the empty squares of the board in row-major order."""
+        return [(x, y) for x in range(self._m) for y in range(self._n)
+                if board[x][y] == None]
+
+    def get_lines(self) -> List[List[Move]]:
+        """Return every line of k squares on the board."""
+        if self._lines == None:
+            self._lines = []
+            for x in range(self._m):
+                for y in range(self._n):
+                    for dx, dy in DIRECTIONS:
+                        end_x = x + (self._k - 1)*dx
+                        end_y = y + (self._k - 1)*dy
+                        if 0 <= end_x < self._m and 0 <= end_y < self._n:
+                            self._lines.append([(x + i*dx, y + i*dy)
+                                                for i in range(self._k)])
+        return self._lines
+
+    def _print(self) -> None:
+        """Print the board."""
+        print("    " + "".join(f"{x:^4}" for x in range(self._m)))
+        print("   +" + "---+"*self._m)
+        for y in range(self._n):
+            row_print = f"{y:>2} |"
+            for x in range(self._m):
+                if self._board[x][y] == None:
+                    row_print += "   |"
+                else:
+                    row_print += f" {self._board[x][y]} |"
+            print(row_print)
+            print("   +" + "---+"*self._m)
+
+class _Timeout(Exception):
+    """Raised inside DeepeningAI's search when time has run out."""
+    pass
+
+class DeepeningAI(TicTacToeAI):
+    """An AI for m,n,k-games which searches with iterative deepening
+    alpha-beta (in negamax form) and evaluates the positions where the
+    depth limit is reached heuristically.
+
+    The search is repeated one ply deeper each time until the time
+    limit or the maximum depth is reached, and the move found by the
+    deepest complete search is played. The board is changed in place
+    with each move searched and changed back afterwards, and a win is
+    only looked for along the lines through the last move.
+
+    On large boards only the squares next to existing pieces are
+    searched, since moves far away from the action are rarely good.
+
+    Given a transposition table, the AI stores the score of each board
+    it searches, as a bound along with the depth searched and the best
+    move, keyed by a 64 bit Zobrist hash of the board. A board reached
+    again is then only searched if the stored depth is too shallow,
+    and its best move is searched first. Pass one of the bounded tables
+    (see transposition.py) to keep memory within a budget.
+
+    Given a MoveOrdering (see ordering.py), the moves below the root
+    are searched in the order it chooses, after the table's best move,
+    instead of centre-most first. The ordering is kept between moves.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - get_depth() -> int
+    - get_table() -> Optional[TranspositionTable]
+    """
+
+    WIN = 10**9 # Score for winning, less the number of moves taken
+    NEARBY_AREA = 25 # Boards with more squares only search nearby moves
+
+    def __init__(self, game: MNKGame, time_limit: float = 1.0,
+                 max_depth: Optional[int] = None,
+                 table: Optional[TranspositionTable] = None,
+                 ordering: Optional[MoveOrdering] = None) -> None:
+        """Initialise an AI which spends up to time_limit seconds and
+        searches up to max_depth moves ahead (no limit if None),
+        caching its results in table if one is specified."""
+        super().__init__(game)
+        self._time_limit = time_limit
+        self._max_depth = max_depth
+        self._table = table
+        self._ordering = ordering
+        self._depth = 0 # Depth of the last complete search
+        # Random bits for X's turn and for each piece on each square,
+        # drawn in a fixed order from a fixed seed so that every AI for
+        # the board has the same keys, in every process, and AIs can
+        # share a table, without using up the game's randomness
+        keys = random.Random(0)
+        self._side = keys.getrandbits(64)
+        self._zobrist = {(x, y, piece): keys.getrandbits(64)
+                         for x in range(game.get_width())
+                         for y in range(game.get_height())
+                         for piece in ("O", "X")}
+
+    def get_depth(self) -> int:
+        """Return the depth of the deepest complete search made by the
+        last call to find_move."""
+        return self._depth
+
+    def get_table(self) -> Optional[TranspositionTable]:
+        """Return the transposition table used by the AI, if any."""
+        return self._table
+
+    def find_move(self) -> Option[Tuple[int, int]]:
+        board = self._current_board()
+        moves = self._candidate_moves(board)
+        if not moves:
+            return None
+        me = self._game.get_turn()
+        self._deadline = time.perf_counter() + self._time_limit
+        empty = sum(column.count(None) for column in board)
+        max_depth = empty
+        if self._max_depth != None:
+            max_depth = min(max_depth, self._max_depth)
+        best_move = moves[0]
+        self._depth = 0
+        key = self._side if me == "X" else 0
+        for x, column in enumerate(board):
+            for y, piece in enumerate(column):
+                if piece != None:
+                    key ^= self._zobrist_bits(x, y, piece)
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self._search_root(board, moves, me, depth,
+                                                 empty, key)
+            except _Timeout:
+                break
+            best_move = move
+            self._depth = depth
+            # Search the best move first next time
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= self.WIN - depth: # Result is decided
+                break
+        return best_move
+
+    def _search_root(self, board: Board, moves: List[Move], turn: str,
+                     depth: int, empty: int, key: int) -> Tuple[int, Move]:
+        """Search every move to the specified depth and return the best
+        score and move. The board's Zobrist hash is key."""
+        other = "X" if turn == "O" else "O"
+        alpha = -self.WIN - 1
+        best_move = moves[0]
+        for x, y in moves:
+            board[x][y] = turn
+            try:
+                score = -self._negamax(board, other, depth - 1,
+                                       -self.WIN - 1, -alpha, (x, y), 1,
+                                       empty - 1,
+                                       key ^ self._zobrist_bits(x, y, turn)
+                                       ^ self._side)
+            finally:
+                board[x][y] = None
+            if score > alpha:
+                alpha = score
+                best_move = (x, y)
+        return (alpha, best_move)
+
+    def _negamax(self, board: Board, turn: str, depth: int, alpha: int,
+                 beta: int, last: Move, ply: int, empty: int,
+                 key: int) -> int:
+        """Return the score of the board for the player whose turn it
+        is, searching depth moves ahead. The board's Zobrist hash is
+        key."""
+        if time.perf_counter() > self._deadline:
+            raise _Timeout()
+        if self._game.find_winner_at(board, *last): # Last move won
+            return -(self.WIN - ply)
+        if empty == 0:
+            return 0
+        if depth == 0:
+            return self._evaluate(board, turn)
+        moves = self._candidate_moves(board)
+        first = None # Move to search before the rest
+        table = self._table
+        if table != None:
+            entry = table.get(key)
+            if entry != None:
+                stored_depth, score, bound, move = entry
+                score = self._from_table(score, ply)
+                if stored_depth >= depth:
+                    if bound == EXACT:
+                        return score
+                    elif bound == LOWER:
+                        alpha = max(alpha, score)
+                    elif bound == UPPER:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+                if move in moves: # Search the best move first
+                    first = move
+        other = "X" if turn == "O" else "O"
+        ordering = self._ordering
+        if ordering != None:
+            moves = ordering.order(
+                moves, empty,
+                lambda move: self._completes(board, move, turn),
+                lambda move: self._completes(board, move, other))
+        if first != None:
+            moves.remove(first)
+            moves.insert(0, first)
+        original_alpha = alpha
+        best = -self.WIN - 1
+        best_move = moves[0]
+        for x, y in moves:
+            board[x][y] = turn
+            try:
+                score = -self._negamax(board, other, depth - 1, -beta,
+                                       -alpha, (x, y), ply + 1, empty - 1,
+                                       key ^ self._zobrist_bits(x, y, turn)
+                                       ^ self._side)
+            finally:
+                board[x][y] = None
+            if score > best:
+                best = score
+                best_move = (x, y)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                if ordering != None:
+                    ordering.cutoff((x, y), empty, depth)
+                break
+        if table != None:
+            if best <= original_alpha:
+                bound = UPPER
+            elif best >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            table.put(key, (depth, self._to_table(best, ply), bound,
+                            best_move), depth)
+        return best
+
+    def _count_with(self, counters: SearchCounters) -> None:
+        self._negamax = self._negamax_counted
+
+    def _negamax_counted(self, board: Board, turn: str, depth: int,
+                         alpha: int, beta: int, last: Move, ply: int,
+                         empty: int, key: int) -> int:
+        """Search the board as _negamax does, counting it as a node,
+        along with whether it was cut off and how deep it is."""
+        counters = self._counters
+        counters.nodes += 1
+        if ply > counters.max_depth:
+            counters.max_depth = ply
+        score = DeepeningAI._negamax(self, board, turn, depth, alpha, beta,
+                                     last, ply, empty, key)
+        if (score >= beta and depth > 0 and empty > 0
+                and not self._game.find_winner_at(board, *last)):
+            counters.cutoffs += 1
+        return score
+
+    def _completes(self, board: Board, move: Move, piece: str) -> bool:
+        """Return whether placing piece on the move's square would
+        complete a line."""
+        x, y = move
+        board[x][y] = piece
+        won = self._game.find_winner_at(board, x, y) != None
+        board[x][y] = None
+        return won
+
+    def _zobrist_bits(self, x: int, y: int, piece: str) -> int:
+        """Return the random bits a board's hash is changed by when
+        piece is placed on or removed from the (x,y) square."""
+        return self._zobrist[(x, y, piece)]
+
+    def _to_table(self, score: int, ply: int) -> int:
+        """Return a score found ply moves from the root in the form it
+        is stored in the table, where wins and losses count the moves
+        taken from the board scored rather than from the root."""
+        if score > self.WIN // 2:
+            return score + ply
+        if score < -(self.WIN // 2):
+            return score - ply
+        return score
+
+    def _from_table(self, score: int, ply: int) -> int:
+        """Return a score read from the table for a board ply moves
+        from the root, undoing _to_table."""
+        if score > self.WIN // 2:
+            return score - ply
+        if score < -(self.WIN // 2):
+            return score + ply
+        return score
+
+    def _candidate_moves(self, board: Board) -> List[Move]:
+        """Return the moves worth searching, centre-most first."""
+        width = len(board)
+        height = len(board[0])
+        moves = self._game.legal_moves(board)
+        centre_x = (width - 1) / 2
+        centre_y = (height - 1) / 2
+        if width*height > self.NEARBY_AREA and len(moves) == width*height:
+            # Nothing to play next to yet so start in the centre
+            return [(width // 2, height // 2)]
+        elif width*height > self.NEARBY_AREA:
+            moves = [(x, y) for x, y in moves
+                     if any(board[i][j] != None
+                            for i in range(max(x - 1, 0), min(x + 2, width))
+                            for j in range(max(y - 1, 0),
+                                           min(y + 2, height)))]
+        moves.sort(key=lambda move: abs(move[0] - centre_x)
+                                    + abs(move[1] - centre_y))
+        return moves
+
+    def _evaluate(self, board: Board, turn: str) -> int:
+        """Return a heuristic score of the board for the player whose
+        turn it is: every line one player could still complete scores
+        10 to the power of the number of pieces they have on it."""
+        score = 0
+        for line in self._game.get_lines():
+            mine = 0
+            theirs = 0
+            for x, y in line:
+                piece = board[x][y]
+                if piece == turn:
+                    mine += 1
+                elif piece != None:
+                    theirs += 1
+            if theirs == 0 and mine > 0:
+                score += 10**mine
+            elif mine == 0 and theirs > 0:
+                score -= 10**theirs
+        return score
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Play an m,n,k-game (k in a row on an m by n board).")
+    parser.add_argument("-m", type=int, default=15, help="board width")
+    parser.add_argument("-n", type=int, default=15, help="board height")
+    parser.add_argument("-k", type=int, default=5,
+                        help="pieces in a row needed to win")
+    parser.add_argument("-time", type=float, default=1.0,
+                        help="seconds the deepening AI may take per move")
+    parser.add_argument("-test", type=int, default=0, metavar="GAMES",
+                        help="play GAMES games between two AIs")
+    parser.add_argument("-table", choices=list(POLICIES), default=None,
+                        help="transposition table for the deepening AI "
+                             + "to cache its searches in")
+    parser.add_argument("-table-mb", type=float, default=64,
+                        help="megabytes a bounded table may use")
+    parser.add_argument("-ordering", choices=["natural", "heuristic"],
+                        default="natural",
+                        help="order for the deepening AI to search moves "
+                             + "in: centre-most first, or wins, blocks, "
+                             + "killer moves and history first")
+    args = parser.parse_args()
+
+    game = MNKGame(args.m, args.n, args.k)
+    players = {"random": RandomAI, "winning": WinningAI,
+               "winning-losing": WinningLosingAI, "deepening": DeepeningAI}
+    for piece in ["O", "X"]:
+        player = input(f"Who would you like to have play as {piece}?: ")
+        if player == "deepening":
+            table = None
+            if args.table != None:
+                table = new_table(args.table,
+                                  size=int(args.table_mb * 2**20))
+            ordering = None
+            if args.ordering == "heuristic":
+                ordering = HeuristicOrdering()
+            game.load(DeepeningAI(game, args.time, table=table,
+                                  ordering=ordering), piece)
+        elif player in players:
+            game.load(players[player](game), piece)
+        elif player != "human":
+            raise ValueError(f"Invalid player for {piece} has been specified."
+                             + "\nPlease choose from one of the following "
+                             + "options:\n"
+                             + "".join(f"- {ai}\n" for ai in players)
+                             + "- human")
+    if args.test:
+        game.test(args.test)
+    else:
+        game.play()
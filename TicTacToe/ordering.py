@@ -0,0 +1,209 @@
+from __future__ import annotations
+from typing import Callable, Dict, Hashable, List, Optional
+
+"""This module contains the move orderings the alpha-beta AIs can
+search with. The sooner a search tries the best move of a board, the
+more of the other moves alpha-beta pruning can skip, so a good ordering
+shows up as fewer nodes searched (see TicTacToeAI.instrument).
+
+Classes:
+- MoveOrdering
+- HeuristicOrdering
+"""
+
+# Type alias for a move, which is whatever the search uses for one: a
+# square number for SearchCore and an (x,y) tuple for DeepeningAI
+Move = Hashable
+
+# A static prior for the 3x3 board, numbered as in bitboard.py: the
+# centre is on four lines, the corners on three and the edges on two
+PRIOR_3X3 = {4: 2, 0: 1, 2: 1, 6: 1, 8: 1}
+
+class MoveOrdering:
+    """The order in which an alpha-beta search tries the moves of a
+    board. This ordering keeps the moves in the order the search
+    generated them in; subclasses reorder them and can learn from the
+    moves which cause cutoffs.
+
+    Boards are identified by their number of empty squares rather than
+    by their distance from the root, so that what is learned in one
+    search still applies after the game has moved on.
+
+    Public Methods:
+    - order(moves: List[Move], empty: int, wins: Callable[[Move], bool],
+      blocks: Callable[[Move], bool]) -> List[Move]
+    - cutoff(move: Move, empty: int, depth: int) -> None
+    - clear() -> None
+    """
+
+    def order(self, moves: List[Move], empty: int,
+              wins: Callable[[Move], bool],
+              blocks: Callable[[Move], bool]) -> List[Move]:
+        """Return the moves of a board with the specified number of
+        empty squares in the order to search them. wins and blocks say
+        whether a move completes a line for the player making it or for
+        their opponent."""
+        return moves
+
+    def cutoff(self, move: Move, empty: int, depth: int) -> None:
+        """Record that the move caused a cutoff on a board with the
+        specified number of empty squares, searched depth moves
+        ahead."""
+        pass
+
+    def clear(self) -> None:
+        """Forget everything learned from cutoffs."""
+        pass
+
+class HeuristicOrdering(MoveOrdering):
+    """An ordering which tries moves that win first, then moves that
+    block the opponent's win, then the killer moves, and then the rest
+    by their history score, with ties broken by a static prior and
+    finally by the order the search generated the moves in.
+
+    The killer moves of a board are the last two moves to cause a
+    cutoff on a board with as many empty squares, and a move's history
+    score is the sum of the squares of the depths of every search it
+    caused a cutoff in. Both are kept between searches until clear is
+    called. Each heuristic can be turned off, to measure what it is
+    worth on its own.
+
+    Public Methods:
+    - order(moves: List[Move], empty: int, wins: Callable[[Move], bool],
+      blocks: Callable[[Move], bool]) -> List[Move]
+    - cutoff(move: Move, empty: int, depth: int) -> None
+    - clear() -> None
+    - get_killers(empty: int) -> List[Move]
+    - get_history(move: Move) -> int
+    """
+
+    def __init__(self, prior: Optional[Dict[Move, float]] = None,
+                 threats: bool = True, killers: bool = True,
+                 history: bool = True) -> None:
+        """Initialise an ordering using the static prior, which scores
+        some moves above the rest (by default, none), and the chosen
+        heuristics: threats means trying wins and blocks first."""
+        self._prior = prior if prior != None else {}
+        self._threats = threats
+        self._use_killers = killers
+        self._use_history = history
+        self._killers: Dict[int, List[Move]] = {}
+        self._history: Dict[Move, int] = {}
+
+    def order(self, moves: List[Move], empty: int,
+              wins: Callable[[Move], bool],
+              blocks: Callable[[Move], bool]) -> List[Move]:
+        prior = self._prior
+        history = self._history
+        killers = self._killers.get(empty, ())
+        threats = self._threats
+        def key(move: Move) -> tuple:
+            if threats:
+                threat = 2 if wins(move) else 1 if blocks(move) else 0
+            else:
+                threat = 0
+            return (threat, move in killers, history.get(move, 0),
+                    prior.get(move, 0))
+        # The sort is stable, so moves which tie keep their order
+        return sorted(moves, key=key, reverse=True)
+
+    def cutoff(self, move: Move, empty: int, depth: int) -> None:
+        if self._use_killers:
+            killers = self._killers.setdefault(empty, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[2:]
+        if self._use_history:
+            self._history[move] = self._history.get(move, 0) + depth*depth
+
+    def clear(self) -> None:
+        self._killers.clear()
+        self._history.clear()
+
+    def get_killers(self, empty: int) -> List[Move]:
+        """Return the killer moves of boards with the specified number
+        of empty squares, most recent first."""
+        return list(self._killers.get(empty, ()))
+
+    def get_history(self, move: Move) -> int:
+        """Return the history score of the move."""
+        return self._history.get(move, 0)
+
+if __name__ == '__main__':
+    import time
+    import random
+    import argparse
+    # Imported here since the AIs import this module
+    from bitboard import BitBoard
+    from mnk import DeepeningAI, MNKGame
+    from solver import reachable_positions
+    from tictactoe import TicTacToe
+    from tictactoe_ai import AlphaBetaPerfectAI
+
+    parser = argparse.ArgumentParser(
+        description="Compare the nodes searched with each move ordering.")
+    parser.add_argument("-m", type=int, default=3, help="board width")
+    parser.add_argument("-n", type=int, default=3, help="board height")
+    parser.add_argument("-k", type=int, default=3,
+                        help="pieces in a row needed to win")
+    parser.add_argument("-depth", type=int, default=4,
+                        help="moves the deepening AI searches ahead")
+    parser.add_argument("-positions", type=int, default=20,
+                        help="random positions to search on other boards")
+    parser.add_argument("-seed", type=int, default=0,
+                        help="seed for choosing the random positions")
+    args = parser.parse_args()
+
+    standard = (args.m, args.n, args.k) == (3, 3, 3)
+    if standard:
+        # Every position, with the ordering kept from one to the next
+        game = TicTacToe()
+        positions = [(BitBoard().to_board(bits), turn)
+                     for bits, turn in reachable_positions()]
+        prior = PRIOR_3X3
+    else:
+        game = MNKGame(args.m, args.n, args.k)
+        # Positions a few random moves into a game
+        rng = random.Random(args.seed)
+        positions = []
+        while len(positions) < args.positions:
+            board = game._new_board()
+            turn = "O"
+            for i in range(rng.randrange(2, 6)):
+                x, y = rng.choice(game.legal_moves(board))
+                board = game.make_move(board, x, y, turn)
+                turn = "X" if turn == "O" else "O"
+            if game.find_winner(board) == None:
+                positions.append((board, turn))
+        prior = None # The deepening AI already generates centre first
+    orderings = {
+        "natural": None,
+        "prior": HeuristicOrdering(prior, threats=False, killers=False,
+                                   history=False),
+        "threats": HeuristicOrdering(prior, killers=False, history=False),
+        "killers": HeuristicOrdering(prior, history=False),
+        "history": HeuristicOrdering(prior, killers=False),
+        "all": HeuristicOrdering(prior)}
+    print(f"{'ordering':>10} {'nodes':>10} {'of natural':>10} "
+          + f"{'time (s)':>9}")
+    natural = None
+    for name, ordering in orderings.items():
+        if standard:
+            ai = AlphaBetaPerfectAI(game, ordering=ordering)
+        else:
+            ai = DeepeningAI(game, time_limit=float("inf"),
+                             max_depth=args.depth, ordering=ordering)
+        ai.instrument()
+        start = time.perf_counter()
+        for board, turn in positions:
+            for x, column in enumerate(board):
+                for y, piece in enumerate(column):
+                    game.set_square(x, y, piece)
+            game.set_turn(turn)
+            ai.find_move()
+        elapsed = time.perf_counter() - start
+        nodes = sum(stats["nodes"] for stats in ai.get_stats())
+        if natural == None:
+            natural = nodes
+        print(f"{name:>10} {nodes:10} {nodes/natural:10.1%} "
+              + f"{elapsed:9.2f}")
@@ -0,0 +1,142 @@
+from __future__ import annotations
+import os
+import mmap
+import argparse
+from typing import Dict, Optional
+
+from bitboard import Bits, canonical_index
+from solver import POSITIONS, SolutionTable, reachable_positions
+
+"""This module contains a persistent cache of the minimax score of
+every reachable Tic Tac Toe position, which the caching AIs can look
+scores up in instead of searching, as well as code for rebuilding the
+cache file from the command line.
+
+The file is memory-mapped read-only, so every process using the same
+file shares one copy of it.
+
+Classes:
+- ScoreCache
+
+Functions:
+- get_cache(path: str = DEFAULT_PATH) -> ScoreCache
+"""
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "scores.bin")
+
+MAGIC = b"TTTC"
+VERSION = 1
+HEADER = 8 # Bytes before the first record, keeping the records aligned
+RECORDS = 2 * POSITIONS # One record per canonical index and side to move
+ABSENT = -128 # Record for positions that cannot occur in a game
+
+class ScoreCache:
+    """A read-only cache of the minimax score of every position that
+    can occur in a game, as SearchCore scores it (10 for a win, -10 for
+    a loss and 0 for a draw for the player whose turn it is).
+
+    The cache is a fixed-layout binary file: an 8 byte header holding
+    MAGIC, the VERSION and three reserved zero bytes, followed by one
+    signed byte per position at the position's key in a
+    TranspositionTable, i.e. twice its canonical index plus one if it
+    is X's turn. Positions which are rotations or mirrors of each other
+    share a record.
+
+    Public Methods:
+    - build() -> ScoreCache
+    - load(path: str) -> ScoreCache
+    - save(path: str) -> None
+    - get(bits: Bits, turn: str) -> Optional[int]
+    - __len__() -> int
+    """
+
+    def __init__(self, records: bytes, path: Optional[str] = None) -> None:
+        """Initialise a cache from a buffer of RECORDS records, which
+        was loaded from path if one is specified."""
+        if len(records) != RECORDS:
+            raise ValueError("Cache has the wrong number of records.")
+        self._records = memoryview(records).cast("b")
+        self._path = path
+
+    @classmethod
+    def build(cls) -> ScoreCache:
+        """Score every position reachable from the empty board and
+        return the resulting cache."""
+        records = bytearray([ABSENT & 0xFF]) * RECORDS
+        solution = SolutionTable.solve()
+        for bits, turn in reachable_positions(terminal=True):
+            value, best = solution.lookup(bits, turn)
+            key = canonical_index(bits) << 1 | (turn == "X")
+            records[key] = (10 * value) & 0xFF
+        return cls(records)
+
+    @classmethod
+    def load(cls, path: str) -> ScoreCache:
+        """Memory-map the cache saved at the specified path."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size != HEADER + RECORDS:
+                raise ValueError(f"{path} is not a score cache.")
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            data.close()
+            raise ValueError(f"{path} is not a score cache.")
+        if data[len(MAGIC)] != VERSION:
+            data.close()
+            raise ValueError(f"{path} has an unsupported version.")
+        return cls(memoryview(data)[HEADER:], path)
+
+    def save(self, path: str) -> None:
+        """Save the cache to the specified path."""
+        header = MAGIC + bytes([VERSION])
+        # Write to a new file and rename it over the old one, so that
+        # processes with the old file mapped keep a consistent copy
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(header + bytes(HEADER - len(header)))
+            f.write(self._records.cast("B"))
+        os.replace(temporary, path)
+
+    def get(self, bits: Bits, turn: str) -> Optional[int]:
+        """Return the minimax score of the position for the player
+        whose turn it is, or None if the position cannot occur in a
+        game."""
+        score = self._records[canonical_index(bits) << 1 | (turn == "X")]
+        if score == ABSENT:
+            return None
+        return score
+
+    def __len__(self) -> int:
+        """Return the number of records holding a score."""
+        return RECORDS - self._records.tolist().count(ABSENT)
+
+    def __reduce__(self):
+        # Processes a cache is copied to map the same file rather than
+        # being sent its records
+        if self._path != None:
+            return (get_cache, (self._path,))
+        return (ScoreCache, (self._records.tobytes(),))
+
+# Caches which have been loaded, keyed by the path they were loaded from
+_caches: Dict[str, ScoreCache] = {}
+
+def get_cache(path: str = DEFAULT_PATH) -> ScoreCache:
+    """Return the cache saved at the specified path, mapping it the
+    first time it is requested. If there is no cache at the path, the
+    positions are scored in memory instead."""
+    if path not in _caches:
+        if os.path.exists(path):
+            _caches[path] = ScoreCache.load(path)
+        else:
+            _caches[path] = ScoreCache.build()
+    return _caches[path]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Rebuild the cache of every position's score.")
+    parser.add_argument("-o", "--output", default=DEFAULT_PATH,
+                        help="where to save the score cache")
+    args = parser.parse_args()
+    cache = ScoreCache.build()
+    cache.save(args.output)
+    print(f"Scored {len(cache)} positions and saved them to {args.output}.")
@@ -0,0 +1,351 @@
+from __future__ import annotations
+from typing import Dict, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from ordering import MoveOrdering
+    from scorecache import ScoreCache
+
+from bitboard import (Bits, BITS_OF, FULL, INVERSE, LINES, LINES_THROUGH,
+                      TRANSFORMS, canonical_transform)
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+"""This module contains the minimax search shared by the perfect Tic
+Tac Toe AIs.
+
+Classes:
+- SearchCore
+- SearchCounters
+- CountingSearchCore
+"""
+
+class SearchCore:
+    """A negamax search over a single bitboard which is changed in
+    place as moves are made and unmade.
+
+    Scores are 10 for a win, -10 for a loss and 0 for a draw, from the
+    point of view of the player whose turn it is. The squares still
+    empty are kept as a mask which each move updates, and a win is only
+    looked for along the lines through the last move made.
+
+    The search can use alpha-beta pruning and a transposition table.
+    Without pruning, the table stores exact scores; with pruning, it
+    stores each score along with whether it is EXACT or a LOWER or
+    UPPER bound, and the best move found, which is searched first the
+    next time the board is reached. Entries are stored with the number
+    of empty squares left as their depth, for tables which must choose
+    which entries to keep.
+
+    Given a ScoreCache (see scorecache.py), the score of a move is
+    looked up there first, and only searched if the cache doesn't hold
+    the board the move leads to.
+
+    Given a MoveOrdering (see ordering.py), alpha-beta tries the moves
+    of each board in the order it chooses, after the table's best move,
+    and tells it about every move which causes a cutoff. Otherwise the
+    moves are tried in square order.
+
+    Public Methods:
+    - set_position(bits: Bits, turn: str) -> None
+    - get_bits() -> Bits
+    - make(square: int) -> None
+    - unmake(square: int) -> None
+    - score_move(square: int) -> int
+    - search(last: int, alpha: int = -100, beta: int = 100) -> int
+    - counting(counters: SearchCounters) -> CountingSearchCore
+    """
+
+    def __init__(self, pruning: bool = False,
+                 table: Optional[TranspositionTable] = None,
+                 scores: Optional[ScoreCache] = None,
+                 ordering: Optional[MoveOrdering] = None) -> None:
+        """Initialise a search core on the empty board."""
+        self._pruning = pruning
+        self._table = table
+        self._scores = scores
+        self._ordering = ordering
+        self._pieces = [0, 0] # Bitboards of O and X
+        self._empty = FULL # Mask of the empty squares
+        self._turn = 0 # 0 if it is O's turn, 1 if it is X's
+        self._decided = None # Score for a board already won at the root
+
+    def set_position(self, bits: Bits, turn: str) -> None:
+        """Set the board to search from and whose turn it is."""
+        self._pieces = [bits[0], bits[1]]
+        self._empty = FULL & ~(bits[0] | bits[1])
+        self._turn = 0 if turn == "O" else 1
+        # Every move from a board someone has already won scores the
+        # same since the game is over, so don't search it
+        self._decided = None
+        for player in (0, 1):
+            if any(self._pieces[player] & line == line for line in LINES):
+                self._decided = 10 if player == self._turn else -10
+                break
+
+    def get_bits(self) -> Bits:
+        """Return the current board as a bitboard."""
+        return (self._pieces[0], self._pieces[1])
+
+    def make(self, square: int) -> None:
+        """Place the piece of the player whose turn it is on the
+        square (numbered as in bitboard.py)."""
+        bit = 1 << square
+        self._pieces[self._turn] |= bit
+        self._empty ^= bit
+        self._turn ^= 1
+
+    def unmake(self, square: int) -> None:
+        """Take back the last move, which was made on the square."""
+        bit = 1 << square
+        self._turn ^= 1
+        self._pieces[self._turn] ^= bit
+        self._empty |= bit
+
+    def score_move(self, square: int) -> int:
+        """Return the minimax score of making a move on the square for
+        the player making it."""
+        if self._decided != None:
+            return self._decided
+        self.make(square)
+        score = None
+        if self._scores != None:
+            score = self._scores.get(self.get_bits(), "OX"[self._turn])
+        if score == None:
+            score = self.search(square)
+        self.unmake(square)
+        return -score
+
+    def search(self, last: int, alpha: int = -100, beta: int = 100) -> int:
+        """Return the minimax score of the current board, where the
+        last move was made on the specified square, for the player
+        whose turn it is.
+
+        With pruning, the score is only exact if it lies between alpha
+        and beta; otherwise it is a bound on the minimax score.
+        """
+        if self._pruning:
+            return self._alphabeta(last, alpha, beta)
+        return self._minimax(last)
+
+    def counting(self, counters: SearchCounters) -> CountingSearchCore:
+        """Return a core which searches in the same way, from the same
+        position, but also counts its work in counters."""
+        core = CountingSearchCore(self._pruning, self._table, counters,
+                                  self._scores, self._ordering)
+        core._pieces = self._pieces[:]
+        core._empty = self._empty
+        core._turn = self._turn
+        core._decided = self._decided
+        return core
+
+    def _won(self, last: int) -> bool:
+        """Return whether the last move, made on the specified square,
+        won the game."""
+        mover = self._pieces[self._turn ^ 1]
+        for line in LINES_THROUGH[last]:
+            if mover & line == line:
+                return True
+        return False
+
+    def _completes(self, player: int, square: int) -> bool:
+        """Return whether a piece of the player's on the square would
+        complete a line."""
+        pieces = self._pieces[player] | 1 << square
+        for line in LINES_THROUGH[square]:
+            if pieces & line == line:
+                return True
+        return False
+
+    def _minimax(self, last: int) -> int:
+        """Return the minimax score of the current board."""
+        if self._won(last):
+            return -10
+        if self._empty == 0:
+            return 0
+        table = self._table
+        if table != None:
+            key = table.key(self.get_bits(), "OX"[self._turn])
+            score = table.get(key)
+            if score != None:
+                return score
+        pieces = self._pieces
+        turn = self._turn
+        best = -100
+        squares = BITS_OF[self._empty]
+        for square in squares:
+            # Make the move
+            bit = 1 << square
+            pieces[turn] |= bit
+            self._empty ^= bit
+            self._turn = turn ^ 1
+            score = -self._minimax(square)
+            # Unmake the move
+            self._turn = turn
+            pieces[turn] ^= bit
+            self._empty |= bit
+            if score > best:
+                best = score
+        if table != None:
+            table.put(key, best, len(squares))
+        return best
+
+    def _alphabeta(self, last: int, alpha: int, beta: int) -> int:
+        """Return the minimax score of the current board, or a bound on
+        it if it lies outside alpha and beta."""
+        if self._won(last):
+            return -10
+        if self._empty == 0:
+            return 0
+        squares = BITS_OF[self._empty]
+        table = self._table
+        first = None # Square to search before the rest
+        if table != None:
+            bits = self.get_bits()
+            key = table.key(bits, "OX"[self._turn])
+            transform = canonical_transform(bits)
+            entry = table.get(key)
+            if entry != None:
+                score, bound, move = entry
+                if bound == EXACT:
+                    return score
+                elif bound == LOWER:
+                    alpha = max(alpha, score)
+                elif bound == UPPER:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+                # Try the best move found last time first; it is stored
+                # for the canonical board so map it back onto this one
+                first = TRANSFORMS[INVERSE[transform]][move].bit_length() - 1
+        pieces = self._pieces
+        turn = self._turn
+        ordering = self._ordering
+        if ordering != None:
+            squares = ordering.order(
+                list(squares), len(squares),
+                lambda square: self._completes(turn, square),
+                lambda square: self._completes(turn ^ 1, square))
+        if first != None:
+            squares = (first,) + tuple(square for square in squares
+                                       if square != first)
+        original_alpha = alpha
+        best = -100
+        best_square = None
+        for square in squares:
+            bit = 1 << square
+            pieces[turn] |= bit
+            self._empty ^= bit
+            self._turn = turn ^ 1
+            score = -self._alphabeta(square, -beta, -alpha)
+            self._turn = turn
+            pieces[turn] ^= bit
+            self._empty |= bit
+            if score > best:
+                best = score
+                best_square = square
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if ordering != None:
+                            ordering.cutoff(square, len(squares),
+                                            len(squares))
+                        break
+        if table != None:
+            if best <= original_alpha:
+                bound = UPPER
+            elif best >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            move = TRANSFORMS[transform][1 << best_square]
+            table.put(key, (best, bound, move), len(squares))
+        return best
+
+class SearchCounters:
+    """Counts of the work done by a search.
+
+    Attributes:
+    - nodes: boards searched
+    - cutoffs: boards whose search was cut short by alpha-beta pruning,
+      i.e. which scored at least beta
+    - hits: transposition table lookups which found an entry
+    - misses: transposition table lookups which didn't find an entry
+    - inserts: entries stored in the transposition table
+    - max_depth: most moves searched ahead of the root board
+
+    Public Methods:
+    - clear() -> None
+    - to_dict() -> Dict[str, int]
+    """
+
+    FIELDS = ("nodes", "cutoffs", "hits", "misses", "inserts", "max_depth")
+
+    def __init__(self) -> None:
+        """Initialise counters which are all zero."""
+        self.clear()
+
+    def clear(self) -> None:
+        """Set every counter back to zero."""
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def to_dict(self) -> Dict[str, int]:
+        """Return the counters keyed by name."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+class CountingSearchCore(SearchCore):
+    """A SearchCore which counts the work it does in a SearchCounters.
+
+    Counting is kept out of SearchCore itself so that searches which
+    aren't being counted don't pay for it.
+    """
+
+    def __init__(self, pruning: bool = False,
+                 table: Optional[TranspositionTable] = None,
+                 counters: Optional[SearchCounters] = None,
+                 scores: Optional[ScoreCache] = None,
+                 ordering: Optional[MoveOrdering] = None) -> None:
+        super().__init__(pruning, table, scores, ordering)
+        if counters == None:
+            counters = SearchCounters()
+        self._counters = counters
+        self._depth = 0 # Moves made since the root board
+
+    def get_counters(self) -> SearchCounters:
+        """Return the counters the core adds to."""
+        return self._counters
+
+    def score_move(self, square: int) -> int:
+        table = self._table
+        if table != None:
+            hits = table.get_hits()
+            misses = table.get_misses()
+            inserts = table.get_inserts()
+        self._depth = 0
+        score = super().score_move(square)
+        if table != None:
+            self._counters.hits += table.get_hits() - hits
+            self._counters.misses += table.get_misses() - misses
+            self._counters.inserts += table.get_inserts() - inserts
+        return score
+
+    def _enter(self) -> None:
+        """Count a board being searched."""
+        counters = self._counters
+        counters.nodes += 1
+        self._depth += 1
+        if self._depth > counters.max_depth:
+            counters.max_depth = self._depth
+
+    def _minimax(self, last: int) -> int:
+        self._enter()
+        score = super()._minimax(last)
+        self._depth -= 1
+        return score
+
+    def _alphabeta(self, last: int, alpha: int, beta: int) -> int:
+        self._enter()
+        over = self._won(last) or self._empty == 0
+        score = super()._alphabeta(last, alpha, beta)
+        if score >= beta and not over:
+            self._counters.cutoffs += 1
+        self._depth -= 1
+        return score
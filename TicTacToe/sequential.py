@@ -0,0 +1,158 @@
+from __future__ import annotations
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+"""This module contains the stopping rules TicTacToe.test can use to
+end a test as soon as its result is conclusive, rather than always
+playing every game it was asked to.
+
+Classes:
+- SequentialTest
+
+Functions:
+- rate_interval(count: int, n: int,
+  confidence: float = 0.95) -> Tuple[float, float]
+"""
+
+# Reasons a SequentialTest can stop for
+NARROW = "narrow" # The interval is narrower than the width asked for
+ACCEPT_H0 = "H0" # The SPRT accepted that the difference is d0
+ACCEPT_H1 = "H1" # The SPRT accepted that the difference is d1
+
+def _z(confidence: float) -> float:
+    """Return the number of standard deviations either side of the
+    mean that a normal distribution has the confidence of lying in."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+def rate_interval(count: int, n: int,
+                  confidence: float = 0.95) -> Tuple[float, float]:
+    """Return the Wilson score interval for a rate, e.g. an AI's win
+    rate, given count successes in n games."""
+    if n == 0:
+        return (0.0, 1.0)
+    z = _z(confidence)
+    rate = count / n
+    centre = (rate + z*z / (2*n)) / (1 + z*z / n)
+    spread = (z / (1 + z*z / n)
+              * math.sqrt(rate * (1 - rate) / n + z*z / (4*n*n)))
+    return (max(centre - spread, 0.0), min(centre + spread, 1.0))
+
+class SequentialTest:
+    """A sequential test of the difference between O's and X's win
+    rates, which is the mean score of a game counting 1 for an O win,
+    -1 for an X win and 0 for a draw.
+
+    The games are added in batches, and after each batch the test says
+    whether to stop: either once the confidence interval of the
+    difference is narrower than width, or once a sequential probability
+    ratio test (SPRT) between the difference being d0 and it being d1
+    reaches a decision with error rates alpha and beta. Both use the
+    normal approximation to the mean score, with one O win and one X
+    win added to the counts (as in the Agresti-Caffo interval) so that
+    a run of draws doesn't look certain.
+
+    Public Methods:
+    - add(O_wins: int, X_wins: int, draws: int) -> None
+    - decide() -> Optional[str]
+    - get_counts() -> Tuple[int, int, int]
+    - get_games() -> int
+    - get_difference() -> float
+    - get_interval() -> Tuple[float, float]
+    - get_llr() -> float
+    - get_bounds() -> Tuple[float, float]
+    """
+
+    def __init__(self, width: Optional[float] = None,
+                 sprt: Optional[Tuple[float, float]] = None,
+                 confidence: float = 0.95, alpha: float = 0.05,
+                 beta: float = 0.05, min_games: int = 100) -> None:
+        """Initialise a test which stops when the interval is narrower
+        than width, or when the SPRT between the differences in sprt
+        decides, whichever comes first, but never before min_games
+        games."""
+        if width == None and sprt == None:
+            raise ValueError("No stopping rule specified.")
+        if width != None and width <= 0:
+            raise ValueError("Width must be positive.")
+        if sprt != None and sprt[0] >= sprt[1]:
+            raise ValueError("d0 must be less than d1.")
+        if not (0 < confidence < 1 and 0 < alpha < 1 and 0 < beta < 1):
+            raise ValueError("Probabilities must lie between 0 and 1.")
+        self._width = width
+        self._sprt = sprt
+        self._confidence = confidence
+        self._alpha = alpha
+        self._beta = beta
+        self._min_games = min_games
+        self._O_wins = 0
+        self._X_wins = 0
+        self._draws = 0
+
+    def add(self, O_wins: int, X_wins: int, draws: int) -> None:
+        """Add the results of a batch of games."""
+        self._O_wins += O_wins
+        self._X_wins += X_wins
+        self._draws += draws
+
+    def decide(self) -> Optional[str]:
+        """Return why the test should stop (NARROW, ACCEPT_H0 or
+        ACCEPT_H1), or None if more games are needed."""
+        if self.get_games() < self._min_games:
+            return None
+        if self._sprt != None:
+            lower, upper = self.get_bounds()
+            llr = self.get_llr()
+            if llr <= lower:
+                return ACCEPT_H0
+            if llr >= upper:
+                return ACCEPT_H1
+        if self._width != None:
+            low, high = self.get_interval()
+            if high - low <= self._width:
+                return NARROW
+        return None
+
+    def get_counts(self) -> Tuple[int, int, int]:
+        """Return the number of O wins, X wins and draws so far."""
+        return (self._O_wins, self._X_wins, self._draws)
+
+    def get_games(self) -> int:
+        """Return the number of games added so far."""
+        return self._O_wins + self._X_wins + self._draws
+
+    def get_difference(self) -> float:
+        """Return O's win rate less X's win rate so far."""
+        return (self._O_wins - self._X_wins) / max(self.get_games(), 1)
+
+    def get_interval(self) -> Tuple[float, float]:
+        """Return the confidence interval of the difference between
+        O's and X's win rates."""
+        mean, variance, n = self._estimate()
+        spread = _z(self._confidence) * math.sqrt(variance / n)
+        return (max(mean - spread, -1.0), min(mean + spread, 1.0))
+
+    def get_llr(self) -> float:
+        """Return the log-likelihood ratio of the difference being d1
+        rather than d0, or 0 if the test has no SPRT."""
+        if self._sprt == None:
+            return 0.0
+        d0, d1 = self._sprt
+        mean, variance, n = self._estimate()
+        return n * (d1 - d0) * (2*mean - d0 - d1) / (2*variance)
+
+    def get_bounds(self) -> Tuple[float, float]:
+        """Return the log-likelihood ratios at or beyond which the SPRT
+        accepts d0 and d1 respectively."""
+        return (math.log(self._beta / (1 - self._alpha)),
+                math.log((1 - self._beta) / self._alpha))
+
+    def _estimate(self) -> Tuple[float, float, int]:
+        """Return the mean and variance of the score of a game, and the
+        number of games they are estimated from, after adding one win
+        for each side."""
+        n = self.get_games() + 2
+        O_rate = (self._O_wins + 1) / n
+        X_rate = (self._X_wins + 1) / n
+        mean = O_rate - X_rate
+        return (mean, O_rate + X_rate - mean*mean, n)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+from bitboard import BitBoard
+from tictactoe import TicTacToe
+from tictactoe_ai import AIS, create_ai
+from transposition import TranspositionTable
+
+"""This module contains a server which hosts games of Tic Tac Toe
+between people and the AIs over TCP, and a client which puts it under
+load, as well as code for running either from the command line.
+
+The server speaks a line protocol. Each command is one line, and the
+server answers each one with one line:
+- NEW O|X: start a new game playing the specified piece. The answer is
+  PLAY if it is the player's move, or PLAY x y if the AI moved first.
+- MOVE x y: make a move. The answer is PLAY x y with the AI's reply,
+  or END O|X|DRAW, followed by the AI's last move if it ended the game.
+- BOARD: the answer is BOARD followed by the 9 squares, ordered by x
+  then y, as O, X or . for an empty square.
+- QUIT: the answer is BYE and the connection is closed.
+Anything else is answered with ERROR and a description, and changes
+nothing.
+
+Classes:
+- GameServer
+
+Functions:
+- load_test(host: str, port: int, sessions: int,
+  games: int) -> List[float]
+"""
+
+class _Session:
+    """A game between a person connected to the server and an AI.
+
+    The session keeps the board as a bitboard to check moves quickly,
+    and keeps the game's board in step for the AI to read.
+    """
+
+    def __init__(self, ai: str, tables: Dict[str, TranspositionTable]
+                 ) -> None:
+        self._game = TicTacToe()
+        self._ai = create_ai(ai, self._game, tables)
+        self._rules = BitBoard()
+        self._bits = (0, 0)
+        self._human = None # The piece the person plays, once started
+        self._over = False
+
+    def handle(self, line: str) -> str:
+        """Carry out the command and return the answer."""
+        words = line.split()
+        if not words:
+            return "ERROR empty command"
+        command = words[0].upper()
+        if command == "NEW" and len(words) == 2 and words[1] in ("O", "X"):
+            return self._new(words[1])
+        if command == "MOVE" and len(words) == 3:
+            try:
+                x, y = int(words[1]), int(words[2])
+            except ValueError:
+                return "ERROR coordinates must be integers"
+            return self._move(x, y)
+        if command == "BOARD" and len(words) == 1:
+            board = self._rules.to_board(self._bits)
+            return "BOARD " + "".join(board[x][y] or "."
+                                      for x in range(3) for y in range(3))
+        if command == "QUIT" and len(words) == 1:
+            return "BYE"
+        return f"ERROR unknown command {line.strip()}"
+
+    def _new(self, piece: str) -> str:
+        """Start a new game with the person playing piece."""
+        for x in range(3):
+            for y in range(3):
+                self._game.set_square(x, y, None)
+        self._game.set_turn("O")
+        self._bits = (0, 0)
+        self._human = piece
+        self._over = False
+        if piece == "O":
+            return "PLAY"
+        return self._ai_move()
+
+    def _move(self, x: int, y: int) -> str:
+        """Make the person's move and then the AI's."""
+        if self._human == None or self._over:
+            return "ERROR no game in progress"
+        if not (0 <= x <= 2 and 0 <= y <= 2):
+            return "ERROR square is off the board"
+        if self._game.get_square(x, y) != None:
+            return "ERROR square is taken"
+        result = self._play(x, y)
+        if result != None:
+            return f"END {result}"
+        return self._ai_move()
+
+    def _ai_move(self) -> str:
+        """Make the AI's move and return the answer telling the person
+        what it was."""
+        x, y = self._ai.find_move()
+        result = self._play(x, y)
+        if result != None:
+            return f"END {result} {x} {y}"
+        return f"PLAY {x} {y}"
+
+    def _play(self, x: int, y: int) -> Optional[str]:
+        """Make a move for whoever's turn it is and return the result
+        if it ended the game."""
+        turn = self._game.get_turn()
+        self._bits = self._rules.make_move(self._bits, x, y, turn)
+        self._game.set_square(x, y, turn)
+        self._game.set_turn("X" if turn == "O" else "O")
+        winner = self._rules.find_winner(self._bits)
+        if winner != None:
+            self._over = True
+            return winner
+        if self._rules.board_full(self._bits):
+            self._over = True
+            return "DRAW"
+        return None
+
+class _GameProtocol(asyncio.Protocol):
+    """A connection to the server, over which one person plays."""
+
+    MAX_LINE = 1024 # Longest command accepted, in bytes
+
+    def __init__(self, server: GameServer, session: _Session) -> None:
+        self._server = server
+        self._session = session
+        self._buffer = b""
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        self._server.connection_opened()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._server.connection_closed()
+
+    def data_received(self, data: bytes) -> None:
+        *lines, self._buffer = (self._buffer + data).split(b"\n")
+        answers = []
+        for line in lines:
+            answers.append(self._session.handle(
+                line.decode(errors="replace")))
+            if answers[-1] == "BYE":
+                break
+        if len(self._buffer) > self.MAX_LINE:
+            answers.append("ERROR command is too long")
+        if answers:
+            self._transport.write("\n".join(answers).encode() + b"\n")
+        if answers and answers[-1] in ("BYE", "ERROR command is too long"):
+            self._transport.close()
+
+class GameServer:
+    """A server hosting any number of games at once over TCP, one per
+    connection, all handled by a single asyncio event loop. Commands
+    are handled as soon as they arrive, without a task per connection.
+
+    Every game's AI is created with the same tables, so the AIs that
+    cache scores share one transposition table in the process, and the
+    solved AI looks its moves up in the solution table loaded once for
+    the process. Either way most moves are found in microseconds.
+
+    Public Methods:
+    - start() -> None
+    - get_port() -> int
+    - serve_forever() -> None
+    - close() -> None
+    - get_sessions() -> int
+    - connection_opened() -> None
+    - connection_closed() -> None
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 ai: str = "solved") -> None:
+        """Initialise a server for the named AI which will listen on
+        the host and port (0 picks any free port)."""
+        if ai not in AIS:
+            raise ValueError(f"Invalid AI {ai} specified.")
+        self._host = host
+        self._port = port
+        self._ai = ai
+        self._tables = {} # Caches shared by every game
+        self._server = None
+        self._sessions = 0 # Connections currently open
+
+    async def start(self) -> None:
+        """Start listening for connections."""
+        # Load any table the AI needs now rather than during a game
+        create_ai(self._ai, TicTacToe(), self._tables).find_move()
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _GameProtocol(self, _Session(self._ai, self._tables)),
+            self._host, self._port)
+
+    def get_port(self) -> int:
+        """Return the port the server is listening on."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Serve connections until the server is closed."""
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening for connections."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    def get_sessions(self) -> int:
+        """Return the number of connections currently open."""
+        return self._sessions
+
+    def connection_opened(self) -> None:
+        """Count a connection which has just been opened."""
+        self._sessions += 1
+
+    def connection_closed(self) -> None:
+        """Stop counting a connection which has just been closed."""
+        self._sessions -= 1
+
+async def _play_games(host: str, port: int, games: int,
+                      latencies: List[float]) -> None:
+    """Connect to the server and play games as O with random moves,
+    adding the time taken to answer each move to latencies."""
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(command: str) -> str:
+        writer.write(command.encode() + b"\n")
+        await writer.drain()
+        return (await reader.readline()).decode().strip()
+
+    try:
+        for i in range(games):
+            answer = await send("NEW O")
+            empty = [(x, y) for x in range(3) for y in range(3)]
+            while not answer.startswith("END"):
+                words = answer.split()
+                if len(words) == 3: # The AI moved
+                    empty.remove((int(words[1]), int(words[2])))
+                x, y = empty.pop(random.randrange(len(empty)))
+                start = time.perf_counter()
+                answer = await send(f"MOVE {x} {y}")
+                latencies.append(time.perf_counter() - start)
+                if answer.startswith("ERROR"):
+                    raise RuntimeError(f"Server answered {answer}.")
+        await send("QUIT")
+    finally:
+        writer.close()
+
+async def load_test(host: str, port: int, sessions: int,
+                    games: int) -> List[float]:
+    """Connect to the server the specified number of times at once and
+    play games with random moves on every connection. Return the time,
+    in seconds, taken to answer each move."""
+    latencies = []
+    await asyncio.gather(*[_play_games(host, port, games, latencies)
+                           for i in range(sessions)])
+    return latencies
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Return the specified percentile of the sorted values."""
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+async def _main(args: argparse.Namespace) -> None:
+    """Run the server or the load test from the command line."""
+    if args.load == None:
+        server = GameServer(args.host, args.port, args.ai)
+        await server.start()
+        print(f"Serving the {args.ai} AI on {args.host}:{server.get_port()}.")
+        await server.serve_forever()
+        return
+    server = None
+    port = args.port
+    if args.local: # Run a server in this process
+        server = GameServer(args.host, 0, args.ai)
+        await server.start()
+        port = server.get_port()
+    start = time.perf_counter()
+    latencies = sorted(await load_test(args.host, port, args.load,
+                                       args.games))
+    elapsed = time.perf_counter() - start
+    if server != None:
+        await server.close()
+    print(f"Played {args.load * args.games} games over {args.load} "
+          + f"connections in {elapsed:.2f}s "
+          + f"({len(latencies)/elapsed:.0f} moves/sec).")
+    print(f"Move latency: p50 {_percentile(latencies, 50)*1e6:.0f}us, "
+          + f"p99 {_percentile(latencies, 99)*1e6:.0f}us, "
+          + f"max {latencies[-1]*1e6:.0f}us.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Serve games against an AI, or put a server under load.")
+    parser.add_argument("-host", default="127.0.0.1",
+                        help="address to serve on or connect to")
+    parser.add_argument("-port", type=int, default=8765,
+                        help="port to serve on or connect to")
+    parser.add_argument("-ai", default="solved", choices=list(AIS),
+                        help="AI to play against")
+    parser.add_argument("-load", type=int, default=None, metavar="SESSIONS",
+                        help="instead of serving, play games on this many "
+                             + "connections at once and report latencies")
+    parser.add_argument("-games", type=int, default=10,
+                        help="games to play on each connection under load")
+    parser.add_argument("-local", action="store_true",
+                        help="run the server under load in this process")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import time
+import argparse
+from typing import Optional, Tuple
+
+import numpy as np
+
+from bitboard import Bits, BITS_OF, FULL, LINES, SQUARES
+
+"""This module contains a simulator which plays many games between the
+stochastic Tic Tac Toe AIs at once using NumPy, as well as code for
+running it from the command line.
+
+Classes:
+- LockstepSimulator
+"""
+
+# AIs the simulator can play, which match RandomAI, WinningAI and
+# WinningLosingAI
+SIMULATED = ("random", "winning", "winning-losing")
+
+# Pieces as they are stored in the boards
+EMPTY = 0
+O = 1
+X = -1
+
+SIZE = len(SQUARES) # Number of squares on the board
+
+# The bit of each square in a bitboard
+_BITS = np.array([1 << square for square in range(SIZE)],
+                 dtype=np.int16)
+# Whether the pieces of a player, as a bitboard, contain a line
+_WINNING = np.array([any(pieces & line == line for line in LINES)
+                     for pieces in range(FULL + 1)])
+# The kth set square of each bitboard, for picking the kth empty square
+_KTH_SQUARE = np.zeros((FULL + 1, SIZE), dtype=np.int8)
+for mask in range(FULL + 1):
+    _KTH_SQUARE[mask, :len(BITS_OF[mask])] = BITS_OF[mask]
+# Each of the 24 ways to complete a line: the square to play and the two
+# squares that must already hold the player's pieces
+_THREATS = np.array([(BITS_OF[line][i], BITS_OF[line][i - 1],
+                      BITS_OF[line][i - 2])
+                     for line in LINES for i in range(3)])
+# Maps each way to complete a line onto the square played
+_THREAT_SQUARES = np.zeros((len(_THREATS), SIZE), dtype=np.int8)
+_THREAT_SQUARES[np.arange(len(_THREATS)), _THREATS[:, 0]] = 1
+
+class LockstepSimulator:
+    """A simulator which holds many games in an (N, 9) int8 array, one
+    row per game and one column per square, and plays a move in every
+    unfinished game at once.
+
+    The AIs play as the AI classes of the same name do: a winning move
+    is the first one in row-major order, a blocking move the last one,
+    and a random move is equally likely to be any empty square. As
+    every game has the same player to move at each step, a batch of
+    games is over after at most nine steps.
+
+    Public Methods:
+    - play(n: int) -> Tuple[int, int, int]
+    - play_from(bits: Bits, turn: str, n: int) -> Tuple[int, int, int]
+    - test(n: int) -> None
+    """
+
+    def __init__(self, ai_O: str, ai_X: str, seed: Optional[int] = None,
+                 batch: int = 100000) -> None:
+        """Initialise a simulator playing the named AIs against each
+        other, with at most batch games held in memory at once."""
+        for name in (ai_O, ai_X):
+            if name not in SIMULATED:
+                raise ValueError(f"AI {name} cannot be simulated.")
+        if batch < 1:
+            raise ValueError("Batch size must be positive.")
+        self._ais = {O: ai_O, X: ai_X}
+        self._batch = batch
+        self._rng = np.random.default_rng(seed)
+
+    def play(self, n: int) -> Tuple[int, int, int]:
+        """Play n games and return the number of O wins, X wins and
+        draws."""
+        return self.play_from((0, 0), "O", n)
+
+    def play_from(self, bits: Bits, turn: str,
+                  n: int) -> Tuple[int, int, int]:
+        """Play n games on from the position given as a bitboard, where
+        it is turn's move, and return the number of O wins, X wins and
+        draws."""
+        row = np.zeros(SIZE, dtype=np.int8)
+        row[list(BITS_OF[bits[0]])] = O
+        row[list(BITS_OF[bits[1]])] = X
+        ply = len(BITS_OF[bits[0] | bits[1]])
+        O_wins = 0
+        X_wins = 0
+        for start in range(0, n, self._batch):
+            boards = np.tile(row, (min(self._batch, n - start), 1))
+            winners = self._play_batch(boards, O if turn == "O" else X,
+                                       ply)
+            O_wins += int(np.count_nonzero(winners == O))
+            X_wins += int(np.count_nonzero(winners == X))
+        return (O_wins, X_wins, n - O_wins - X_wins)
+
+    def test(self, n: int) -> None:
+        """Play n games and print the results to the terminal in the
+        same form as TicTacToe.test."""
+        O_wins, X_wins, draws = self.play(n)
+        print(f"O won {O_wins} times, X won {X_wins} times and there were "+
+              f"{draws} draws.")
+        print(f"O had a win rate of {O_wins/n*100:.2f}%, X had a win rate of "
+              + f"{X_wins/n*100:.2f}% and the draw rate was "
+              + f"{draws/n*100:.2f}%.")
+
+    def _play_batch(self, boards: np.ndarray, turn: int,
+                    ply: int) -> np.ndarray:
+        """Play the games on the boards, where it is turn's move and
+        ply moves have been made, and return the winner of each one (O,
+        X or EMPTY for a draw). The boards must not be won already."""
+        winners = np.zeros(len(boards), dtype=np.int8)
+        games = np.arange(len(boards)) # Which game each row holds
+        for ply in range(ply, SIZE):
+            squares = self._choose(boards, self._ais[turn], turn, ply)
+            boards[np.arange(len(games)), squares] = turn
+            if ply >= 4: # Nobody can have three in a row before then
+                pieces = (boards == turn).astype(np.int16) @ _BITS
+                won = _WINNING[pieces]
+                winners[games[won]] = turn
+                # Only keep the games which are still going
+                boards = boards[~won]
+                games = games[~won]
+            turn = -turn
+        return winners
+
+    def _choose(self, boards: np.ndarray, ai: str, turn: int,
+                ply: int) -> np.ndarray:
+        """Return the square the AI plays in each of the boards when it
+        is turn's move and ply moves have been made."""
+        # A uniformly random empty square: every board has the same
+        # number of empty squares, so pick the kth of them at random
+        kth = self._rng.integers(0, SIZE - ply, len(boards))
+        empty = (boards == EMPTY).astype(np.int16) @ _BITS
+        squares = _KTH_SQUARE[empty, kth]
+        # Lines can only be completed once a player has two pieces,
+        # i.e. from the fourth move for the opponent's and fifth for
+        # the AI's
+        if ai == "winning-losing" and ply >= 3:
+            blocks = self._completing(boards, -turn)
+            # argmax finds the first True, so search the squares in
+            # reverse to find the last one
+            last = SIZE - 1 - blocks[:, ::-1].argmax(axis=1)
+            squares = np.where(blocks.any(axis=1), last, squares)
+        if ai in ("winning", "winning-losing") and ply >= 4:
+            wins = self._completing(boards, turn)
+            squares = np.where(wins.any(axis=1), wins.argmax(axis=1),
+                               squares)
+        return squares
+
+    def _completing(self, boards: np.ndarray, piece: int) -> np.ndarray:
+        """Return an (N, 9) array saying which squares complete a line
+        for piece in each of the boards."""
+        threats = ((boards[:, _THREATS[:, 0]] == EMPTY)
+                   & (boards[:, _THREATS[:, 1]] == piece)
+                   & (boards[:, _THREATS[:, 2]] == piece))
+        return threats.astype(np.int8) @ _THREAT_SQUARES > 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Play many games between the stochastic AIs at once.")
+    parser.add_argument("ai_O", choices=SIMULATED, help="AI playing O")
+    parser.add_argument("ai_X", choices=SIMULATED, help="AI playing X")
+    parser.add_argument("-games", type=int, default=1000000,
+                        help="number of games to play")
+    parser.add_argument("-seed", type=int, default=None,
+                        help="seed for reproducible results")
+    parser.add_argument("-batch", type=int, default=100000,
+                        help="number of games to play at once")
+    args = parser.parse_args()
+
+    simulator = LockstepSimulator(args.ai_O, args.ai_X, args.seed,
+                                  args.batch)
+    start = time.perf_counter()
+    simulator.test(args.games)
+    elapsed = time.perf_counter() - start
+    print(f"Played {args.games} games in {elapsed:.2f}s "
+          + f"({args.games/elapsed:.0f} games/sec).")
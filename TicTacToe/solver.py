@@ -0,0 +1,198 @@
+from __future__ import annotations
+import os
+import sys
+import argparse
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from bitboard import BitBoard, Bits, FULL, position_index
+
+"""This module contains an offline solver for Tic Tac Toe which
+stores the minimax value and set of best moves of every reachable
+position in a compact binary table, as well as code for building the
+table from the command line.
+
+Classes:
+- SolutionTable
+
+Functions:
+- side_to_move(bits: Bits) -> str
+- reachable_positions(terminal: bool = False) -> List[Tuple[Bits, str]]
+- get_table(path: str = DEFAULT_PATH) -> SolutionTable
+"""
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "solution.bin")
+
+MAGIC = b"TTTS"
+VERSION = 1
+POSITIONS = 3**9 # Number of base 3 position indices
+UNREACHABLE = 0xFFFF # Record for positions that cannot occur in a game
+
+def side_to_move(bits: Bits) -> str:
+    """Return whose turn it is on a bitboard, given O moves first."""
+    if bin(bits[0]).count("1") == bin(bits[1]).count("1"):
+        return "O"
+    return "X"
+
+def reachable_positions(terminal: bool = False) -> List[Tuple[Bits, str]]:
+    """Return every position that can occur in a game, and whose turn
+    it is, in the order a depth-first search from the empty board first
+    reaches them. Positions where the game is over are only included if
+    terminal is True."""
+    rules = BitBoard()
+    seen = set()
+    positions = []
+
+    def visit(bits: Bits, turn: str) -> None:
+        if bits in seen:
+            return
+        seen.add(bits)
+        over = rules.find_winner(bits) != None or rules.board_full(bits)
+        if terminal or not over:
+            positions.append((bits, turn))
+        if over:
+            return
+        next_turn = "X" if turn == "O" else "O"
+        for x, y in rules.legal_moves(bits):
+            visit(rules.make_move(bits, x, y, turn), next_turn)
+
+    visit((0, 0), "O")
+    return positions
+
+class SolutionTable:
+    """A table holding the solution of every reachable Tic Tac Toe
+    position.
+
+    Each position is stored as a 16 bit record at its base 3 index.
+    The low 9 bits are the mask of best moves (see bitboard.py for the
+    square ordering) and the next 2 bits are the minimax value plus
+    one, where the value is 1 if the side to move wins, 0 for a draw
+    and -1 for a loss. The best moves are the moves PerfectAI considers
+    equally good, so its move is the lowest square in the mask.
+
+    Public Methods:
+    - solve() -> SolutionTable
+    - load(path: str) -> SolutionTable
+    - save(path: str) -> None
+    - lookup(bits: Bits, turn: str) -> Optional[Tuple[int, int]]
+    - __len__() -> int
+    """
+
+    def __init__(self, records: array) -> None:
+        """Initialise a table from an array of POSITIONS records."""
+        if len(records) != POSITIONS:
+            raise ValueError("Table has the wrong number of records.")
+        self._records = records
+
+    @classmethod
+    def solve(cls) -> SolutionTable:
+        """Solve every position reachable from the empty board and
+        return the resulting table."""
+        records = array("H", [UNREACHABLE]) * POSITIONS
+        rules = BitBoard()
+
+        def solve_position(bits: Bits, turn: str) -> int:
+            """Fill in the record for the position and return its
+            minimax value for the side to move."""
+            index = position_index(bits)
+            if records[index] != UNREACHABLE:
+                return (records[index] >> 9) - 1
+            winner = rules.find_winner(bits)
+            empty = FULL & ~(bits[0] | bits[1])
+            if winner != None:
+                # Every move leaves the game already decided
+                value = 1 if winner == turn else -1
+                best = empty
+            elif empty == 0:
+                value = 0
+                best = 0
+            else:
+                next_turn = "X" if turn == "O" else "O"
+                value = -2
+                best = 0
+                for i in range(9):
+                    bit = 1 << i
+                    if not empty & bit:
+                        continue
+                    if turn == "O":
+                        child = (bits[0] | bit, bits[1])
+                    else:
+                        child = (bits[0], bits[1] | bit)
+                    score = -solve_position(child, next_turn)
+                    if score > value:
+                        value = score
+                        best = bit
+                    elif score == value:
+                        best |= bit
+            records[index] = (value + 1) << 9 | best
+            return value
+
+        solve_position((0, 0), "O")
+        return cls(records)
+
+    @classmethod
+    def load(cls, path: str) -> SolutionTable:
+        """Load a table that was saved to the specified path."""
+        with open(path, "rb") as f:
+            header = f.read(len(MAGIC) + 1)
+            if len(header) != len(MAGIC) + 1 or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a solution table.")
+            if header[len(MAGIC)] != VERSION:
+                raise ValueError(f"{path} has an unsupported version.")
+            records = array("H")
+            try:
+                records.fromfile(f, POSITIONS)
+            except EOFError:
+                raise ValueError(f"{path} is truncated.") from None
+        if sys.byteorder == "big": # Tables are stored little endian
+            records.byteswap()
+        return cls(records)
+
+    def save(self, path: str) -> None:
+        """Save the table to the specified path."""
+        records = array("H", self._records)
+        if sys.byteorder == "big":
+            records.byteswap()
+        with open(path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION]))
+            records.tofile(f)
+
+    def lookup(self, bits: Bits, turn: str) -> Optional[Tuple[int, int]]:
+        """Return the minimax value and mask of best moves of the
+        position for the player whose turn it is; return None if the
+        position cannot occur in a game."""
+        if turn != side_to_move(bits):
+            return None
+        record = self._records[position_index(bits)]
+        if record == UNREACHABLE:
+            return None
+        return ((record >> 9) - 1, record & FULL)
+
+    def __len__(self) -> int:
+        """Return the number of reachable positions in the table."""
+        return POSITIONS - self._records.count(UNREACHABLE)
+
+# Tables which have been loaded, keyed by the path they were loaded from
+_tables: Dict[str, SolutionTable] = {}
+
+def get_table(path: str = DEFAULT_PATH) -> SolutionTable:
+    """Return the table saved at the specified path, loading it the
+    first time it is requested. If there is no table at the path, the
+    positions are solved in memory instead."""
+    if path not in _tables:
+        if os.path.exists(path):
+            _tables[path] = SolutionTable.load(path)
+        else:
+            _tables[path] = SolutionTable.solve()
+    return _tables[path]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Solve every reachable Tic Tac Toe position.")
+    parser.add_argument("-o", "--output", default=DEFAULT_PATH,
+                        help="where to save the solution table")
+    args = parser.parse_args()
+    table = SolutionTable.solve()
+    table.save(args.output)
+    print(f"Solved {len(table)} positions and saved them to {args.output}.")
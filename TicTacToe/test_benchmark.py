@@ -0,0 +1,68 @@
+import os
+import json
+import unittest
+import tempfile
+
+from benchmark import Benchmark
+from solver import reachable_positions
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        # The empty board and a handful of positions after it
+        self.positions = reachable_positions()[:20]
+        self.benchmark = Benchmark(["random", "alpha-beta", "quick-perfect"],
+                                   positions=self.positions)
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            Benchmark(["random", "unknown"])
+        with self.assertRaises(ValueError):
+            Benchmark(["random"], repeat=0)
+
+    def test_run(self):
+        self.benchmark.run()
+        results = self.benchmark.get_results()
+        self.assertEqual(results["positions"], 20)
+        for name, ai in results["ais"].items():
+            self.assertEqual(len(ai["positions"]), 20)
+            self.assertEqual(ai["summary"]["nodes"],
+                             sum(r["nodes"] for r in ai["positions"]))
+        self.assertEqual(results["ais"]["random"]["summary"]["nodes"], 0)
+        alpha_beta = results["ais"]["alpha-beta"]["summary"]
+        quick = results["ais"]["quick-perfect"]["summary"]
+        self.assertEqual(alpha_beta["hits"], 0)
+        self.assertGreater(quick["hits"], 0)
+        # Caching means fewer nodes are searched
+        self.assertLess(quick["nodes"], alpha_beta["nodes"])
+        # Everything but the timings is the same from run to run
+        benchmark = Benchmark(["alpha-beta"], positions=self.positions)
+        benchmark.run()
+        self.assertEqual(
+            [r["nodes"] for r in results["ais"]["alpha-beta"]["positions"]],
+            [r["nodes"] for r in
+             benchmark.get_results()["ais"]["alpha-beta"]["positions"]])
+
+    def test_save(self):
+        self.benchmark.run()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "benchmark.json")
+            self.benchmark.save(path)
+            with open(path) as f:
+                saved = json.load(f)
+        self.assertEqual(saved, self.benchmark.get_results())
+
+    def test_compare(self):
+        self.benchmark.run()
+        results = self.benchmark.get_results()
+        self.assertEqual(Benchmark.compare(results, results), [])
+        # Halve the baseline's time and nodes for one AI
+        baseline = json.loads(json.dumps(results))
+        summary = baseline["ais"]["alpha-beta"]["summary"]
+        summary["time"] /= 2
+        summary["nodes"] //= 2
+        regressions = Benchmark.compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(r.startswith("alpha-beta") for r in regressions))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from bitboard import BitBoard, Snapshot
+from tictactoe import TicTacToe
+
+class TestBitBoardMethods(unittest.TestCase):
+    def setUp(self):
+        self.game = TicTacToe()
+        self.bitboard = BitBoard()
+
+    def test_from_board(self):
+        board = [["O", "X", None],
+                 [None, "O", None],
+                 ["X", None, "O"]]
+        bits = self.bitboard.from_board(board)
+        # Square (x, y) is bit 3*x + y
+        self.assertEqual(bits, (0b100010001, 0b001000010))
+        self.assertEqual(self.bitboard.to_board(bits), board)
+
+    def test_make_move(self):
+        # Valid move
+        bits = self.bitboard.make_move((0, 0), 0, 0, "O")
+        self.assertEqual(bits, (1, 0))
+        bits = self.bitboard.make_move(bits, 2, 1, "X")
+        self.assertEqual(self.bitboard.get_square(bits, 2, 1), "X")
+        # Invalid move - square already occupied
+        self.assertEqual(self.bitboard.make_move(bits, 0, 0, "X"), ())
+        # Invalid move - invalid square specified
+        self.assertEqual(self.bitboard.make_move(bits, 3, 3, "X"), ())
+
+    def test_matches_list_board(self):
+        boards = [[["O", "X", None], [None, "O", None], ["X", None, "O"]],
+                  [["O", None, "O"], [None, "O", None], ["X", "X", "X"]],
+                  [["O", "X", "O"], ["O", "X", "X"], ["O", "O", "X"]],
+                  [["O", "X", "O"], [None, "X", "X"], [None, "O", None]],
+                  [["O", "O", "X"], ["X", "X", "O"], ["O", "X", "O"]]]
+        for board in boards:
+            bits = self.bitboard.from_board(board)
+            self.assertEqual(self.bitboard.find_winner(bits),
+                             self.game.find_winner(board))
+            self.assertEqual(self.bitboard.board_full(bits),
+                             self.game.board_full(board))
+            self.assertEqual(self.bitboard.legal_moves(bits),
+                             self.game.legal_moves(board))
+
+    def test_symmetries(self):
+        board = [["O", "X", None],
+                 [None, None, None],
+                 [None, None, None]]
+        bits = self.bitboard.from_board(board)
+        symmetries = self.bitboard.symmetries(bits)
+        self.assertEqual(len(set(symmetries)), 8)
+        # Rotating 90 degrees clockwise moves (0,0) to (2,0)
+        self.assertEqual(self.bitboard.get_square(symmetries[1], 2, 0), "O")
+        self.assertEqual(self.bitboard.get_square(symmetries[1], 1, 0), "X")
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.bitboard = BitBoard()
+
+    def test_views(self):
+        # The views match the board methods in every position
+        game = TicTacToe()
+        for o in range(0b111111111 + 1):
+            for x in (0, 0b100010000, 0b000000110):
+                if o & x:
+                    continue
+                bits = (o, x)
+                snapshot = Snapshot(bits, "O")
+                self.assertEqual(list(snapshot.get_empty()),
+                                 self.bitboard.legal_moves(bits))
+                self.assertEqual(snapshot.get_winner(),
+                                 self.bitboard.find_winner(bits))
+                self.assertEqual(snapshot.is_over(),
+                                 self.bitboard.find_winner(bits) != None
+                                 or self.bitboard.board_full(bits))
+
+    def test_play(self):
+        snapshot = Snapshot((0, 0), "O").play(1, 1)
+        self.assertEqual(snapshot, Snapshot((0b000010000, 0), "X"))
+        snapshot = snapshot.play(0, 2)
+        self.assertEqual(snapshot, Snapshot((0b000010000, 0b100), "O"))
+        self.assertEqual(len(snapshot.get_empty()), 7)
+        for x, y in [(1, 1), (3, 0), (-1, 0)]:
+            with self.assertRaises(ValueError):
+                snapshot.play(x, y)
+        # Snapshots are immutable
+        with self.assertRaises(AttributeError):
+            snapshot.turn = "X"
+
+if __name__ == '__main__':
+    unittest.main()
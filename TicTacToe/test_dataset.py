@@ -0,0 +1,98 @@
+import os
+import unittest
+import tempfile
+
+from bitboard import BitBoard, position_index
+from dataset import HEADER, MAGIC, PositionDataset
+from solver import reachable_positions
+from tictactoe import TicTacToe
+from tictactoe_ai import PerfectAI, other_factors
+try:
+    import numpy as np
+except ImportError: # NumPy is not installed
+    np = None
+
+class TestPositionDataset(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = PositionDataset.build()
+
+    def setUp(self):
+        self.bitboard = BitBoard()
+
+    def test_build(self):
+        positions = reachable_positions(terminal=True)
+        self.assertEqual(len(self.dataset), len(positions))
+        self.assertEqual(sorted(position_index(bits) for bits, turn
+                                in positions),
+                         [position_index(label[0])
+                          for label in self.dataset])
+        # The empty board is a draw and every move keeps the draw
+        self.assertEqual(self.dataset[0], ((0, 0), "O", 0, 0b111111111, 0))
+
+    def test_labels(self):
+        game = TicTacToe()
+        perfect = PerfectAI(game)
+        for bits, turn, value, best, factors in list(self.dataset)[::7]:
+            board = self.bitboard.to_board(bits)
+            mover = "X" if turn == "O" else "O"
+            self.assertEqual(factors, other_factors(bits, mover))
+            over = (self.bitboard.find_winner(bits) != None
+                    or self.bitboard.board_full(bits))
+            self.assertEqual(best == 0, over)
+            if over:
+                continue
+            # The optimal moves are the moves PerfectAI scores best
+            game._board = board
+            game._turn = turn
+            perfect._core.set_position(bits, turn)
+            scores = {square: perfect._core.score_move(square)
+                      for square in range(9)
+                      if not (bits[0] | bits[1]) >> square & 1}
+            self.assertEqual(10 * value, max(scores.values()))
+            self.assertEqual(best, sum(1 << square for square in scores
+                                       if scores[square] == 10 * value))
+            self.assertTrue(best >> (3*perfect.find_move()[0]
+                                     + perfect.find_move()[1]) & 1)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "positions.bin")
+            self.dataset.save(path)
+            self.assertEqual(os.path.getsize(path),
+                             12 + 8 * len(self.dataset))
+            loaded = PositionDataset.load(path)
+            self.assertEqual(list(loaded), list(self.dataset))
+            with open(path, "wb") as f:
+                f.write(b"junk")
+            with self.assertRaises(ValueError):
+                PositionDataset.load(path)
+            # Version 1 scored other_factors differently
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, 1, 0))
+            with self.assertRaises(ValueError):
+                PositionDataset.load(path)
+
+    @unittest.skipIf(np == None, "NumPy is not installed")
+    def test_save_npz(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "positions.npz")
+            self.dataset.save_npz(path)
+            with np.load(path) as arrays:
+                arrays = dict(arrays)
+        self.assertEqual(arrays["board"].shape, (len(self.dataset), 9))
+        for i in (0, 100, len(self.dataset) - 1):
+            bits, turn, value, best, factors = self.dataset[i]
+            self.assertEqual(list(arrays["board"][i]),
+                             [1 if bits[0] >> square & 1 else
+                              -1 if bits[1] >> square & 1 else 0
+                              for square in range(9)])
+            self.assertEqual(arrays["side"][i], 1 if turn == "O" else -1)
+            self.assertEqual(arrays["value"][i], value)
+            self.assertEqual(list(arrays["optimal"][i]),
+                             [bool(best >> square & 1)
+                              for square in range(9)])
+            self.assertEqual(arrays["other_factors"][i], factors)
+
+if __name__ == '__main__':
+    unittest.main()
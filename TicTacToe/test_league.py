@@ -0,0 +1,57 @@
+import os
+import json
+import unittest
+import tempfile
+
+from league import DEFAULT_AIS, League
+
+class TestLeague(unittest.TestCase):
+    def setUp(self):
+        self.league = League(["random", "winning-losing", "perfect"], 20)
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            League(["random", "unknown"], 20)
+        with self.assertRaises(ValueError):
+            League(["random"], 20)
+        # The slow AIs are left out unless asked for
+        self.assertNotIn("mcts", DEFAULT_AIS)
+        self.assertNotIn("learned", DEFAULT_AIS)
+        self.assertIn("ultimate", DEFAULT_AIS)
+
+    def test_play(self):
+        self.league.play(seed=1)
+        results = self.league.get_results()
+        for a in results:
+            for b in results[a]:
+                # Each AI plays the other 20 times as O and 20 times as X
+                self.assertEqual(sum(results[a][b].values()), 40)
+                self.assertEqual(results[a][b]["wins"],
+                                 results[b][a]["losses"])
+        self.assertEqual(results["perfect"]["random"]["losses"], 0)
+        # Same seed gives the same results, whether or not the pairings
+        # are played in parallel
+        league = League(["random", "winning-losing", "perfect"], 20)
+        league.play(workers=2, seed=1)
+        self.assertEqual(league.get_results(), results)
+
+    def test_ratings(self):
+        self.league.play(seed=1)
+        ratings = self.league.get_ratings()
+        self.assertAlmostEqual(sum(ratings.values()) / 3, 1500)
+        self.assertGreater(ratings["perfect"], ratings["winning-losing"])
+        self.assertGreater(ratings["winning-losing"], ratings["random"])
+
+    def test_save(self):
+        self.league.play(seed=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "league.json")
+            self.league.save(path)
+            with open(path) as f:
+                saved = json.load(f)
+        self.assertEqual(len(saved["pairings"]), 6)
+        self.assertEqual(saved["results"], self.league.get_results())
+        self.assertEqual(saved["ratings"], self.league.get_ratings())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import unittest
+import tempfile
+from array import array
+
+from bitboard import BitBoard
+from learner import POSITIONS, SelfPlayTrainer, ValueTable, np
+from tictactoe import TicTacToe
+from tictactoe_ai import LearnedAI
+
+class TestValueTable(unittest.TestCase):
+    def test_save_and_load(self):
+        values = array("f", (i / 64 for i in range(POSITIONS)))
+        table = ValueTable(values)
+        # O in the centre is base 3 index 3**4
+        self.assertEqual(table.get((1 << 4, 0)), 81 / 64)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "values.bin")
+            table.save(path)
+            self.assertEqual(ValueTable.load(path)._values, values)
+            with open(path, "r+b") as f:
+                f.truncate(100)
+            with self.assertRaises(ValueError):
+                ValueTable.load(path)
+            with open(path, "wb") as f:
+                f.write(b"junk")
+            with self.assertRaises(ValueError):
+                ValueTable.load(path)
+        with self.assertRaises(ValueError):
+            ValueTable(array("f", [0.0]))
+
+@unittest.skipIf(np == None, "NumPy is not installed")
+class TestSelfPlayTrainer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.trainer = SelfPlayTrainer(seed=0)
+        cls.rate = cls.trainer.train(200000)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "values.bin")
+        cls.trainer.get_values().save(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.game = TicTacToe()
+        self.bitboard = BitBoard()
+
+    def test_train(self):
+        self.assertGreater(self.rate, 0)
+        values = self.trainer.get_values()
+        # A completed line is a win for the player who moved into it
+        self.assertGreater(values.get((0b111, 0b11000)), 0.5)
+        with self.assertRaises(ValueError):
+            SelfPlayTrainer(batch=0)
+
+    def worst_result(self, ai, bits, turn, me):
+        """Return the worst result the AI, playing me, can get from the
+        position against any replies: 1 for a win, 0 for a draw and -1
+        for a loss."""
+        winner = self.bitboard.find_winner(bits)
+        if winner != None:
+            return 1 if winner == me else -1
+        if self.bitboard.board_full(bits):
+            return 0
+        other = "X" if turn == "O" else "O"
+        if turn == me:
+            self.game._board = self.bitboard.to_board(bits)
+            self.game._turn = turn
+            x, y = ai.find_move()
+            return self.worst_result(
+                ai, self.bitboard.make_move(bits, x, y, turn), other, me)
+        return min(self.worst_result(
+                       ai, self.bitboard.make_move(bits, x, y, turn),
+                       other, me)
+                   for x, y in self.bitboard.legal_moves(bits))
+
+    def test_learned_ai(self):
+        # The learned AI never loses, whatever its opponent plays
+        ai = LearnedAI(self.game, path=self.path)
+        for me in ("O", "X"):
+            self.assertEqual(self.worst_result(ai, (0, 0), "O", me), 0)
+        self.game._board = self.bitboard.to_board((0b101010110,
+                                                   0b010101001))
+        self.assertEqual(ai.find_move(), None)
+
+if __name__ == '__main__':
+    unittest.main()
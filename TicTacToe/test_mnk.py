@@ -0,0 +1,160 @@
+import time
+import unittest
+
+from mnk import MNKGame, DeepeningAI
+from ordering import HeuristicOrdering
+from tictactoe_ai import LearnedAI, MCTSAI, QuickPerfectAI, RandomAI
+from transposition import TranspositionTable, new_table
+
+class TestMNKGameMethods(unittest.TestCase):
+    def setUp(self):
+        self.game = MNKGame(4, 4, 4)
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            MNKGame(0, 3, 3)
+        with self.assertRaises(ValueError):
+            MNKGame(3, 3, 4)
+        self.assertEqual(MNKGame(15, 15, 5).get_width(), 15)
+
+    def test_make_move(self):
+        board = self.game.make_move(self.game._board, 3, 3, "O")
+        self.assertEqual(board[3][3], "O")
+        self.assertEqual(self.game.make_move(board, 3, 3, "X"), [])
+        self.assertEqual(self.game.make_move(board, 4, 0, "X"), [])
+
+    def test_find_winner(self):
+        board = self.game._new_board()
+        for i in range(3):
+            board[i][i] = "X"
+        self.assertEqual(self.game.find_winner(board), None)
+        board[3][3] = "X"
+        self.assertEqual(self.game.find_winner(board), "X")
+        # Only lines through the specified square are checked
+        self.assertEqual(self.game.find_winner_at(board, 2, 2), "X")
+        self.assertEqual(self.game.find_winner_at(board, 0, 1), None)
+        board = self.game._new_board()
+        for y in range(4):
+            board[1][y] = "O"
+        self.assertEqual(self.game.find_winner_at(board, 1, 2), "O")
+
+    def test_get_lines(self):
+        # 4 columns, 4 rows and 2 diagonals
+        self.assertEqual(len(self.game.get_lines()), 10)
+        # 15x15 board with k=5: 2*15*11 straight lines, 2*11*11 diagonals
+        self.assertEqual(len(MNKGame(15, 15, 5).get_lines()), 572)
+
+    def test_no_bitboards(self):
+        # Only Tic Tac Toe has bitboards, so AIs can't be asked to use
+        # them on other boards
+        self.assertFalse(hasattr(self.game, "get_bitboard"))
+        with self.assertRaises(ValueError):
+            RandomAI(self.game, bitboard=True)
+        self.assertIn(RandomAI(self.game).find_move(),
+                      self.game.legal_moves(self.game.get_board()))
+
+    def test_no_snapshots(self):
+        # The AIs which play from snapshots only play Tic Tac Toe, even
+        # on a 3x3 board
+        game = MNKGame()
+        self.assertFalse(hasattr(game, "get_snapshot"))
+        for ai in (QuickPerfectAI, MCTSAI, LearnedAI):
+            with self.assertRaises(ValueError):
+                ai(game)
+
+class TestDeepeningAI(unittest.TestCase):
+    def test_plays_tictactoe_perfectly(self):
+        game = MNKGame()
+        game._board = [["O", "X", "O"],
+                       [None, "X", "X"],
+                       [None, "O", None]]
+        game._turn = "O"
+        self.assertEqual(DeepeningAI(game).find_move(), (1, 0))
+        game._board = [["O", None, None],
+                       [None, None, None],
+                       [None, None, None]]
+        game._turn = "X"
+        self.assertEqual(DeepeningAI(game).find_move(), (1, 1))
+
+    def test_winning_and_blocking(self):
+        game = MNKGame(5, 5, 4)
+        for y in range(3):
+            game.set_square(0, y, "O")
+            game.set_square(4, y + 1, "X")
+        game._turn = "O"
+        self.assertEqual(DeepeningAI(game, 1.0).find_move(), (0, 3))
+        # Stop X from winning so that it must block O's three in a row
+        game.set_square(4, 0, "O")
+        game.set_square(4, 4, "O")
+        game._turn = "X"
+        self.assertEqual(DeepeningAI(game, 1.0).find_move(), (0, 3))
+
+    def test_table(self):
+        # The AI finds the same moves with a table, bounded or not
+        game = MNKGame()
+        game._board = [["O", "X", "O"],
+                       [None, "X", "X"],
+                       [None, "O", None]]
+        game._turn = "O"
+        for table in (TranspositionTable(), new_table("lru", entries=64),
+                      new_table("depth", entries=64)):
+            ai = DeepeningAI(game, table=table)
+            self.assertEqual(ai.find_move(), (1, 0))
+            self.assertIs(ai.get_table(), table)
+        game = MNKGame(4, 4, 4)
+        game.set_square(0, 0, "O")
+        game._turn = "X"
+        table = new_table("depth", entries=256)
+        move = DeepeningAI(game, 10.0, max_depth=4).find_move()
+        ai = DeepeningAI(game, 10.0, max_depth=4, table=table)
+        self.assertEqual(ai.find_move(), move)
+        self.assertGreater(table.get_hits(), 0)
+        self.assertLessEqual(len(table), 256)
+        # AIs searching in different orders hash boards the same way,
+        # so they can share a table
+        ordered = DeepeningAI(game, ordering=HeuristicOrdering())
+        ordered.find_move()
+        self.assertEqual(ordered._zobrist, DeepeningAI(game)._zobrist)
+        self.assertEqual(len(ordered._zobrist), 4 * 4 * 2)
+
+    def test_ordering(self):
+        # Wins are still found, and killer moves and history cut the
+        # nodes searched
+        game = MNKGame(5, 5, 4)
+        for y in range(3):
+            game.set_square(0, y, "O")
+            game.set_square(4, y + 1, "X")
+        game._turn = "O"
+        ai = DeepeningAI(game, ordering=HeuristicOrdering())
+        self.assertEqual(ai.find_move(), (0, 3))
+        game = MNKGame(4, 4, 4)
+        game.set_square(1, 1, "O")
+        game.set_square(2, 1, "X")
+        game._turn = "O"
+        nodes = []
+        for ordering in (None, HeuristicOrdering()):
+            ai = DeepeningAI(game, 10.0, max_depth=4, ordering=ordering)
+            ai.instrument()
+            ai.find_move()
+            nodes.append(ai.get_stats()[0]["nodes"])
+            self.assertEqual(ai.get_stats()[0]["max_depth"], 4)
+        self.assertLess(nodes[1], nodes[0])
+
+    def test_time_limit(self):
+        game = MNKGame(15, 15, 5)
+        game.set_square(7, 7, "O")
+        game.set_square(8, 8, "X")
+        game._turn = "O"
+        ai = DeepeningAI(game, 0.2)
+        start = time.perf_counter()
+        move = ai.find_move()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(game.get_square(*move) == None)
+        self.assertGreaterEqual(ai.get_depth(), 1)
+        # Depth limit
+        ai = DeepeningAI(game, 5.0, max_depth=1)
+        ai.find_move()
+        self.assertEqual(ai.get_depth(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from bitboard import BitBoard
+from ordering import HeuristicOrdering, MoveOrdering, PRIOR_3X3
+from solver import reachable_positions
+from tictactoe import TicTacToe
+from tictactoe_ai import AlphaBetaPerfectAI, QuickPerfectAI
+
+class TestHeuristicOrdering(unittest.TestCase):
+    def test_order(self):
+        moves = list(range(9))
+        never = lambda move: False
+        self.assertEqual(MoveOrdering().order(moves, 9, never, never), moves)
+        ordering = HeuristicOrdering(PRIOR_3X3)
+        self.assertEqual(ordering.order(moves, 9, never, never),
+                         [4, 0, 2, 6, 8, 1, 3, 5, 7])
+        # History outranks the prior, killers outrank history and
+        # threats outrank everything
+        ordering.cutoff(7, 5, 2)
+        ordering.cutoff(5, 5, 3)
+        ordering.cutoff(5, 4, 1)
+        self.assertEqual(ordering.get_history(5), 10)
+        self.assertEqual(ordering.get_killers(5), [5, 7])
+        ordering.cutoff(3, 5, 1)
+        self.assertEqual(ordering.get_killers(5), [3, 5])
+        self.assertEqual(ordering.order(moves, 5, never, never),
+                         [5, 3, 7, 4, 0, 2, 6, 8, 1])
+        self.assertEqual(ordering.order(moves, 9, never, never),
+                         [5, 7, 3, 4, 0, 2, 6, 8, 1])
+        self.assertEqual(
+            ordering.order(moves, 5, lambda move: move == 1,
+                           lambda move: move in (1, 8))[:3], [1, 8, 5])
+        ordering.clear()
+        self.assertEqual(ordering.get_killers(5), [])
+        self.assertEqual(ordering.get_history(5), 0)
+
+    def test_switches(self):
+        ordering = HeuristicOrdering(threats=False, killers=False,
+                                     history=False)
+        ordering.cutoff(5, 5, 3)
+        self.assertEqual(ordering.get_killers(5), [])
+        self.assertEqual(ordering.get_history(5), 0)
+        self.assertEqual(ordering.order([0, 1], 7, lambda move: move == 1,
+                                        lambda move: False), [0, 1])
+
+class TestOrderedSearch(unittest.TestCase):
+    def test_alpha_beta(self):
+        # The AIs play the same moves with fewer nodes searched
+        for cls in (AlphaBetaPerfectAI, QuickPerfectAI):
+            game = TicTacToe()
+            plain = cls(game)
+            ordered = cls(game, ordering=HeuristicOrdering(PRIOR_3X3))
+            plain.instrument()
+            ordered.instrument()
+            for bits, turn in reachable_positions()[::7]:
+                game._board = BitBoard().to_board(bits)
+                game._turn = turn
+                self.assertEqual(ordered.find_move(), plain.find_move())
+            if cls == AlphaBetaPerfectAI:
+                nodes = [sum(stats["nodes"] for stats in ai.get_stats())
+                         for ai in (plain, ordered)]
+                self.assertLess(nodes[1], nodes[0] * 0.6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import pickle
+import unittest
+import tempfile
+
+from bitboard import BitBoard
+from scorecache import HEADER, RECORDS, ScoreCache, get_cache
+from search import SearchCore
+from solver import reachable_positions
+from tictactoe import TicTacToe
+from tictactoe_ai import QuickPerfectAI, UltimateAI
+
+class TestScoreCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache = ScoreCache.build()
+
+    def setUp(self):
+        self.bitboard = BitBoard()
+
+    def test_build(self):
+        # Every reachable position, up to symmetry
+        self.assertEqual(len(self.cache), 765)
+        self.assertEqual(self.cache.get((0, 0), "O"), 0)
+        # Wrong side to move
+        self.assertEqual(self.cache.get((0, 0), "X"), None)
+
+    def test_scores(self):
+        # The cache holds the score the search finds for every board
+        # reached by a move
+        core = SearchCore(pruning=True)
+        for bits, turn in reachable_positions():
+            core.set_position(bits, turn)
+            for square in range(9):
+                if (bits[0] | bits[1]) >> square & 1:
+                    continue
+                core.make(square)
+                child = core.get_bits()
+                score = core.search(square)
+                core.unmake(square)
+                self.assertEqual(
+                    self.cache.get(child, "X" if turn == "O" else "O"),
+                    score)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scores.bin")
+            self.cache.save(path)
+            self.assertEqual(os.path.getsize(path), HEADER + RECORDS)
+            loaded = ScoreCache.load(path)
+            self.assertEqual(loaded._records.tobytes(),
+                             self.cache._records.tobytes())
+            # Copies map the same file rather than holding the records
+            self.assertIs(pickle.loads(pickle.dumps(get_cache(path))),
+                          get_cache(path))
+            # Other versions and files are rejected
+            path = os.path.join(directory, "bad.bin")
+            self.cache.save(path)
+            with open(path, "r+b") as f:
+                f.seek(4)
+                f.write(bytes([99]))
+            with self.assertRaises(ValueError):
+                ScoreCache.load(path)
+            with open(path, "wb") as f:
+                f.write(b"junk")
+            with self.assertRaises(ValueError):
+                ScoreCache.load(path)
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy._records.tobytes(),
+                         self.cache._records.tobytes())
+
+    def test_ais(self):
+        # The AIs find the same moves without searching
+        boards = [[[None, None, None], [None, None, None],
+                   [None, None, None]],
+                  [["O", None, None], [None, "X", None],
+                   [None, None, "O"]],
+                  [["O", "X", "O"], [None, "X", "X"], [None, "O", "O"]]]
+        for board in boards:
+            game = TicTacToe()
+            game._board = board
+            game._turn = "X" if sum(row.count("O") - row.count("X")
+                                    for row in board) else "O"
+            for cls in (QuickPerfectAI, UltimateAI):
+                ai = cls(game, scores=self.cache)
+                ai.instrument()
+                self.assertEqual(ai.find_move(), cls(game).find_move())
+                self.assertEqual(ai.get_stats()[0]["nodes"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
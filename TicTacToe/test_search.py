@@ -0,0 +1,85 @@
+import unittest
+
+from bitboard import BitBoard
+from search import CountingSearchCore, SearchCore, SearchCounters
+from transposition import TranspositionTable
+
+class TestSearchCore(unittest.TestCase):
+    def setUp(self):
+        self.bitboard = BitBoard()
+        # O to move wins at (0,2); otherwise X wins at (1,2)
+        self.bits = self.bitboard.from_board([["O", "O", None],
+                                              ["X", "X", None],
+                                              [None, None, None]])
+
+    def test_make_and_unmake(self):
+        core = SearchCore()
+        core.set_position(self.bits, "O")
+        core.make(2)
+        self.assertEqual(core.get_bits(),
+                         (self.bits[0] | 1 << 2, self.bits[1]))
+        core.unmake(2)
+        self.assertEqual(core.get_bits(), self.bits)
+
+    def test_score_move(self):
+        cores = [SearchCore(), SearchCore(pruning=True),
+                 SearchCore(table=TranspositionTable()),
+                 SearchCore(pruning=True, table=TranspositionTable())]
+        for core in cores:
+            core.set_position(self.bits, "O")
+            self.assertEqual(core.score_move(2), 10)
+            self.assertEqual(core.score_move(8), -10)
+            self.assertEqual(core.get_bits(), self.bits)
+
+    def test_score_move_empty_board(self):
+        for pruning in (False, True):
+            core = SearchCore(pruning, TranspositionTable())
+            core.set_position((0, 0), "O")
+            for square in range(9):
+                self.assertEqual(core.score_move(square), 0)
+
+    def test_decided_position(self):
+        bits = self.bitboard.from_board([["O", "O", "O"],
+                                         ["X", "X", None],
+                                         [None, None, None]])
+        core = SearchCore()
+        core.set_position(bits, "X")
+        self.assertEqual(core.score_move(5), -10)
+
+    def test_counting(self):
+        for pruning in (False, True):
+            core = SearchCore(pruning, TranspositionTable())
+            counters = SearchCounters()
+            counting = core.counting(counters)
+            counting.set_position((0, 0), "O")
+            plain = SearchCore(pruning, TranspositionTable())
+            plain.set_position((0, 0), "O")
+            # Counting doesn't change the scores
+            for square in range(9):
+                self.assertEqual(counting.score_move(square),
+                                 plain.score_move(square))
+            stats = counters.to_dict()
+            self.assertGreater(stats["nodes"], 0)
+            self.assertEqual(stats["max_depth"], 9)
+            # Alpha-beta can search a board again after a hit on a
+            # bound, storing it again
+            self.assertGreaterEqual(stats["inserts"], len(core._table))
+            self.assertGreaterEqual(stats["inserts"], stats["misses"])
+            if not pruning:
+                self.assertEqual(stats["inserts"], len(core._table))
+                self.assertEqual(stats["inserts"], stats["misses"])
+            self.assertGreater(stats["hits"], 0)
+            self.assertEqual(stats["cutoffs"] > 0, pruning)
+            counters.clear()
+            self.assertEqual(set(counters.to_dict().values()), {0})
+
+    def test_counting_nodes(self):
+        # Plain minimax from the empty board visits every path
+        core = CountingSearchCore()
+        core.set_position((0, 0), "O")
+        for square in range(9):
+            core.score_move(square)
+        self.assertEqual(core.get_counters().nodes, 549945)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import math
+import unittest
+
+from sequential import (ACCEPT_H0, ACCEPT_H1, NARROW, SequentialTest,
+                        rate_interval)
+
+class TestRateInterval(unittest.TestCase):
+    def test_rate_interval(self):
+        low, high = rate_interval(50, 100)
+        self.assertAlmostEqual(low, 0.4038, places=4)
+        self.assertAlmostEqual(high, 0.5962, places=4)
+        # The interval never goes outside [0, 1], even with no wins
+        low, high = rate_interval(0, 100)
+        self.assertEqual(low, 0)
+        self.assertGreater(high, 0)
+        self.assertEqual(rate_interval(0, 0), (0.0, 1.0))
+        # Higher confidence means a wider interval
+        self.assertLess(rate_interval(50, 100, 0.99)[0], 0.4038)
+
+class TestSequentialTest(unittest.TestCase):
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            SequentialTest()
+        with self.assertRaises(ValueError):
+            SequentialTest(width=0)
+        with self.assertRaises(ValueError):
+            SequentialTest(sprt=(0.05, 0))
+        with self.assertRaises(ValueError):
+            SequentialTest(width=0.1, confidence=1)
+
+    def test_width(self):
+        test = SequentialTest(width=0.1)
+        test.add(0, 0, 50)
+        # Too few games to stop, however conclusive they look
+        self.assertEqual(test.decide(), None)
+        test.add(0, 0, 50)
+        self.assertEqual(test.get_games(), 100)
+        self.assertEqual(test.get_difference(), 0)
+        # A run of draws doesn't give an interval of no width
+        low, high = test.get_interval()
+        self.assertAlmostEqual(high, -low)
+        self.assertGreater(high, 0.02)
+        self.assertEqual(test.decide(), NARROW)
+        # Decisive games spread the results out
+        test = SequentialTest(width=0.1)
+        test.add(50, 50, 0)
+        self.assertEqual(test.decide(), None)
+        test.add(1000, 1000, 0)
+        self.assertEqual(test.decide(), NARROW)
+        self.assertEqual(test.get_counts(), (1050, 1050, 0))
+
+    def test_sprt(self):
+        test = SequentialTest(sprt=(0, 0.1))
+        lower, upper = test.get_bounds()
+        self.assertAlmostEqual(lower, math.log(0.05 / 0.95))
+        self.assertAlmostEqual(upper, math.log(0.95 / 0.05))
+        test.add(40, 40, 20)
+        self.assertLess(test.get_llr(), 0)
+        self.assertEqual(test.decide(), None)
+        test.add(400, 400, 200)
+        self.assertEqual(test.decide(), ACCEPT_H0)
+        test = SequentialTest(sprt=(0, 0.1))
+        test.add(60, 40, 0)
+        self.assertGreater(test.get_llr(), 0)
+        self.assertEqual(test.decide(), None)
+        test.add(600, 400, 0)
+        self.assertEqual(test.decide(), ACCEPT_H1)
+        self.assertEqual(SequentialTest(width=0.1).get_llr(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+from server import _Session, GameServer, load_test
+
+class TestSession(unittest.TestCase):
+    def test_game(self):
+        session = _Session("solved", {})
+        self.assertEqual(session.handle("MOVE 0 0"),
+                         "ERROR no game in progress")
+        self.assertEqual(session.handle("NEW O"), "PLAY")
+        self.assertEqual(session.handle("MOVE 1 1").split()[0], "PLAY")
+        self.assertEqual(session.handle("MOVE 1 1"), "ERROR square is taken")
+        self.assertEqual(session.handle("MOVE 3 0"),
+                         "ERROR square is off the board")
+        self.assertEqual(session.handle("MOVE a b"),
+                         "ERROR coordinates must be integers")
+        board = session.handle("BOARD")
+        self.assertEqual(board[:6], "BOARD ")
+        self.assertEqual(board[6 + 4], "O")
+        self.assertEqual(board.count("X"), 1)
+        self.assertEqual(session.handle("FOO").split()[0], "ERROR")
+        self.assertEqual(session.handle(""), "ERROR empty command")
+        self.assertEqual(session.handle("QUIT"), "BYE")
+
+    def test_ai_never_loses(self):
+        for piece in ("O", "X"):
+            for first in range(9):
+                session = _Session("solved", {})
+                answer = session.handle(f"NEW {piece}")
+                moves = [divmod(first, 3)] + [(x, y) for x in range(3)
+                                              for y in range(3)]
+                while not answer.startswith("END"):
+                    board = session.handle("BOARD")[6:]
+                    x, y = next((x, y) for x, y in moves
+                                if board[3*x + y] == ".")
+                    answer = session.handle(f"MOVE {x} {y}")
+                self.assertNotEqual(answer.split()[1], piece)
+                self.assertEqual(session.handle("MOVE 0 0"),
+                                 "ERROR no game in progress")
+
+class TestGameServer(unittest.TestCase):
+    def test_invalid_ai(self):
+        with self.assertRaises(ValueError):
+            GameServer(ai="invalid")
+
+    def test_load(self):
+        async def run():
+            server = GameServer(port=0)
+            await server.start()
+            try:
+                latencies = await load_test("127.0.0.1", server.get_port(),
+                                            20, 3)
+                # Let the server notice the connections closing
+                await asyncio.sleep(0.1)
+                return latencies, server.get_sessions()
+            finally:
+                await server.close()
+
+        latencies, sessions = asyncio.run(run())
+        # O makes between three and five moves in every game
+        self.assertGreaterEqual(len(latencies), 20 * 3 * 3)
+        self.assertLessEqual(len(latencies), 20 * 3 * 5)
+        self.assertEqual(sessions, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from bitboard import BitBoard
+from tictactoe import TicTacToe
+from tictactoe_ai import RandomAI, WinningAI, WinningLosingAI
+try:
+    import numpy as np
+    from simulator import LockstepSimulator, O, X
+except ImportError: # NumPy is not installed
+    np = None
+
+@unittest.skipIf(np == None, "NumPy is not installed")
+class TestLockstepSimulator(unittest.TestCase):
+    def setUp(self):
+        self.bitboard = BitBoard()
+
+    def positions(self):
+        """Return every reachable non-terminal position and whose turn
+        it is."""
+        positions = {}
+        def visit(bits, turn):
+            if (bits, turn) in positions:
+                return
+            if (self.bitboard.find_winner(bits) != None
+                    or self.bitboard.board_full(bits)):
+                return
+            positions[(bits, turn)] = None
+            for x, y in self.bitboard.legal_moves(bits):
+                visit(self.bitboard.make_move(bits, x, y, turn),
+                      "X" if turn == "O" else "O")
+        visit((0, 0), "O")
+        return list(positions)
+
+    def test_choose(self):
+        # Every position is played 512 times over: the simulator must
+        # choose the same move as the AI when the AI's move is forced
+        # and any empty square when it is random
+        game = TicTacToe()
+        simulator = LockstepSimulator("random", "random", seed=0)
+        classes = {"random": RandomAI, "winning": WinningAI,
+                   "winning-losing": WinningLosingAI}
+        positions = self.positions()
+        self.assertEqual(len(positions), 4520)
+        for bits, turn in positions:
+            board = self.bitboard.to_board(bits)
+            game._board = board
+            game._turn = turn
+            row = [0] * 9
+            for x, y in [(x, y) for x in range(3) for y in range(3)]:
+                if board[x][y] != None:
+                    row[3*x + y] = O if board[x][y] == "O" else X
+            boards = np.array([row] * 512, dtype=np.int8)
+            ply = 9 - row.count(0)
+            legal = self.bitboard.legal_moves(bits)
+            for name, cls in classes.items():
+                ai = cls(game)
+                squares = simulator._choose(boards.copy(), name,
+                                            O if turn == "O" else X, ply)
+                chosen = {divmod(int(square), 3) for square in squares}
+                forced = name != "random" and any(
+                    ai._test_winning_move(x, y)
+                    or (name == "winning-losing"
+                        and ai._test_blocking_move(x, y))
+                    for x, y in legal)
+                if forced:
+                    self.assertEqual(chosen, {ai.find_move()})
+                else:
+                    self.assertEqual(chosen, set(legal))
+
+    def test_play(self):
+        simulator = LockstepSimulator("winning-losing", "random", seed=1,
+                                      batch=300)
+        counts = simulator.play(1000)
+        self.assertEqual(sum(counts), 1000)
+        # O blocks and wins far more often than X
+        self.assertGreater(counts[0], counts[1])
+        # The same seed gives the same results
+        again = LockstepSimulator("winning-losing", "random", seed=1,
+                                  batch=300)
+        self.assertEqual(again.play(1000), counts)
+
+    def test_invalid_ai(self):
+        with self.assertRaises(ValueError):
+            LockstepSimulator("perfect", "random")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+import tempfile
+
+from bitboard import BitBoard
+from solver import (SolutionTable, position_index, reachable_positions,
+                    side_to_move)
+
+class TestSolutionTable(unittest.TestCase):
+    def setUp(self):
+        self.table = SolutionTable.solve()
+        self.bitboard = BitBoard()
+
+    def test_solve(self):
+        # Every reachable position, terminal ones included
+        self.assertEqual(len(self.table), 5478)
+        # The empty board is a draw and every move keeps the draw
+        self.assertEqual(self.table.lookup((0, 0), "O"), (0, 0b111111111))
+
+    def test_lookup(self):
+        # X wins by playing (1, 0)
+        bits = self.bitboard.from_board([["O", "X", "O"],
+                                         [None, "X", "X"],
+                                         [None, "O", "O"]])
+        value, best = self.table.lookup(bits, "X")
+        self.assertEqual(value, 1)
+        self.assertEqual(best, 1 << 3)
+        # Wrong side to move
+        self.assertEqual(self.table.lookup(bits, "O"), None)
+        # Unreachable position
+        self.assertEqual(self.table.lookup((0b111, 0b111000), "O"), None)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "solution.bin")
+            self.table.save(path)
+            self.assertEqual(os.path.getsize(path), 5 + 2*3**9)
+            loaded = SolutionTable.load(path)
+        self.assertEqual(loaded._records, self.table._records)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "solution.bin")
+            with open(path, "wb") as f:
+                f.write(b"junk")
+            with self.assertRaises(ValueError):
+                SolutionTable.load(path)
+            # Files cut short in the header or in the records
+            self.table.save(path)
+            for size in (4, 100):
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+                with self.assertRaises(ValueError):
+                    SolutionTable.load(path)
+
+    def test_helpers(self):
+        self.assertEqual(position_index((0, 0)), 0)
+        self.assertEqual(position_index((1, 2)), 1 + 2*3)
+        self.assertEqual(side_to_move((0, 0)), "O")
+        self.assertEqual(side_to_move((1, 0)), "X")
+
+    def test_reachable_positions(self):
+        positions = reachable_positions()
+        self.assertEqual(len(positions), 4520)
+        self.assertEqual(positions[0], ((0, 0), "O"))
+        for bits, turn in positions:
+            self.assertEqual(turn, side_to_move(bits))
+        # Every position in the table, including where the game is over
+        self.assertEqual(len(reachable_positions(terminal=True)),
+                         len(self.table))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
+import io
+import json
 import unittest
+import contextlib
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
 
 from tictactoe import TicTacToe
-from tictactoe_ai import RandomAI, WinningAI
+from tictactoe_ai import (AlphaBetaPerfectAI, MCTSAI, QuickPerfectAI,
+                          RandomAI, WinningAI)
 
 class TestTicTacToeMethods(unittest.TestCase):
     def setUp(self):
@@ -19,6 +25,16 @@ class TestTicTacToeMethods(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.game.set_square(0, 0, 1)
 
+    def test_set_turn(self):
+        self.game.set_turn("X")
+        self.assertEqual(self.game.get_turn(), "X")
+        self.game.set_turn("O")
+        self.assertEqual(self.game.get_turn(), "O")
+        with self.assertRaises(ValueError):
+            self.game.set_turn("A")
+        with self.assertRaises(TypeError):
+            self.game.set_turn(None)
+
     def test_make_move(self):
         # Valid move
         board = self.game.make_move(self.game._board, 0, 0, "O")
@@ -84,6 +100,40 @@ class TestTicTacToeMethods(unittest.TestCase):
                  [None, "O", None]]
         self.assertFalse(self.game.board_full(board))
 
+    def test_legal_moves(self):
+        board = [["O", "X", "O"],
+                 [None, "X", "X"],
+                 [None, "O", None]]
+        self.assertEqual(self.game.legal_moves(board),
+                         [(1, 0), (2, 0), (2, 2)])
+
+    def test_get_bitboard(self):
+        self.game.set_square(0, 0, "O")
+        self.game.set_square(1, 1, "X")
+        self.assertEqual(self.game.get_bitboard(), (0b000000001, 0b000010000))
+
+    def test_get_snapshot(self):
+        self.game.set_square(0, 0, "O")
+        self.game.set_turn("X")
+        snapshot = self.game.get_snapshot()
+        self.assertEqual(snapshot, ((0b000000001, 0), "X"))
+        # The snapshot doesn't change with the game, and equal
+        # positions give equal snapshots
+        self.game.set_square(1, 1, "X")
+        self.assertEqual(snapshot.pieces, (0b000000001, 0))
+        self.assertNotEqual(self.game.get_snapshot(), snapshot)
+        self.game.set_square(1, 1, None)
+        self.assertEqual({snapshot: 1}[self.game.get_snapshot()], 1)
+        # The snapshot is only made again once the position changes
+        snapshot = self.game.get_snapshot()
+        self.assertIs(self.game.get_snapshot(), snapshot)
+        self.assertIs(self.game.get_bitboard(), snapshot.pieces)
+        self.game.set_turn("O")
+        self.assertEqual(self.game.get_snapshot(), ((0b000000001, 0), "O"))
+        self.game._board = self.game.make_move(self.game.get_board(),
+                                               2, 2, "O")
+        self.assertEqual(self.game.get_bitboard(), (0b100000001, 0))
+
     def test_load(self):
         self.game.load(RandomAI(self.game), "O")
         self.assertTrue(isinstance(self.game._O, RandomAI))
@@ -94,5 +144,119 @@ class TestTicTacToeMethods(unittest.TestCase):
         with self.assertRaises(TypeError):
             self.game.load(RandomAI(self.game), 1)
 
+    def test_run_games(self):
+        self.game.load(RandomAI(self.game), "O")
+        self.game.load(WinningAI(self.game), "X")
+        counts = self.game._run_games(100, workers=1, seed=1)
+        self.assertEqual(sum(counts), 100)
+        self.assertEqual(self.game._run_games(100, workers=1, seed=1), counts)
+        # Games split between processes with the same seed are reproducible
+        counts = self.game._run_games(101, workers=3, seed=2)
+        self.assertEqual(sum(counts), 101)
+        self.assertEqual(self.game._run_games(101, workers=3, seed=2), counts)
+        # Each game is seeded by its number, not by the process playing it
+        self.assertEqual(self.game._run_games(101, workers=1, seed=2), counts)
+
+    def test_record(self):
+        self.game.load(RandomAI(self.game), "O")
+        self.game.load(WinningAI(self.game), "X")
+        out = io.StringIO()
+        counts = self.game.record(150, out, seed=1)
+        games = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([game["game"] for game in games], list(range(150)))
+        self.assertEqual(sum(counts), 150)
+        self.assertEqual(counts[2],
+                         sum(game["winner"] == None for game in games))
+        for game in games:
+            self.assertEqual(len(game["moves"]), len(game["latency"]))
+            board = self.game._new_board()
+            turn = "O"
+            for x, y in game["moves"]:
+                board = self.game.make_move(board, x, y, turn)
+                self.assertTrue(board) # Move was legal
+                turn = "X" if turn == "O" else "O"
+            self.assertEqual(self.game.find_winner(board), game["winner"])
+        # The same seed gives the same games with any number of processes
+        out = io.StringIO()
+        self.game.record(150, out, workers=2, seed=1)
+        self.assertEqual([json.loads(line)["moves"] 
+                          for line in out.getvalue().splitlines()],
+                         [game["moves"] for game in games])
+
+    def test_replay(self):
+        self.game.load(MCTSAI(self.game, rollouts=50), "O")
+        self.game.load(WinningAI(self.game), "X")
+        out = io.StringIO()
+        self.game.record(20, out, seed=3)
+        games = [json.loads(line) for line in out.getvalue().splitlines()]
+        # Any game can be played again on its own, even by an AI which
+        # keeps a tree from one move to the next
+        for number in (7, 0, 19):
+            game = self.game.replay(3, number)
+            self.assertEqual(game["game"], number)
+            self.assertEqual(game["moves"], games[number]["moves"])
+            self.assertEqual(game["winner"], games[number]["winner"])
+
+    def test_test_stats(self):
+        O = RandomAI(self.game)
+        O.instrument()
+        X = AlphaBetaPerfectAI(self.game)
+        X.instrument()
+        self.game.load(O, "O")
+        self.game.load(X, "X")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.game.test(10, workers=2, seed=1)
+        # The moves made in every process are counted: at least three
+        # for O and two for X in each game, and O makes at most one
+        # more move than X in each game
+        self.assertGreaterEqual(len(X.get_stats()), 10 * 2)
+        self.assertGreaterEqual(len(O.get_stats()), len(X.get_stats()))
+        self.assertLessEqual(len(O.get_stats()), len(X.get_stats()) + 10)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith("O searched 0.0 nodes"))
+        self.assertTrue(lines[3].startswith("X searched"))
+
+    def test_test_sequential(self):
+        # Perfect AIs only ever draw, so the test stops long before
+        # playing every game
+        self.game.load(QuickPerfectAI(self.game), "O")
+        self.game.load(QuickPerfectAI(self.game), "X")
+        for kwargs in ({"width": 0.05}, {"sprt": (0, 0.05)}):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.game.test(100000, seed=1, **kwargs)
+            lines = output.getvalue().splitlines()
+            self.assertEqual(len(lines), 4)
+            self.assertRegex(lines[0], r"^Stopped after [12]00 of 100000 ")
+            self.assertTrue(lines[3].startswith("With 95% confidence"))
+        # Inconclusive tests play every game
+        self.game.load(RandomAI(self.game), "O")
+        self.game.load(RandomAI(self.game), "X")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.game.test(200, seed=1, width=0.01)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "Played all 200 games without the "
+                                   + "result becoming conclusive.")
+
+    def test_test_sequential_workers(self):
+        # Every batch is played by the same processes, and the games
+        # are the same as with one process
+        self.game.load(RandomAI(self.game), "O")
+        self.game.load(WinningAI(self.game), "X")
+        outputs = []
+        for workers in (1, 2):
+            output = io.StringIO()
+            with mock.patch("tictactoe.ProcessPoolExecutor",
+                            wraps=ProcessPoolExecutor) as executor:
+                with contextlib.redirect_stdout(output):
+                    self.game.test(500, workers, seed=1, width=0.001)
+            self.assertEqual(executor.call_count, workers - 1)
+            outputs.append(output.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertTrue(outputs[0].startswith("Played all 500 games"))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
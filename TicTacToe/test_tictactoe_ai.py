@@ -1,9 +1,20 @@
+import time
+import pickle
 import unittest
+import random
 
 from tictactoe import TicTacToe
 from tictactoe_ai import (RandomAI, WinningAI, WinningLosingAI, PerfectAI, 
-                          CachePerfectAI, AlphaBetaPerfectAI, QuickPerfectAI, 
-                          UltimateAI)
+                          SolvedAI, CachePerfectAI, AlphaBetaPerfectAI, 
+                          QuickPerfectAI, UltimateAI, MCTSAI,
+                          other_factors, _lookup_factors)
+from bitboard import BitBoard
+from solver import reachable_positions
+from transposition import EXACT
+try:
+    import numpy as np
+except ImportError: # NumPy is not installed
+    np = None
 
 class TestTicTacToeAIs(unittest.TestCase):
     def setUp(self):
@@ -123,6 +134,38 @@ class TestTicTacToeAIs(unittest.TestCase):
         move = self.ai.find_move()
         self.assertEqual(move, (1, 1))
     
+    def test_solved_ai(self):
+        # Matches PerfectAI on every position its tests use
+        boards = [([["O", "X", "O"], [None, "X", "X"], [None, "O", "O"]],
+                   "X"),
+                  ([["O", "X", "O"], [None, "X", "X"], [None, "O", None]],
+                   "O"),
+                  ([[None, None, None], [None, None, None],
+                    [None, None, None]], "O"),
+                  ([["O", None, None], [None, None, None],
+                    [None, None, None]], "X"),
+                  # O has already won so every move is equally good
+                  ([["O", "X", None], ["O", "X", None], ["O", None, None]],
+                   "X")]
+        for board, turn in boards:
+            self.game._board = board
+            self.game._turn = turn
+            self.assertEqual(SolvedAI(self.game).find_move(),
+                             PerfectAI(self.game).find_move())
+        # Unreachable position is searched instead
+        self.game._board = [["O", "X", None],
+                            [None, None, None],
+                            [None, None, None]]
+        self.game._turn = "O"
+        self.assertEqual(SolvedAI(self.game).find_move(),
+                         PerfectAI(self.game).find_move())
+        # No move available
+        self.game._board = [["O", "O", "X"],
+                            ["X", "X", "O"],
+                            ["O", "X", "O"]]
+        self.game._turn = "X"
+        self.assertEqual(SolvedAI(self.game).find_move(), None)
+
     def test_cache_perfect_ai(self):
         # Winning move available
         self.game._board = [["O", "X", "O"],
@@ -157,6 +200,25 @@ class TestTicTacToeAIs(unittest.TestCase):
         move = self.ai.find_move()
         self.assertEqual(move, (1, 1))
     
+    def test_cache_perfect_ai_shared_table(self):
+        self.game._board = [["O", None, None],
+                            [None, None, None],
+                            [None, None, None]]
+        self.game._turn = "X"
+        self.ai = CachePerfectAI(self.game)
+        self.ai.find_move()
+        table = self.ai.get_table()
+        size = len(table)
+        # The same position rotated only hits the cache
+        self.game._board = [[None, None, "O"],
+                            [None, None, None],
+                            [None, None, None]]
+        misses = table.get_misses()
+        self.ai = CachePerfectAI(self.game, table=table)
+        self.assertEqual(self.ai.find_move(), (1, 1))
+        self.assertEqual(table.get_misses(), misses)
+        self.assertEqual(len(table), size)
+
     def test_alpha_beta_perfect_ai(self):
         # Winning move available
         self.game._board = [["O", "X", "O"],
@@ -225,6 +287,24 @@ class TestTicTacToeAIs(unittest.TestCase):
         move = self.ai.find_move()
         self.assertEqual(move, (1, 1))
 
+    def test_quick_perfect_ai_table(self):
+        self.game._board = [[None, None, None],
+                            [None, None, None],
+                            [None, None, None]]
+        self.game._turn = "O"
+        self.ai = QuickPerfectAI(self.game)
+        self.ai.find_move()
+        table = self.ai.get_table()
+        # Entries are keyed by board alone and hold a bound and best move
+        key = table.key((1, 0), "X")
+        score, bound, move = table.get(key)
+        self.assertEqual((score, bound), (0, EXACT))
+        self.assertEqual(move, 1 << 4) # Best response is the center
+        # Every move from the root is now settled by the cache
+        misses = table.get_misses()
+        self.assertEqual(self.ai.find_move(), (0, 0))
+        self.assertEqual(table.get_misses(), misses)
+
     def test_ultimate_ai(self):
         # Winning move available
         self.game._board = [["O", "X", "O"],
@@ -276,5 +356,207 @@ class TestTicTacToeAIs(unittest.TestCase):
         move = self.ai.find_move()
         self.assertEqual(move, (0, 2))
 
+    def test_other_factors(self):
+        # Two corners and the diagonal between them for O; X's piece
+        # blocks the middle row but X has no two in a row
+        bits = BitBoard().from_board([["O", None, None],
+                                      ["X", "O", None],
+                                      [None, None, "O"]])
+        self.assertEqual(other_factors(bits, "O"), 2 + 3*1)
+        self.assertEqual(other_factors(bits, "X"), 0)
+        # Both diagonals, the left column and the top two rows
+        bits = BitBoard().from_board([["X", "X", "X"],
+                                      [None, "X", "O"],
+                                      ["X", None, None]])
+        self.assertEqual(other_factors(bits, "X"), 3 + 3*5)
+        # The table the AI looks scores up in holds the same scores
+        for bits, turn in reachable_positions(terminal=True):
+            for me in ("O", "X"):
+                self.assertEqual(_lookup_factors(bits, me),
+                                 other_factors(bits, me))
+
+    def test_mcts_ai(self):
+        random.seed(0)
+        # Winning move available
+        self.game._board = [["O", "X", "O"],
+                            [None, "X", "X"],
+                            [None, "O", "O"]]
+        self.game._turn = "X"
+        self.ai = MCTSAI(self.game, rollouts=500)
+        move = self.ai.find_move()
+        self.assertEqual(move, (1, 0))
+        # Every rollout goes through one of the moves
+        visits = self.ai.get_visits()
+        self.assertEqual(set(visits), {(1, 0), (2, 0)})
+        self.assertEqual(sum(visits.values()), 500)
+        # Blocking move available
+        self.game._board = [["O", "X", "O"],
+                            [None, "X", "X"],
+                            [None, "O", None]]
+        self.game._turn = "O"
+        self.ai = MCTSAI(self.game, rollouts=500)
+        move = self.ai.find_move()
+        self.assertEqual(move, (1, 0))
+        # No move available
+        self.game._board = [["O", "O", "X"],
+                            ["X", "X", "O"],
+                            ["O", "X", "O"]]
+        self.game._turn = "X"
+        self.assertEqual(self.ai.find_move(), None)
+
+    def test_mcts_ai_tree_reuse(self):
+        random.seed(0)
+        self.game._board = [[None, None, None],
+                            [None, None, None],
+                            [None, None, None]]
+        self.game._turn = "O"
+        self.ai = MCTSAI(self.game, rollouts=500)
+        x, y = self.ai.find_move()
+        self.game.set_square(x, y, "O")
+        x, y = [(x, y) for x in range(3) for y in range(3)
+                if self.game._board[x][y] == None][0]
+        self.game.set_square(x, y, "X")
+        self.ai.find_move()
+        # The rollouts through the position searched earlier are kept
+        self.assertGreater(sum(self.ai.get_visits().values()), 500)
+
+    def test_mcts_ai_time_limit(self):
+        random.seed(0)
+        self.ai = MCTSAI(self.game, time_limit=0.1)
+        start = time.perf_counter()
+        move = self.ai.find_move()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(move, [(x, y) for x in range(3) for y in range(3)])
+
+    def test_set_rng(self):
+        # AIs with streams seeded the same way find the same moves,
+        # without drawing from the global stream
+        for ai_class in (RandomAI, WinningLosingAI, MCTSAI):
+            moves = []
+            for i in range(2):
+                ai = ai_class(self.game)
+                ai.set_rng(random.Random(5))
+                state = random.getstate()
+                moves.append([ai.find_move() for j in range(10)])
+                self.assertEqual(random.getstate(), state)
+            self.assertEqual(moves[0], moves[1])
+        # A stream can also be given when the AI is created
+        ai = RandomAI(self.game, rng=random.Random(5))
+        again = RandomAI(self.game)
+        again.set_rng(random.Random(5))
+        self.assertEqual([ai.find_move() for j in range(10)],
+                         [again.find_move() for j in range(10)])
+        # Copies sent to other processes keep a seeded stream, but use
+        # the global stream of their process otherwise
+        copy = pickle.loads(pickle.dumps(again))
+        self.assertEqual(copy.find_move(), again.find_move())
+        copy = pickle.loads(pickle.dumps(RandomAI(self.game)))
+        self.assertIs(copy._rng, random)
+
+    @unittest.skipIf(np == None, "NumPy is not installed")
+    def test_mcts_ai_batch(self):
+        random.seed(0)
+        # Blocking move available
+        self.game._board = [["O", "X", "O"],
+                            [None, "X", "X"],
+                            [None, "O", None]]
+        self.game._turn = "O"
+        self.ai = MCTSAI(self.game, rollouts=2048, batch=64)
+        self.assertEqual(self.ai.find_move(), (1, 0))
+        self.assertEqual(sum(self.ai.get_visits().values()), 2048)
+
+    def test_instrument(self):
+        self.game._board = [["O", None, None],
+                            [None, None, None],
+                            [None, None, None]]
+        self.game._turn = "X"
+        ai = AlphaBetaPerfectAI(self.game)
+        self.assertEqual(ai.get_stats(), None)
+        with self.assertRaises(ValueError):
+            ai.add_stats([])
+        move = ai.find_move()
+        ai.instrument()
+        # Instrumenting doesn't change the move found
+        self.assertEqual(ai.find_move(), move)
+        ai.find_move()
+        stats = ai.get_stats()
+        self.assertEqual(len(stats), 2)
+        self.assertEqual(set(stats[0]), {"nodes", "cutoffs", "hits",
+                                         "misses", "inserts", "max_depth",
+                                         "time"})
+        self.assertEqual(stats[0]["nodes"], stats[1]["nodes"])
+        self.assertGreater(stats[0]["cutoffs"], 0)
+        self.assertEqual(stats[0]["hits"], 0)
+        self.assertEqual(stats[0]["max_depth"], 8)
+        # Instrumented AIs can be copied to other processes
+        copy = pickle.loads(pickle.dumps(ai))
+        copy.find_move()
+        self.assertEqual(len(copy.get_stats()), 3)
+        ai.add_stats(copy.get_stats()[2:])
+        self.assertEqual(len(ai.get_stats()), 3)
+        # Cache statistics
+        ai = QuickPerfectAI(self.game)
+        ai.instrument()
+        ai.find_move()
+        ai.find_move()
+        first, second = ai.get_stats()
+        self.assertGreater(first["inserts"], 0)
+        self.assertEqual(second["inserts"], 0)
+        self.assertGreater(second["hits"], 0)
+        # Rollouts are counted as nodes
+        ai = MCTSAI(self.game, rollouts=100)
+        ai.instrument()
+        ai.find_move()
+        self.assertEqual(ai.get_stats()[0]["nodes"], 100)
+        self.assertGreater(ai.get_stats()[0]["max_depth"], 0)
+
+    def test_bitboard_ais(self):
+        # AIs using bitboards find the same moves as with 3x3 matrices
+        boards = [[["O", "X", "O"], [None, "X", "X"], [None, "O", "O"]],
+                  [["O", "X", "O"], [None, "X", "X"], [None, "O", None]],
+                  [["O", None, None], [None, "X", None], [None, None, None]],
+                  [["O", None, None], ["X", "X", "O"], ["O", None, "X"]],
+                  [["O", None, None], [None, None, None], [None, None, None]]]
+        for board in boards:
+            self.game._board = board
+            self.game._turn = "X" if sum(row.count(None) for row in board) \
+                                     % 2 == 0 else "O"
+            for ai in [RandomAI, WinningAI, WinningLosingAI, PerfectAI,
+                       CachePerfectAI, AlphaBetaPerfectAI, QuickPerfectAI,
+                       UltimateAI]:
+                random.seed(0)
+                move = ai(self.game, bitboard=True).find_move()
+                random.seed(0)
+                self.assertEqual(move, ai(self.game).find_move())
+
+    def test_score_moves(self):
+        positions = reachable_positions(terminal=True)
+        # Scores match the scores find_move chooses between
+        bits = BitBoard().from_board([["O", "X", "O"],
+                                      [None, "X", "X"],
+                                      [None, "O", None]])
+        self.assertEqual(PerfectAI(self.game).score_moves([(bits, "O")]),
+                         [{(1, 0): 0, (2, 0): -10, (2, 2): -10}])
+        # The game is left alone
+        self.assertEqual(self.game.get_bitboard(), (0, 0))
+        # Finished games have no moves to score
+        won = BitBoard().from_board([["O", "O", "O"],
+                                     ["X", "X", None],
+                                     [None, None, None]])
+        self.assertEqual(PerfectAI(self.game).score_moves([(won, "X")]),
+                         [{}])
+        expected = SolvedAI(self.game).score_moves(positions)
+        self.assertEqual(len(expected), len(positions))
+        ai = QuickPerfectAI(self.game)
+        self.assertEqual(ai.score_moves(positions), expected)
+        # The batch fills the AI's cache
+        self.assertGreater(len(ai.get_table()), 0)
+        for ai in [CachePerfectAI, AlphaBetaPerfectAI, UltimateAI]:
+            self.assertEqual(ai(self.game).score_moves(positions[::5]),
+                             expected[::5])
+        # Chunks scored in parallel give the same scores in order
+        self.assertEqual(QuickPerfectAI(self.game).score_moves(
+            positions[::3], workers=2), expected[::3])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
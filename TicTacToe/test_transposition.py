@@ -0,0 +1,122 @@
+import unittest
+
+from bitboard import BitBoard
+from solver import reachable_positions
+from tictactoe import TicTacToe
+from tictactoe_ai import CachePerfectAI, PerfectAI, QuickPerfectAI
+from transposition import (DepthPreferredTable, LRUTable,
+                           TranspositionTable, new_table)
+
+class TestTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable()
+        self.bitboard = BitBoard()
+
+    def test_key(self):
+        bits = self.bitboard.from_board([["O", "X", None],
+                                         [None, None, None],
+                                         [None, None, None]])
+        keys = {self.table.key(b, "O")
+                for b in self.bitboard.symmetries(bits)}
+        self.assertEqual(len(keys), 1)
+        # Key depends on whose turn it is
+        self.assertNotEqual(self.table.key(bits, "O"),
+                            self.table.key(bits, "X"))
+        # Different positions have different keys
+        self.assertNotEqual(self.table.key(bits, "O"),
+                            self.table.key((1, 0), "O"))
+
+    def test_get_and_put(self):
+        key = self.table.key((1, 0), "X")
+        self.assertEqual(self.table.get(key), None)
+        self.table.put(key, 0)
+        self.assertEqual(self.table.get(key), 0)
+        self.assertEqual(self.table.get_hits(), 1)
+        self.assertEqual(self.table.get_misses(), 1)
+        self.assertEqual(self.table.get_inserts(), 1)
+        self.assertEqual(len(self.table), 1)
+        self.assertEqual(self.table.get_hit_rate(), 0.5)
+        self.assertEqual(self.table.get_evictions(), 0)
+        self.assertEqual(self.table.get_capacity(), None)
+        self.table.clear()
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(self.table.get_hits(), 0)
+
+class TestBoundedTables(unittest.TestCase):
+    def test_capacity(self):
+        self.assertEqual(LRUTable(entries=10).get_capacity(), 10)
+        self.assertEqual(LRUTable(size=LRUTable.ENTRY_BYTES * 10)
+                         .get_capacity(), 10)
+        # The smaller limit applies
+        self.assertEqual(LRUTable(5, LRUTable.ENTRY_BYTES * 10)
+                         .get_capacity(), 5)
+        self.assertEqual(DepthPreferredTable(entries=10).get_capacity(), 10)
+        with self.assertRaises(ValueError):
+            LRUTable()
+        with self.assertRaises(ValueError):
+            LRUTable(size=1)
+        self.assertIsInstance(new_table("depth", entries=4),
+                              DepthPreferredTable)
+        self.assertEqual(type(new_table()), TranspositionTable)
+        with self.assertRaises(ValueError):
+            new_table("fifo", entries=4)
+
+    def test_lru(self):
+        table = LRUTable(entries=2)
+        table.put(1, "a")
+        table.put(2, "b")
+        table.get(1) # 2 is now the least recently used
+        table.put(3, "c")
+        self.assertEqual(table.get(2), None)
+        self.assertEqual(table.get(1), "a")
+        self.assertEqual(table.get(3), "c")
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.get_evictions(), 1)
+        # Replacing an entry doesn't evict anything
+        table.put(3, "d")
+        self.assertEqual(table.get(3), "d")
+        self.assertEqual(table.get_evictions(), 1)
+
+    def test_depth_preferred(self):
+        table = DepthPreferredTable(entries=2) # A single bucket
+        table.put(1, "deep", 5)
+        table.put(2, "shallow", 1)
+        table.put(3, "recent", 2)
+        # The deep entry is kept and the other slot always replaced
+        self.assertEqual(table.get(1), "deep")
+        self.assertEqual(table.get(2), None)
+        self.assertEqual(table.get(3), "recent")
+        self.assertEqual(table.get_evictions(), 1)
+        # A deeper entry moves the deep one to the other slot
+        table.put(4, "deeper", 7)
+        self.assertEqual(table.get(4), "deeper")
+        self.assertEqual(table.get(1), "deep")
+        self.assertEqual(table.get(3), None)
+        self.assertEqual(table.get_evictions(), 2)
+        # Storing a key again keeps only the new entry
+        table.put(1, "again", 9)
+        self.assertEqual(table.get(1), "again")
+        self.assertEqual(table.get(4), "deeper")
+        self.assertEqual(len(table), 2)
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.get(1), None)
+
+    def test_ais(self):
+        # Evicting entries doesn't change the moves the AIs find
+        game = TicTacToe()
+        perfect = PerfectAI(game)
+        positions = reachable_positions()[::20]
+        for policy in ("lru", "depth"):
+            for cls in (CachePerfectAI, QuickPerfectAI):
+                table = new_table(policy, entries=16)
+                ai = cls(game, table=table)
+                for bits, turn in positions:
+                    game._board = BitBoard().to_board(bits)
+                    game._turn = turn
+                    self.assertEqual(ai.find_move(), perfect.find_move())
+                self.assertLessEqual(len(table), 16)
+                self.assertGreater(table.get_evictions(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import time
+import random
+import unittest
+
+from tictactoe_ai import RandomAI, UltimateAI, WinningLosingAI
+from ultimate import (ANY, EMPTY_STATE, UltimateMCTSAI, UltimateTicTacToe,
+                      legal_moves, perft, play)
+
+class TestUltimateTicTacToeMethods(unittest.TestCase):
+    def setUp(self):
+        self.game = UltimateTicTacToe()
+
+    def test_perft(self):
+        # Known counts of move sequences from the start of the game
+        for depth, count in enumerate([1, 81, 720, 6336, 55080]):
+            self.assertEqual(perft(EMPTY_STATE, 0, depth), count)
+
+    def test_make_move(self):
+        state = self.game.make_move(EMPTY_STATE, 4, 1, "O")
+        self.assertEqual(self.game.get_board(), EMPTY_STATE)
+        self.game._board = state
+        self.assertEqual(self.game.get_square(4, 1), "O")
+        # (4,1) is the (1,1) square of its small board, so X must play
+        # on the middle board
+        self.assertEqual(state.forced, 4)
+        self.assertEqual(self.game.make_move(state, 0, 0, "X"), [])
+        self.assertEqual(self.game.make_move(state, 4, 1, "X"), [])
+        self.assertEqual(self.game.make_move(state, 9, 0, "X"), [])
+        self.assertEqual(sorted(self.game.legal_moves(state)),
+                         [(x, y) for x in range(3, 6) for y in range(3, 6)])
+        state = self.game.make_move(state, 3, 3, "X")
+        self.assertEqual(state.forced, 0)
+        self.assertEqual(self.game.get_square(3, 3), None)
+
+    def test_small_boards(self):
+        # O wins the top left board, which then can't be played on
+        for x, y in [(0, 0), (1, 1)]:
+            self.game.set_square(x, y, "O")
+        state = self.game.make_move(self.game.get_board(), 2, 2, "O")
+        self.assertEqual(state.meta, (1, 0))
+        self.assertEqual(state.closed, 1)
+        # The winning square sends X to the bottom right board
+        self.assertEqual(state.forced, 8)
+        # Being sent to a closed board means any open board may be used
+        state = play(state, 9*8 + 0, 1)
+        self.assertEqual(state.forced, ANY)
+        self.assertEqual(len(legal_moves(state)), 8*9 - 1)
+        state = play(state, 9*5 + 8, 0)
+        self.assertEqual(state.forced, 8)
+        # Clearing a square reopens the board
+        self.game.set_square(1, 1, None)
+        self.assertEqual(self.game.get_board().closed, 0)
+        self.assertEqual(self.game.get_board().meta, (0, 0))
+        with self.assertRaises(ValueError):
+            self.game.set_square(0, 0, "Y")
+
+    def test_find_winner(self):
+        # O wins the three small boards down the left of the meta-board
+        for b in range(3):
+            for s in range(3):
+                x, y = 3*(b // 3) + s // 3, 3*(b % 3) + s % 3
+                self.game.set_square(x, y, "O")
+        board = self.game.get_board()
+        self.assertEqual(board.meta, (0b111, 0))
+        self.assertEqual(self.game.find_winner(board), "O")
+        self.assertFalse(self.game.board_full(board))
+        self.assertEqual(self.game.find_winner(EMPTY_STATE), None)
+
+    def test_no_bitboards(self):
+        self.assertFalse(hasattr(self.game, "get_bitboard"))
+        with self.assertRaises(ValueError):
+            RandomAI(self.game, bitboard=True)
+        # Nor snapshots, which the 3x3 AIs play from
+        self.assertFalse(hasattr(self.game, "get_snapshot"))
+        with self.assertRaises(ValueError):
+            UltimateAI(self.game)
+
+    def test_generic_ais(self):
+        # The AIs which use the game's own board play legal games
+        self.game.load(RandomAI(self.game), "O")
+        self.game.load(WinningLosingAI(self.game), "X")
+        random.seed(0)
+        for i in range(20):
+            winner = self.game._play_quietly()
+            board = self.game.get_board()
+            self.assertEqual(winner, self.game.find_winner(board))
+            self.assertTrue(winner != None or self.game.board_full(board))
+
+class TestUltimateMCTSAI(unittest.TestCase):
+    def setUp(self):
+        self.game = UltimateTicTacToe()
+        random.seed(0)
+
+    def test_wins_game(self):
+        # O has won boards 0 and 1 and can win board 2, and so the game,
+        # by playing (1,7), the middle square of the last column
+        for b in range(2):
+            for s in (0, 4, 8):
+                x, y = 3*(b // 3) + s // 3, 3*(b % 3) + s % 3
+                self.game.set_square(x, y, "O")
+        self.game.set_square(0, 6, "O")
+        self.game.set_square(2, 8, "O")
+        self.game._board = self.game.get_board()._replace(forced=2)
+        ai = UltimateMCTSAI(self.game, rollouts=500)
+        self.assertEqual(ai.find_move(), (1, 7))
+        self.assertEqual(sum(ai.get_visits().values()), 500)
+
+    def test_beats_random(self):
+        self.game.load(UltimateMCTSAI(self.game, rollouts=200), "O")
+        self.game.load(RandomAI(self.game), "X")
+        winners = [self.game._play_quietly() for i in range(3)]
+        self.assertEqual(winners, ["O"] * 3)
+
+    def test_time_limit(self):
+        ai = UltimateMCTSAI(self.game, time_limit=0.2)
+        start = time.perf_counter()
+        move = ai.find_move()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(move, self.game.legal_moves(EMPTY_STATE))
+
+    def test_instrument(self):
+        ai = UltimateMCTSAI(self.game, rollouts=100)
+        ai.instrument()
+        ai.find_move()
+        self.assertEqual(ai.get_stats()[0]["nodes"], 100)
+        self.assertGreater(ai.get_stats()[0]["max_depth"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
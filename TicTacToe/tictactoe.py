@@ -1,18 +1,25 @@
 from __future__ import annotations
 import sys
+import json
+import time
+import random
 import argparse
-from typing import List, Optional, Tuple, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, TextIO, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
     from tictactoe_ai import TicTacToeAI
 
-from tictactoe_ai import (RandomAI, WinningAI, WinningLosingAI, PerfectAI, 
-                          CachePerfectAI, AlphaBetaPerfectAI, QuickPerfectAI, 
-                          UltimateAI)
+from bitboard import BitBoard, Bits, Snapshot
+from scorecache import DEFAULT_PATH as DEFAULT_SCORES, get_cache
+from sequential import ACCEPT_H0, ACCEPT_H1, SequentialTest, rate_interval
+from tictactoe_ai import AIS, create_ai
 
-"""This module contains a class for the Tic Tac Toe game as well as
-code for running the program from the command line.
+"""This module contains a class for the Tic Tac Toe game, and the base
+class it shares with the other games on a board, as well as code for
+running the program from the command line.
 
 Classes:
+- BoardGame
 - TicTacToe
 """
 
@@ -20,34 +27,63 @@ Classes:
 Piece = Optional[str]
 Board = List[List[Piece]]
 
-class TicTacToe:
-    """This is a class for the Tic Tac Toe game. 
+class BoardGame:
+    """This is a base class for games where two players take turns to
+    place pieces on a board, e.g. Tic Tac Toe.
 
     It contains the necessary functions to play a game as well as to
-    test AIs against each other any number of times.
+    test AIs against each other any number of times. The board methods
+    play Tic Tac Toe on a 3x3 matrix, and subclasses for other boards
+    override them.
 
     Public Methods:
+    - get_width() -> int
+    - get_height() -> int
     - get_square(x: int, y: int) -> Piece
     - set_square(x: int, y: int, piece: Piece) -> None
+    - get_board() -> Board
     - get_turn() -> str
+    - set_turn(turn: str) -> None
     - make_move(board: Board, x: int, y: int, 
       turn: str) -> Board
     - find_winner(board: Board) -> Optional[str]
     - board_full(board: Board) -> bool
+    - legal_moves(board: Board) -> List[Tuple[int, int]]
     - load(player: Optional[TicTacToeAI], piece: str) -> None
     - play() -> None
-    - test(n: int) -> None
+    - test(n: int, workers: int = 1, seed: Optional[int] = None,
+      width: Optional[float] = None,
+      sprt: Optional[Tuple[float, float]] = None,
+      confidence: float = 0.95) -> None
+    - record(n: int, out: TextIO, workers: int = 1,
+      seed: Optional[int] = None) -> Tuple[int, int, int]
+    - replay(seed: int, number: int) -> Dict
     """
+
+    RECORD_CHUNK = 100 # Games played at once by each process in record
+    TEST_BATCH = 100 # Games played between checks in a sequential test
     
     def __init__(self) -> None:
-        """Initialise a game of Tic Tac Toe."""
+        """Initialise a game."""
         # Represent the board with a 3x3 matrix where None denotes an
         # empty square, "O" denotes O and "X" denotes X
-        self._board = [[None for y in range(3)] for x in range(3)]
+        self._board = self._new_board()
         self._turn = "O" # Tracks whose turn it is
         self._O = None # Tracks who is making the moves for O (None = human)
         self._X = None # Tracks who is making the moves for X
 
+    def _new_board(self) -> Board:
+        """Return an empty board."""
+        return [[None for y in range(3)] for x in range(3)]
+
+    def get_width(self) -> int:
+        """Return the number of columns of the board."""
+        return len(self._board)
+
+    def get_height(self) -> int:
+        """Return the number of rows of the board."""
+        return len(self._board[0])
+
     def get_square(self, x: int, y: int) -> Piece:
         """Return the piece in the (x,y) square."""
         return self._board[x][y]
@@ -61,10 +97,24 @@ class TicTacToe:
                 raise TypeError()
         self._board[x][y] = piece
 
+    def get_board(self) -> Board:
+        """Return a copy of the board, which the board methods below
+        can be called on."""
+        return [column[:] for column in self._board]
+
     def get_turn(self) -> str:
         """Return whose turn it is."""
         return self._turn
 
+    def set_turn(self, turn: str) -> None:
+        """Set whose turn it is."""
+        if not (turn == "X" or turn == "O"):
+            if isinstance(turn, str):
+                raise ValueError("Invalid piece specified.")
+            else:
+                raise TypeError()
+        self._turn = turn
+
     def _get_move(self) -> Tuple[int, int]:
         """Get a move from the player and return it."""
         x = int(input("What is your X coordinate?: "))
@@ -122,6 +172,15 @@ class TicTacToe:
                     return False
         return True
 
+    def legal_moves(self, board: Board) -> List[Tuple[int, int]]:
+        """Return the empty squares of the board in row-major order."""
+        legal = []
+        for x in range(3):
+            for y in range(3):
+                if board[x][y] == None:
+                    legal.append((x, y))
+        return legal
+
     def _print(self) -> None:
         """Print the board."""
         print("     0   1   2") 
@@ -152,7 +211,7 @@ class TicTacToe:
     def play(self) -> None:
         """Play a game of Tic Tac Toe."""
         # Reset the game
-        self._board = [[None for y in range(3)] for x in range(3)]
+        self._board = self._new_board()
         self._turn = "O"
         self._print()
         winner = None
@@ -193,14 +252,173 @@ class TicTacToe:
         elif winner == "X":
             print("X won the game!")
 
-    def test(self, n: int) -> None:
+    def test(self, n: int, workers: int = 1, 
+             seed: Optional[int] = None, width: Optional[float] = None,
+             sprt: Optional[Tuple[float, float]] = None,
+             confidence: float = 0.95) -> None:
         """Test the effectiveness of two AI by having them play against
-        each other n times, and print the results to the terminal."""
+        each other n times, and print the results to the terminal.
+
+        If workers is greater than 1, the games are split between that
+        many processes, each with its own copy of the AIs. If a seed is
+        specified, each game is played with random number streams for
+        the AIs derived from it and the game's number, so that results
+        can be reproduced whatever the number of processes, and any one
+        game can be played again with replay.
+
+        If a width or an SPRT (the differences d0 and d1 to decide
+        between) is specified, n is only the most games to play: they
+        are played in batches of TEST_BATCH, and the test stops as soon
+        as the confidence interval of the difference between O's and
+        X's win rates is narrower than width or the SPRT decides (see
+        sequential.py). The number of games played and the confidence
+        intervals of the win rates are printed along with the results.
+
+        For each AI that has been instrumented, a summary of its search
+        statistics is printed too.
+        """
         assert(self._O != None and self._X != None), "AIs not loaded."
+        sequential = None
+        if width == None and sprt == None:
+            O_wins, X_wins, draws = self._run_games(n, workers, seed)
+        else:
+            sequential = SequentialTest(width, sprt, confidence)
+            reason = self._run_sequential(n, workers, seed, sequential)
+            O_wins, X_wins, draws = sequential.get_counts()
+            self._print_stop(n, sequential, reason)
+        played = O_wins + X_wins + draws
+        print(f"O won {O_wins} times, X won {X_wins} times and there were "+
+              f"{draws} draws.")
+        print(f"O had a win rate of {O_wins/played*100:.2f}%, X had a win "
+              + f"rate of {X_wins/played*100:.2f}% and the draw rate was "
+              + f"{draws/played*100:.2f}%.")
+        if sequential != None:
+            O_low, O_high = rate_interval(O_wins, played, confidence)
+            X_low, X_high = rate_interval(X_wins, played, confidence)
+            low, high = sequential.get_interval()
+            print(f"With {confidence*100:g}% confidence, O's win rate is "
+                  + f"{O_low*100:.2f}% to {O_high*100:.2f}%, X's is "
+                  + f"{X_low*100:.2f}% to {X_high*100:.2f}% and O's less "
+                  + f"X's is {low*100:.2f}% to {high*100:.2f}%.")
+        for piece, ai in [("O", self._O), ("X", self._X)]:
+            stats = ai.get_stats()
+            if stats:
+                self._print_stats(piece, stats)
+
+    def _run_sequential(self, n: int, workers: int,
+                        seed: Optional[int],
+                        sequential: SequentialTest) -> Optional[str]:
+        """Helper function for test. Play batches of games between the
+        AIs, adding each to the sequential test, until it says to stop
+        or n games have been played, and return why it stopped (None if
+        it didn't). The games are numbered on from one batch to the
+        next, so each is seeded as it would be without stopping early.
+        Every batch is played by the same processes, which keep their
+        copies of the AIs, and so their caches, from one to the next."""
+        executor = self._new_executor(workers) if workers > 1 else None
+        try:
+            played = 0
+            while played < n:
+                batch = min(self.TEST_BATCH, n - played)
+                sequential.add(*self._run_games(batch, workers, seed, played,
+                                                executor))
+                played += batch
+                reason = sequential.decide()
+                if reason != None:
+                    return reason
+            return None
+        finally:
+            if executor != None:
+                executor.shutdown()
+
+    def _print_stop(self, n: int, sequential: SequentialTest,
+                    reason: Optional[str]) -> None:
+        """Helper function for test. Print how many games a sequential
+        test played and why it stopped."""
+        played = sequential.get_games()
+        if reason == None:
+            print(f"Played all {n} games without the result becoming "
+                  + "conclusive.")
+        elif reason in (ACCEPT_H0, ACCEPT_H1):
+            print(f"Stopped after {played} of {n} games as the SPRT "
+                  + f"accepted {reason} (log-likelihood ratio "
+                  + f"{sequential.get_llr():.2f}).")
+        else:
+            low, high = sequential.get_interval()
+            print(f"Stopped after {played} of {n} games as the confidence "
+                  + f"interval had narrowed to {(high - low)*100:.2f}%.")
+
+    def _print_stats(self, piece: str, stats: List[Dict[str, float]]) -> None:
+        """Helper function for test. Print a summary of the search
+        statistics of the AI playing piece."""
+        moves = len(stats)
+        mean = {key: sum(move[key] for move in stats) / moves
+                for key in stats[0]}
+        print(f"{piece} searched {mean['nodes']:.1f} nodes with "
+              + f"{mean['cutoffs']:.1f} cutoffs, {mean['hits']:.1f} cache "
+              + f"hits and {mean['inserts']:.1f} cache inserts per move on "
+              + "average, searching up to "
+              + f"{max(move['max_depth'] for move in stats)} moves ahead "
+              + f"and taking {mean['time']*1000:.3f}ms per move over "
+              + f"{moves} moves.")
+
+    def _run_games(self, n: int, workers: int = 1,
+                   seed: Optional[int] = None, first: int = 0,
+                   executor: Optional[ProcessPoolExecutor] = None
+                   ) -> Tuple[int, int, int]:
+        """Helper function for test. Play n games between the AIs,
+        numbered from first, and return the number of O wins, X wins
+        and draws. With more than one worker, the games are played by
+        the executor, as made by _new_executor, or by a new one if none
+        is specified."""
+        # Split the games as evenly as possible between the workers
+        shards = [n // workers + (i < n % workers) for i in range(workers)]
+        starts = [first + sum(shards[:i]) for i in range(workers)]
+        if workers == 1:
+            return self._play_shard(starts[0], shards[0], seed)
+        if executor == None:
+            with self._new_executor(workers) as executor:
+                return self._run_games(n, workers, seed, first, executor)
+        results = list(executor.map(_play_worker_shard, starts, shards,
+                                    [seed] * workers))
+        for counts, stats in results:
+            for ai, ai_stats in zip([self._O, self._X], stats):
+                if ai_stats != None:
+                    ai.add_stats(ai_stats)
+        return tuple(sum(counts) for counts in 
+                     zip(*[counts for counts, stats in results]))
+
+    def _new_executor(self, workers: int) -> ProcessPoolExecutor:
+        """Helper function for test. Return an executor with the
+        specified number of processes, each of which gets a pickled
+        copy of the game, and so of the AIs, once when it starts."""
+        return ProcessPoolExecutor(workers, initializer=_start_worker,
+                                   initargs=(self,))
+
+    def _play_shard_with_stats(self, first: int, n: int,
+                               seed: Optional[int]
+                               ) -> Tuple[Tuple[int, int, int],
+                                          List[Optional[List[Dict]]]]:
+        """Helper function for _run_games. Play n games as _play_shard
+        does and return the results along with the statistics each AI
+        recorded while playing them (None if it isn't instrumented)."""
+        ais = [self._O, self._X]
+        before = [len(ai.get_stats() or []) for ai in ais]
+        counts = self._play_shard(first, n, seed)
+        stats = [None if ai.get_stats() == None else ai.get_stats()[start:]
+                 for ai, start in zip(ais, before)]
+        return (counts, stats)
+
+    def _play_shard(self, first: int, n: int,
+                    seed: Optional[int]) -> Tuple[int, int, int]:
+        """Helper function for _run_games. Play n games between the AIs,
+        numbered from first, and return the number of O wins, X wins
+        and draws, seeding each game if a seed is specified."""
         O_wins = 0
         X_wins = 0
         draws = 0
-        for i in range(n):
+        for number in range(first, first + n):
+            self._seed_game(seed, number)
             winner = self._play_quietly()
             if winner == "O":
                 O_wins += 1
@@ -208,16 +426,25 @@ class TicTacToe:
                 X_wins += 1
             elif winner == None:
                 draws += 1
-        print(f"O won {O_wins} times, X won {X_wins} times and there were "+
-              f"{draws} draws.")
-        print(f"O had a win rate of {O_wins/n*100:.2f}%, X had a win rate of "+ 
-              f"{X_wins/n*100:.2f}% and the draw rate was {draws/n*100:.2f}%.")
+        return (O_wins, X_wins, draws)
+
+    def _seed_game(self, seed: Optional[int], number: int) -> None:
+        """Helper function for test and record. Give each AI its own
+        random number stream for the game with the specified number in
+        a run with the specified seed; without a seed, the AIs keep the
+        streams they have. The streams are seeded with a string, which
+        Python hashes with SHA-512, so they are independent of each
+        other and the same in every process."""
+        if seed == None:
+            return
+        for piece, ai in [("O", self._O), ("X", self._X)]:
+            ai.set_rng(random.Random(f"{seed}:{number}:{piece}"))
 
     def _play_quietly(self) -> Optional[str]:
         """Helper function for test. Play two AIs against each other
         and return the winner; return None if it was a draw."""
         assert(self._O != None and self._X != None), "AIs not loaded."
-        self._board = [[None for y in range(3)] for x in range(3)]
+        self._board = self._new_board()
         self._turn = "O"
         winner = None
         while winner == None and not self.board_full(self._board):
@@ -234,71 +461,247 @@ class TicTacToe:
             winner = self.find_winner(self._board)
         return winner
 
+    def record(self, n: int, out: TextIO, workers: int = 1,
+               seed: Optional[int] = None) -> Tuple[int, int, int]:
+        """Play n games between the AIs, writing each game to out as a
+        line of JSON as soon as it is finished, and return the number
+        of O wins, X wins and draws.
+
+        Each line holds the game's number, the moves made, the winner
+        (null for a draw) and the seconds each move took to find. The
+        games are played in chunks of RECORD_CHUNK, spread between the
+        specified number of processes, and written in order. If a seed
+        is specified, each game is seeded as in test, so the same seed
+        gives the same games whatever the number of processes and
+        replay can play any one of them again.
+        """
+        assert(self._O != None and self._X != None), "AIs not loaded."
+        starts = list(range(0, n, self.RECORD_CHUNK))
+        chunks = [min(self.RECORD_CHUNK, n - start) for start in starts]
+        counts = {"O": 0, "X": 0, None: 0}
+        number = 0
+
+        def write(games: List[Dict]) -> None:
+            nonlocal number
+            for game in games:
+                line = json.dumps({"game": number, **game})
+                out.write(line + "\n")
+                counts[game["winner"]] += 1
+                number += 1
+            out.flush()
+
+        if workers == 1:
+            for start, chunk in zip(starts, chunks):
+                write(self._record_chunk(start, chunk, seed))
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                # Results come back in order as soon as each chunk and
+                # those before it are finished
+                for games in executor.map(self._record_chunk, starts,
+                                          chunks, [seed] * len(chunks)):
+                    write(games)
+        return (counts["O"], counts["X"], counts[None])
+
+    def _record_chunk(self, first: int, n: int,
+                      seed: Optional[int]) -> List[Dict]:
+        """Helper function for record. Play n games between the AIs,
+        numbered from first and seeded if a seed is specified, and
+        return a record of each one."""
+        games = []
+        for number in range(first, first + n):
+            self._seed_game(seed, number)
+            games.append(self._play_recorded())
+        return games
+
+    def replay(self, seed: int, number: int) -> Dict:
+        """Play the game with the specified number from a test or
+        recording run with the specified seed again, and return its
+        record as record writes it. With the same AIs, the moves and
+        winner are the same as they were, so a game can be studied or
+        profiled on its own."""
+        assert(self._O != None and self._X != None), "AIs not loaded."
+        self._seed_game(seed, number)
+        return {"game": number, **self._play_recorded()}
+
+    def _play_recorded(self) -> Dict:
+        """Helper function for record. Play two AIs against each other
+        and return the moves made, the winner and the time each move
+        took to find."""
+        self._board = self._new_board()
+        self._turn = "O"
+        winner = None
+        moves = []
+        latencies = []
+        while winner == None and not self.board_full(self._board):
+            ai = self._O if self._turn == "O" else self._X
+            start = time.perf_counter()
+            x, y = ai.find_move()
+            latencies.append(time.perf_counter() - start)
+            moves.append([x, y])
+            self._board = self.make_move(self._board, x, y, self._turn)
+            self._turn = "X" if self._turn == "O" else "O"
+            winner = self.find_winner(self._board)
+        return {"moves": moves, "winner": winner, "latency": latencies}
+
+# The game playing shards of games in a worker process of
+# BoardGame._run_games
+_worker_game = None
+
+def _start_worker(game: BoardGame) -> None:
+    """Keep the game for playing every shard the worker is given."""
+    global _worker_game
+    _worker_game = game
+
+def _play_worker_shard(first: int, n: int, seed: Optional[int]
+                       ) -> Tuple[Tuple[int, int, int],
+                                  List[Optional[List[Dict]]]]:
+    """Play a shard of games with the worker's game, as
+    _play_shard_with_stats does."""
+    return _worker_game._play_shard_with_stats(first, n, seed)
+
+class TicTacToe(BoardGame):
+    """This is a class for the Tic Tac Toe game.
+
+    Its board can also be handed out as a bitboard, and the position
+    as a snapshot (see bitboard.py), which only exist for the 3x3
+    board, so AIs asked to search bitboards and the AIs which play from
+    snapshots can only play this game.
+
+    The snapshot of the current position is made the first time it is
+    asked for and then handed out again until the board or the turn
+    changes, so AIs can ask for it as often as they like.
+
+    Public Methods:
+    - get_bitboard() -> Bits
+    - get_snapshot() -> Snapshot
+    """
+
+    def __init__(self) -> None:
+        """Initialise a game of Tic Tac Toe."""
+        self._snapshot = None # Snapshot of the position, once made
+        super().__init__()
+
+    # The board and the turn are properties so that replacing either
+    # drops the snapshot
+    @property
+    def _board(self) -> Board:
+        return self._squares
+
+    @_board.setter
+    def _board(self, board: Board) -> None:
+        self._squares = board
+        self._snapshot = None
+
+    @property
+    def _turn(self) -> str:
+        return self._to_move
+
+    @_turn.setter
+    def _turn(self, turn: str) -> None:
+        self._to_move = turn
+        self._snapshot = None
+
+    def set_square(self, x: int, y: int, piece: Piece) -> None:
+        super().set_square(x, y, piece)
+        self._snapshot = None # The board was changed in place
+
+    def get_bitboard(self) -> Bits:
+        """Return the current board as a bitboard."""
+        return self.get_snapshot().pieces
+
+    def get_snapshot(self) -> Snapshot:
+        """Return an immutable snapshot of the current position (see
+        bitboard.py), which stays the same as the game goes on."""
+        if self._snapshot == None:
+            self._snapshot = Snapshot(BitBoard().from_board(self._squares),
+                                      self._to_move)
+        return self._snapshot
+
 if __name__ == '__main__':
     # Code for -test flag
     parser = argparse.ArgumentParser()
     parser.add_argument("-test", action="store_true")
+    parser.add_argument("-workers", type=int, default=1,
+                        help="number of processes to run tests with")
+    parser.add_argument("-seed", type=int, default=None,
+                        help="seed for reproducible tests")
+    parser.add_argument("-stats", action="store_true",
+                        help="report search statistics after tests")
+    parser.add_argument("-width", type=float, default=None,
+                        help="stop testing once the confidence interval "
+                             + "of O's win rate less X's is this narrow")
+    parser.add_argument("-sprt", type=float, nargs=2, default=None,
+                        metavar=("D0", "D1"),
+                        help="stop testing once an SPRT decides whether "
+                             + "O's win rate less X's is D0 or D1")
+    parser.add_argument("-confidence", type=float, default=0.95,
+                        help="confidence level of the intervals")
+    parser.add_argument("-scores", nargs="?", const=DEFAULT_SCORES,
+                        default=None, metavar="PATH",
+                        help="look scores up in the score cache rather "
+                             + "than searching for them")
+    # Code for playing without being asked anything
+    parser.add_argument("-O", default=None, help="player for O")
+    parser.add_argument("-X", default=None, help="player for X")
+    parser.add_argument("-games", type=int, default=None,
+                        help="play this many games between the AIs "
+                             + "and record each one as a line of JSON")
+    parser.add_argument("-output", default="-",
+                        help="file to record the games in (- for stdout)")
+    parser.add_argument("-replay", type=int, default=None, metavar="GAME",
+                        help="play game number GAME of a test or recording "
+                             + "with the same -seed again and print it")
     args = parser.parse_args()
 
     # Retrieve who will be playing from user
     game = TicTacToe()
-    ai_O = input("Who would you like to have play as O?: ")
-    ai_X = input("Who would you like to have play as X?: ")
-    if args.test:
+    tables = {} # Caches shared by AIs of the same kind
+    scores = None if args.scores == None else get_cache(args.scores)
+    ai_O = args.O
+    if ai_O == None:
+        ai_O = input("Who would you like to have play as O?: ")
+    ai_X = args.X
+    if ai_X == None:
+        ai_X = input("Who would you like to have play as X?: ")
+    if args.test and args.games == None and args.replay == None:
         n = int(input("How many games would you like the AIs to play?: "))
+    elif args.test:
+        n = args.games
 
-    # Load in player for O
-    if ai_O == "random":
-        game.load(RandomAI(game), "O")
-    elif ai_O == "winning":
-        game.load(WinningAI(game), "O")
-    elif ai_O == "winning-losing":
-        game.load(WinningLosingAI(game), "O")
-    elif ai_O == "perfect":
-        game.load(PerfectAI(game), "O")
-    elif ai_O == "cache-perfect":
-        game.load(CachePerfectAI(game), "O")
-    elif ai_O == "alpha-beta":
-        game.load(AlphaBetaAI(game), "O")
-    elif ai_O == "quick-perfect":
-        game.load(QuickPerfectAI(game), "O")
-    elif ai_O == "ultimate":
-        game.load(UltimateAI(game), "O")
-    elif ai_O != "human":
-        raise ValueError("Invalid player for O has been specified.\nPlease "
-                        + "choose from one of the following options:\n"
-                        + "- random\n- winning\n- winning-losing\n- perfect\n"
-                        + "- cache-perfect\n- alpha-beta\n- quick-perfect\n"
-                        + "- ultimate\n- human")
-
-    # Load in player for X
-    if ai_X == "random":
-        game.load(RandomAI(game), "X")
-    elif ai_X == "winning":
-        game.load(WinningAI(game), "X")
-    elif ai_X == "winning-losing":
-        game.load(WinningLosingAI(game), "X")
-    elif ai_X == "perfect":
-        game.load(PerfectAI(game), "X")
-    elif ai_X == "cache-perfect":
-        game.load(CachePerfectAI(game), "X")
-    elif ai_X == "alpha-beta":
-        game.load(AlphaBetaAI(game), "X")
-    elif ai_X == "quick-perfect":
-        game.load(QuickPerfectAI(game), "X")
-    elif ai_X == "ultimate":
-        game.load(UltimateAI(game), "X")
-    elif ai_X != "human":
-        raise ValueError("Invalid player for X has been specified.\nPlease "
-                        + "choose from one of the following options:\n"
-                        + "- random\n- winning\n- winning-losing\n- perfect\n"
-                        + "- cache-perfect\n- alpha-beta\n- quick-perfect\n"
-                        + "- ultimate\n - human")
-
-    # Execute tests or play
-    if args.test:
-        if ai_O == "human" or ai_X == "human":
-            raise ValueError("Cannot have a human player when running tests.")
-        game.test(n)
+    # Load in the players
+    for piece, player in [("O", ai_O), ("X", ai_X)]:
+        if player == "human":
+            continue
+        if player not in AIS:
+            raise ValueError(f"Invalid player for {piece} has been specified."
+                             + "\nPlease choose from one of the following "
+                             + "options:\n"
+                             + "".join(f"- {ai}\n" for ai in AIS) 
+                             + "- human")
+        ai = create_ai(player, game, tables, scores)
+        if args.stats:
+            ai.instrument()
+        game.load(ai, piece)
+
+    # Execute tests, record games or play
+    if ((args.test or args.games != None or args.replay != None)
+            and "human" in (ai_O, ai_X)):
+        raise ValueError("Cannot have a human player when running tests.")
+    if args.replay != None:
+        if args.seed == None:
+            raise ValueError("Cannot replay a game without its seed.")
+        print(json.dumps(game.replay(args.seed, args.replay)))
+    elif args.test:
+        game.test(n, args.workers, args.seed, args.width, args.sprt,
+                  args.confidence)
+    elif args.games != None:
+        if args.output == "-":
+            game.record(args.games, sys.stdout, args.workers, args.seed)
+        else:
+            with open(args.output, "w") as out:
+                O_wins, X_wins, draws = game.record(args.games, out, 
+                                                    args.workers, args.seed)
+            print(f"O won {O_wins} times, X won {X_wins} times and there "
+                  + f"were {draws} draws. Games saved to {args.output}.")
     else:
-        game.play()
\ No newline at end of file
+        game.play()
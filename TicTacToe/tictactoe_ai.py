@@ -1,10 +1,23 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, TYPE_CHECKING
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
-    from tictactoe import TicTacToe
+    from tictactoe import BoardGame, TicTacToe
 
+import math
+import time
 import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import (BitBoard, Bits, BITS_OF, FULL, LINES, LINES_THROUGH,
+                      SQUARES, Snapshot, position_index)
+from learner import DEFAULT_PATH as DEFAULT_VALUES, get_values
+from ordering import MoveOrdering
+from scorecache import ScoreCache
+from search import SearchCore, SearchCounters
+from solver import DEFAULT_PATH, get_table
+from transposition import TranspositionTable
 
 """This module contains the classes for our various Tic Tac Toe AIs.
 
@@ -12,10 +25,21 @@ Classes:
 - RandomAI
 - WinningAI
 - PerfectAI
+- SolvedAI
 - CachePerfectAI
 - AlphaBetaPerfectAI
 - QuickPerfectAI
 - UltimateAI
+- TreeNode
+- TreeSearchAI
+- MCTSAI
+- LearnedAI
+
+Functions:
+- create_ai(name: str, game: TicTacToe, 
+  tables: Dict[str, TranspositionTable],
+  scores: Optional[ScoreCache] = None) -> TicTacToeAI
+- other_factors(bits: Bits, me: str) -> int
 """
 
 # Type aliases
@@ -25,376 +49,409 @@ Board = List[List[Piece]]
 class TicTacToeAI(ABC):
     """A simple interface for our Tic Tac Toe AIs.
 
+    The AIs can search either the 3x3 matrix used by TicTacToe or a
+    bitboard (see bitboard.py); passing bitboard=True opts into the
+    latter without changing the moves the AI finds. Only TicTacToe hands
+    out bitboards, so the other board games are rejected then. AIs
+    which play from the game's snapshots (see TicTacToe.get_snapshot)
+    set SNAPSHOTS, and reject the other board games whatever they
+    search.
+
+    Calling instrument makes the AI record statistics about the search
+    it makes in each call to find_move. Until then, the AI does no
+    extra work to keep them.
+
+    AIs which play at random draw their random numbers from their own
+    stream, rng, which by default is the random module's global one.
+    Giving an AI a seeded stream (see set_rng) makes the moves it finds
+    reproducible without touching any other AI's.
+
     Public Methods:
     - find_move() -> Option[Tuple[int, int]]
+    - set_rng(rng: random.Random) -> None
+    - instrument() -> None
+    - get_stats() -> Optional[List[Dict[str, float]]]
+    - add_stats(stats: List[Dict[str, float]]) -> None
     """
-    def __init__(self, game: TicTacToe) -> None:
+
+    SNAPSHOTS = False # Whether the AI plays from the game's snapshots
+
+    def __init__(self, game: BoardGame, bitboard: bool = False,
+                 rng: Optional[random.Random] = None) -> None:
+        if bitboard and not hasattr(game, "get_bitboard"):
+            raise ValueError("Bitboards only exist for Tic Tac Toe.")
+        if self.SNAPSHOTS and not hasattr(game, "get_snapshot"):
+            raise ValueError(f"{type(self).__name__} can only play "
+                             + "Tic Tac Toe.")
         self._game = game
+        self._bitboard = bitboard
+        # The functions of the random module share its global stream
+        self._rng = rng if rng != None else random
+        # The object that carries out board operations for the AI
+        self._rules = BitBoard() if bitboard else game
+        self._stats = None # Statistics of each move, once instrumented
+        self._counters = None
 
     @abstractmethod
     def find_move(self) -> Option[Tuple[int, int]]:
         """Find a legal move to make; if there is no move available
         return None."""
         pass
+
+    def set_rng(self, rng: random.Random) -> None:
+        """Draw random numbers from rng from now on. AIs which keep
+        anything random from earlier moves forget it, so that the moves
+        they find from here on depend only on rng."""
+        self._rng = rng
+
+    def __getstate__(self) -> Dict:
+        # A copy of an AI using the global stream, e.g. one sent to
+        # another process, uses the global stream where it ends up
+        state = self.__dict__.copy()
+        if state["_rng"] == random:
+            state["_rng"] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        if self._rng == None:
+            self._rng = random
+
+    def instrument(self) -> None:
+        """Record statistics about each call to find_move from now on:
+        the time taken along with the counts kept by SearchCounters
+        (see search.py). Counts of work the AI doesn't do, like table
+        lookups by an AI without a table, are zero."""
+        if self._stats != None:
+            return
+        self._stats = []
+        self._counters = SearchCounters()
+        self._count_with(self._counters)
+        self.find_move = self._find_move_counted
+
+    def get_stats(self) -> Optional[List[Dict[str, float]]]:
+        """Return the statistics of each call to find_move since the AI
+        was instrumented, or None if it hasn't been."""
+        return self._stats
+
+    def add_stats(self, stats: List[Dict[str, float]]) -> None:
+        """Add the statistics recorded by a copy of the AI, e.g. one
+        playing in another process, to this AI's."""
+        if self._stats == None:
+            raise ValueError("AI has not been instrumented.")
+        self._stats.extend(stats)
+
+    def _count_with(self, counters: SearchCounters) -> None:
+        """Make the AI's search add to the counters. AIs which search
+        override this."""
+        pass
+
+    def _find_move_counted(self) -> Option[Tuple[int, int]]:
+        """Find a move as find_move does, recording its statistics."""
+        self._counters.clear()
+        start = time.perf_counter()
+        move = type(self).find_move(self)
+        stats = self._counters.to_dict()
+        stats["time"] = time.perf_counter() - start
+        self._stats.append(stats)
+        return move
     
-    def _test_winning_move(self, x: int, y: int) -> bool:
-        """Test a move to see if it is a winning one for the AI."""
+    def _current_board(self) -> Board:
+        """Return a copy of the game's board in the representation
+        used by the AI."""
+        if self._bitboard:
+            return self._game.get_bitboard()
+        return self._game.get_board()
+
+    def _test_winning_move(self, x: int, y: int,
+                           board: Optional[Board] = None) -> bool:
+        """Test a move to see if it is a winning one for the AI. The
+        move is made on board, as given by _current_board, if it is
+        specified, which saves copying the game's board again."""
         me = self._game.get_turn()
-        # Copy board state
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                 for x in range(3)]
-        board[x][y] = me
-        winner = self._game.find_winner(board)
+        if board == None:
+            board = self._current_board()
+        board = self._rules.make_move(board, x, y, me)
+        winner = self._rules.find_winner(board)
         return winner == me
     
-    def _test_blocking_move(self, x: int, y: int) -> bool:
+    def _test_blocking_move(self, x: int, y: int,
+                            board: Optional[Board] = None) -> bool:
         """Test a move to see if it is a blocking move i.e. stops the
-        other player from winning."""
+        other player from winning. As with _test_winning_move, the
+        current board can be specified."""
         me = self._game.get_turn()
         if me == "O":
             other_player = "X"
         elif me == "X":
             other_player = "O"
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                 for x in range(3)]
-        board[x][y] = other_player
-        winner = self._game.find_winner(board)
+        if board == None:
+            board = self._current_board()
+        board = self._rules.make_move(board, x, y, other_player)
+        winner = self._rules.find_winner(board)
         return winner == other_player
 
 class RandomAI(TicTacToeAI):
     """A TicTacToe AI that finds random moves."""
 
     def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
+        board = self._current_board()
+        if self._rules.board_full(board):
             return None
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if board[x][y] == None:
-                    legal.append((x, y))
-        return random.choice(legal)
+        legal = self._rules.legal_moves(board)
+        return self._rng.choice(legal)
 
 class WinningAI(TicTacToeAI):
     """A TicTacToe AI that finds winning moves if they exist, and
     finds random moves otherwise."""
 
     def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
+        board = self._current_board()
+        if self._rules.board_full(board):
             return None
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if board[x][y] == None:
-                    legal.append((x, y))
+        legal = self._rules.legal_moves(board)
         me = self._game.get_turn()
         for x, y in legal:
-            if self._test_winning_move(x, y):
+            if self._test_winning_move(x, y, board):
                 return (x, y)
-        return random.choice(legal)
+        return self._rng.choice(legal)
 
 class WinningLosingAI(TicTacToeAI):
     """A TicTacToe AI that finds winning moves if they exist, blocks
     losing moves if they exist, and otherwise plays a random move."""
 
     def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
+        board = self._current_board()
+        if self._rules.board_full(board):
             return None
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if self._game.get_square(x, y) == None:
-                    legal.append((x, y))
+        legal = self._rules.legal_moves(board)
         me = self._game.get_turn()
         blocking = None
         for x, y in legal:
-            if self._test_winning_move(x, y):
+            if self._test_winning_move(x, y, board):
                 return (x, y)
-            if self._test_blocking_move(x, y):
+            if self._test_blocking_move(x, y, board):
                 blocking = (x, y)
         if blocking != None:
             return blocking
-        return random.choice(legal)
+        return self._rng.choice(legal)
+
+# Type alias for the scores of the legal moves in a position
+MoveScores = Dict[Tuple[int, int], int]
 
 class PerfectAI(TicTacToeAI):
     """A Tic Tac Toe AI that plays perfectly using the naive minimax
-    algorithm."""
+    algorithm.
+
+    The search itself is carried out by a SearchCore (see search.py),
+    which subclasses configure with pruning and caching.
+
+    Besides finding a move in the game, the AI can score every legal
+    move in any number of positions at once, without touching the game.
+    The positions are searched with the AI's own cache, so the caching
+    AIs reuse what they find in one position for the rest.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - score_moves(positions: Sequence[Tuple[Bits, str]],
+      workers: int = 1) -> List[MoveScores]
+    """
+
+    SNAPSHOTS = True
+
+    def __init__(self, game: TicTacToe, bitboard: bool = False) -> None:
+        super().__init__(game, bitboard)
+        self._core = self._new_core()
+
+    def _new_core(self) -> SearchCore:
+        """Return the search core used by the AI."""
+        return SearchCore()
+
+    def _count_with(self, counters: SearchCounters) -> None:
+        self._core = self._core.counting(counters)
 
     def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
+        snapshot = self._game.get_snapshot()
+        legal = snapshot.get_empty()
+        if not legal: # Board is full
             return None
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if self._game.get_square(x, y) == None:
-                    legal.append((x, y))
-        me = self._game.get_turn()
+        self._core.set_position(*snapshot)
         best_score = -100
         best_move = None
         for x, y in legal:
-            new_board = self._game.make_move(board, x, y, me)
-            if me == "O":
-                other_player = "X"
-            else:
-                other_player = "O"
-            score = self._minimax_score(new_board, me, other_player)
+            score = self._core.score_move(3*x + y)
             if score > best_score:
                 best_score = score
                 best_move = (x, y)
         return best_move
 
-    def _minimax_score(self, board: Board, me: str, turn: str) -> int:
-        """Return the minimax_score for a given board state."""
-        winner = self._game.find_winner(board)
-        if winner == me: # Winner is me
-            return 10
-        elif winner != None: # Winner is other player
-            return -10
-        elif self._game.board_full(board): # Draw
-            return 0
-        # Game is in a non-terminal state
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if board[x][y] == None:
-                    legal.append((x, y))
-        # Calculate minimax scores for all possible (legal) game states one
-        # turn from now
-        scores = []
-        for x, y in legal:
-            new_board = self._game.make_move(board, x, y, turn)
+    def score_moves(self, positions: Sequence[Tuple[Bits, str]],
+                    workers: int = 1) -> List[MoveScores]:
+        """Return the minimax score (as in find_move) of every legal
+        move in each of the positions, given as bitboards along with
+        whose turn it is. Positions where the game is over have no
+        legal moves.
+
+        With more than one worker, the positions are split into chunks
+        which are scored in that many processes. Each process gets a
+        copy of the AI, and so of its cache, which it keeps for all of
+        the chunks it scores.
+        """
+        if workers == 1:
+            return [self._score_position(bits, turn)
+                    for bits, turn in positions]
+        # Several chunks per worker so that the work is shared evenly
+        size = max(-(-len(positions) // (4 * workers)), 1)
+        chunks = [positions[i:i + size]
+                  for i in range(0, len(positions), size)]
+        with ProcessPoolExecutor(workers, initializer=_start_worker,
+                                 initargs=(self,)) as executor:
+            results = list(executor.map(_score_chunk, chunks))
+        return [scores for chunk in results for scores in chunk]
+
+    def _score_position(self, bits: Bits, turn: str) -> MoveScores:
+        """Return the score of every legal move in the position."""
+        if Snapshot(bits, turn).get_winner() != None:
+            return {}
+        self._core.set_position(bits, turn)
+        return {SQUARES[square]: self._core.score_move(square)
+                for square in BITS_OF[FULL & ~(bits[0] | bits[1])]}
+
+# The AI scoring chunks of positions in a worker process of
+# PerfectAI.score_moves
+_worker_ai = None
+
+def _start_worker(ai: PerfectAI) -> None:
+    """Keep the AI for scoring every chunk the worker is given."""
+    global _worker_ai
+    _worker_ai = ai
+
+def _score_chunk(positions: Sequence[Tuple[Bits, str]]
+                 ) -> List[MoveScores]:
+    """Score every legal move in the positions with the worker's AI."""
+    return _worker_ai.score_moves(positions)
+
+class SolvedAI(PerfectAI):
+    """A Tic Tac Toe AI that plays the same moves as PerfectAI by
+    looking them up in a precomputed solution table (see solver.py).
+
+    The table is loaded from disk the first time it is needed and is
+    shared between all AIs using the same path.
+    """
+
+    def __init__(self, game: TicTacToe, bitboard: bool = False,
+                 path: str = DEFAULT_PATH) -> None:
+        super().__init__(game, bitboard)
+        self._path = path
+
+    def find_move(self) -> Option[Tuple[int, int]]:
+        snapshot = self._game.get_snapshot()
+        if not snapshot.get_empty(): # Board is full
+            return None
+        entry = get_table(self._path).lookup(*snapshot)
+        if entry == None: # Position cannot occur in a game so search it
+            return super().find_move()
+        value, best = entry
+        # PerfectAI plays the first of its best moves
+        return SQUARES[(best & -best).bit_length() - 1]
+
+    def _score_position(self, bits: Bits, turn: str) -> MoveScores:
+        if Snapshot(bits, turn).get_winner() != None:
+            return {}
+        table = get_table(self._path)
+        other = "X" if turn == "O" else "O"
+        scores = {}
+        for square in BITS_OF[FULL & ~(bits[0] | bits[1])]:
             if turn == "O":
-                next_turn = "X"
+                child = (bits[0] | 1 << square, bits[1])
             else:
-                next_turn = "O"
-            score = self._minimax_score(new_board, me, next_turn)
-            scores.append(score)
-        if me == turn: # My turn so I'll play to maximise my score
-            return max(scores)
-        else: # Other player's turn so they'll play to minimise my score
-            return min(scores)
+                child = (bits[0], bits[1] | 1 << square)
+            entry = table.lookup(child, other)
+            if entry == None: # Position cannot occur in a game
+                return super()._score_position(bits, turn)
+            scores[SQUARES[square]] = -10 * entry[0]
+        return scores
 
 class CachePerfectAI(PerfectAI):
     """A Tic Tac Toe AI that plays perfectly and more quickly using the
-    minimax algorithm and caching."""
+    minimax algorithm and caching.
 
-    def __init__(self, game: TicTacToe) -> None:
-        self._game = game
-        self._cache = {}
-
-    def _minimax_score(self, board: Board, me: str, turn: str) -> int:
-        """Return the minimax_score for a given board state."""
-        # Check cache to see if board's score has already been computed
-        cache_key = self._board_to_string(board, me, turn)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        # Since not in cache, compute board's minimax score
-        board_score = super()._minimax_score(board, me, turn)
-        # Add board state to cache
-        self._cache[cache_key] = board_score
-        # Add board states with same score to cache
-        for b in self._same_score(board):
-            b_cache_key = self._board_to_string(board, me, turn)
-            self._cache[b_cache_key] = board_score
-        return board_score
-
-    def _board_to_string(self, board: Board, me: str, turn: str) -> str:
-        """Turn the board state into a unique string which can be used
-        as the key to our cache."""
-        board_string = ""
-        for x in range(3):
-            for y in range(3):
-                if board[x][y] != None:
-                    board_string += board[x][y]
-                else:
-                    board_string += "N"
-        return board_string + me + turn
-
-    def _same_score(self, board: Board) -> List[Board]:
-        """Return a list of all the boards that are equivalent to the
-        input board in terms of minimax score i.e. rotations and
-        mirrors."""
-        north = board
-        east = self._rotate_board(board)
-        south = self._rotate_board(east)
-        west = self._rotate_board(south)
-        rotations = [north, east, south, west]
-        mirrored_h = list(map(self._mirror_board_horizontal, rotations))
-        mirrored_v = list(map(self._mirror_board_vertical, rotations))
-        return rotations + mirrored_h + mirrored_v
-
-    def _rotate_board(self, board: Board) -> Board:
-        """Rotate the board 90 degrees clockwise and return it.
-        
-        Note that the state of the input board is not changed.
-        """
-        new_board = [[None for y in range(3)] for x in range(3)]
-        new_board[0][0] = board[0][2]
-        new_board[1][0] = board[0][1]
-        new_board[2][0] = board[0][0]
-        new_board[0][1] = board[1][2]
-        new_board[1][1] = board[1][1]
-        new_board[2][1] = board[1][0]
-        new_board[0][2] = board[2][2]
-        new_board[1][2] = board[2][1]
-        new_board[2][2] = board[2][0]
-        return new_board
-
-    def _mirror_board_horizontal(self, board: Board) -> Board:
-        """Mirror the board across the y axis and return it.
-        
-        Note that the state of the input board is not changed.
-        """
-        new_board = [[None for y in range(3)] for x in range(3)]
-        new_board[0][0] = board[2][0]
-        new_board[1][0] = board[1][0]
-        new_board[2][0] = board[0][0]
-        new_board[0][1] = board[2][1]
-        new_board[1][1] = board[1][1]
-        new_board[2][1] = board[0][1]
-        new_board[0][2] = board[2][2]
-        new_board[1][2] = board[1][2]
-        new_board[2][2] = board[0][2]
-        return new_board
-
-    def _mirror_board_vertical(self, board: Board) -> Board:
-        """Mirror the board across the x axis and return it.
-        
-        Note that the state of the input board is not changed.
-        """
-        new_board = [[None for y in range(3)] for x in range(3)]
-        new_board[0][0] = board[0][2]
-        new_board[1][0] = board[1][2]
-        new_board[2][0] = board[2][2]
-        new_board[0][1] = board[0][1]
-        new_board[1][1] = board[1][1]
-        new_board[2][1] = board[2][1]
-        new_board[0][2] = board[0][0]
-        new_board[1][2] = board[1][0]
-        new_board[2][2] = board[2][0]
-        return new_board
+    Scores are cached in a transposition table where rotations and
+    mirrors of a board share an entry. Passing the same table to
+    several AIs lets them share their cached scores. Passing a
+    ScoreCache (see scorecache.py) lets the AI look up the score of
+    every move on disk rather than search for it, which skips the
+    search even on the first move a process makes.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - get_table() -> TranspositionTable
+    """
+
+    def __init__(self, game: TicTacToe, bitboard: bool = False,
+                 table: Optional[TranspositionTable] = None,
+                 scores: Optional[ScoreCache] = None) -> None:
+        if table == None:
+            table = TranspositionTable()
+        self._table = table
+        self._scores = scores
+        super().__init__(game, bitboard)
+
+    def _new_core(self) -> SearchCore:
+        """Return the search core used by the AI."""
+        return SearchCore(table=self._table, scores=self._scores)
+
+    def get_table(self) -> TranspositionTable:
+        """Return the transposition table used by the AI."""
+        return self._table
 
 class AlphaBetaPerfectAI(PerfectAI):
     """A Tic Tac Toe AI that plays perfectly and more quickly using the
-    minimax algorithm with alpha-beta pruning."""
+    minimax algorithm with alpha-beta pruning.
 
-    def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
-            return None
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                 for x in range(3)]
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if self._game.get_square(x, y) == None:
-                    legal.append((x, y))
-        me = self._game.get_turn()
-        best_score = -100
-        best_move = None
-        for x, y in legal:
-            new = self._game.make_move(board, x, y, me)
-            if me == "O":
-                other_player = "X"
-            else:
-                other_player = "O"
-            score = self._minimax_score(new, me, other_player, -100, 100)
-            if score > best_score:
-                best_score = score
-                best_move = (x, y)
-        return best_move
+    Passing a MoveOrdering (see ordering.py) changes the order moves
+    are searched in, and so how much is pruned, but not the moves the
+    AI plays. The ordering is kept between moves.
+    """
 
-    def _minimax_score(self, board: Board, me: str, turn: str, alpha: int, 
-                       beta: int) -> int:
-        """Return the minimax score for a given board state.
-        
-        Note that alpha is the minimum score 'me' is already assured 
-        of, and beta is the maximum score the other player is 
-        assured of.
-        """
-        winner = self._game.find_winner(board)
-        if winner == me:
-            return 10
-        elif winner != None:
-            return -10
-        elif self._game.board_full(board):
-            return 0
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if board[x][y] == None:
-                    legal.append((x, y))
-        if me == turn:
-            max_score = -100 # Equivalent to -infinity since min is -10
-            for x, y in legal:
-                new = self._game.make_move(board, x, y, turn)
-                if turn == "O":
-                    next_turn = "X"
-                else:
-                    next_turn = "O"
-                score = self._minimax_score(new, me, next_turn, alpha, beta)
-                max_score = max([max_score, score])
-                alpha = max([alpha, max_score])
-                if beta <= alpha:   # Beta <= alpha means if other player plays
-                    break           # optimally he can force me into a worse
-            board_score = max_score # score than my current minimum
-        else:
-            min_score = 100 # Equivalent to infinity since max is 10
-            for x, y in legal:
-                new = self._game.make_move(board, x, y, turn)
-                if turn == "O":
-                    next_turn = "X"
-                else:
-                    next_turn = "O"
-                score = self._minimax_score(new, me, next_turn, alpha, beta)
-                min_score = min([min_score, score])
-                beta = min([beta, min_score])
-                if beta <= alpha:
-                    break
-            board_score = min_score
-        return board_score
+    def __init__(self, game: TicTacToe, bitboard: bool = False,
+                 ordering: Optional[MoveOrdering] = None) -> None:
+        self._ordering = ordering
+        super().__init__(game, bitboard)
+
+    def _new_core(self) -> SearchCore:
+        """Return the search core used by the AI."""
+        return SearchCore(pruning=True, ordering=self._ordering)
 
 class QuickPerfectAI(CachePerfectAI):
     """A Tic Tac Toe AI that plays perfectly and more quickly using the
-    minimax algorithm with alpha-beta pruning and caching."""
+    minimax algorithm with alpha-beta pruning and caching.
 
-    def find_move(self) -> Option[Tuple[int, int]]:
-        return AlphaBetaPerfectAI.find_move(self)
-
-    def _minimax_score(self, board: Board, me: str, turn: str, alpha: int, 
-                       beta: int) -> int:
-        """Return the minimax score for a given board state."""
-        # Check cache to see if board's score has already been computed
-        cache_key = self._board_to_string(board, me, turn, alpha, beta)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        # Since not in cache, compute board's minimax score
-        board_score = AlphaBetaPerfectAI._minimax_score(self, board, me, turn,
-                                                        alpha, beta)
-        # Add board state to cache
-        self._cache[cache_key] = board_score
-        # Add board states with same score to cache
-        for b in self._same_score(board):
-            b_cache_key = self._board_to_string(board, me, turn, alpha, beta)
-            self._cache[b_cache_key] = board_score
-        return board_score
-    
-    def _board_to_string(self, board: Board, me: str, turn: str, alpha: int, 
-                         beta: int) -> str:
-        """Turn the board state into a unique string which can be used
-        as the key to our cache.
-        
-        Note that we must also factor in alpha and beta.
-        """
-        return super()._board_to_string(board, me, turn) + f"{alpha}|{beta}"
+    Each cached entry holds a score, whether that score is exact or
+    only a lower or upper bound on the true score (since alpha-beta
+    pruning may cut the search of a board short), and the best move
+    found. Entries are keyed by the board alone, so a board searched
+    with a different alpha and beta can still use its entry to narrow
+    the search window and to try the best move first.
+
+    Note that the table's entries are not the plain scores cached by
+    CachePerfectAI, so the two AIs cannot share a table.
+
+    As with AlphaBetaPerfectAI, a MoveOrdering can be passed to order
+    the moves searched after the cached best move.
+    """
+
+    def __init__(self, game: TicTacToe, bitboard: bool = False,
+                 table: Optional[TranspositionTable] = None,
+                 scores: Optional[ScoreCache] = None,
+                 ordering: Optional[MoveOrdering] = None) -> None:
+        self._ordering = ordering
+        super().__init__(game, bitboard, table, scores)
+
+    def _new_core(self) -> SearchCore:
+        """Return the search core used by the AI."""
+        return SearchCore(pruning=True, table=self._table,
+                          scores=self._scores, ordering=self._ordering)
 
 class UltimateAI(QuickPerfectAI):
     """The ultimate Tic Tac Toe AI. It differs from the QuickPerfectAI
@@ -407,105 +464,430 @@ class UltimateAI(QuickPerfectAI):
     """
 
     def find_move(self) -> Option[Tuple[int, int]]:
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                  for x in range(3)]
-        if self._game.board_full(board):
+        snapshot = self._game.get_snapshot()
+        legal = snapshot.get_empty()
+        if not legal: # Board is full
             return None
-        board = [[self._game.get_square(x, y) for y in range(3)] \
-                 for x in range(3)]
-        legal = []
-        for x in range(3):
-            for y in range(3):
-                if self._game.get_square(x, y) == None:
-                    legal.append((x, y))
-        me = self._game.get_turn()
+        self._core.set_position(*snapshot)
         best_score = (-100, -100)
         best_move = None
         for x, y in legal:
-            new = self._game.make_move(board, x, y, me)
-            if me == "O":
-                other_player = "X"
-            else:
-                other_player = "O"
-            score = self._better_score(new, me, other_player, -100, 100)
+            score = self._better_score(snapshot, x, y)
             if score > best_score:
                 best_score = score
                 best_move = (x, y)
         return best_move
 
-    def _better_score(self, board: Board, me: str, turn: str, alpha: int, 
-                      beta: int) -> Tuple[int, int]:
+    def _better_score(self, snapshot: Snapshot, x: int,
+                      y: int) -> Tuple[int, int]:
         """Return a tuple containing the minimax score and the score 
-        based on other factors."""
-        # Check cache to see if board's score has already been computed
-        cache_key = self._board_to_string(board, me, turn, alpha, beta)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-        # Since not in cache, compute board's score
-        score = (self._minimax_score(board, me, turn, alpha, beta),
-                 self._other_factors(board, me))
-        # Add board state to cache
-        self._cache[cache_key] = score
-        # Add board states with same score to cache
-        for b in self._same_score(board):
-            b_cache_key = self._board_to_string(board, me, turn, alpha, beta)
-            self._cache[b_cache_key] = score
-        return score
-
-    def _minimax_score(self, board: Board, me: str, turn: str, alpha: int, 
-                       beta: int) -> int:
-        """Return the minimax score for a given board state."""
-        return AlphaBetaPerfectAI._minimax_score(self, board, me, turn, alpha,
-                                                 beta)
-
-    def _other_factors(self, board: Board, me: str) -> int:
-        """Return the score for the board state based on other factors
-        such as number of corners occupied, etc."""
-        # One point for each corner occupied
-        corners = 0
-        for i in [0, 2]:
-            for j in [0, 2]:
-                if board[i][j] == me:
-                    corners += 1
-        # Three points for each instance of there being 2 pieces in a row
-        # without the third square being blocked
-        two_in_a_row = 0
-        for x in range(3):
-            me_in_column = 0
-            other_in_column = 0
-            for y in range(3):
-                if board[x][y] == me:
-                    me_in_column += 1
-                elif board[x][y] != None:
-                    other_in_column += 1
-            if me_in_column >= 2 and other_in_column == 0:
-                two_in_a_row += 1
-        for y in range(3):
-            me_in_row = 0
-            other_in_row = 0
-            for x in range(3):
-                if board[x][y] == me:
-                    me_in_row += 1
-                elif board[x][y] != None:
-                    other_in_row += 1
-            if me_in_row >= 2 and other_in_row == 0:
-                two_in_a_row += 1
-        for x, y in [(0,0), (1,1), (2,2)]:
-            me_in_diag = 0
-            other_in_diag = 0
-            if board[x][y] == me:
-                me_in_diag += 1
-            elif board[x][y] != None:
-                other_in_diag += 1
-            if me_in_diag >= 2 and other_in_diag == 0:
-                two_in_a_row += 1
-        for x, y in [(2,0), (1,1), (0,2)]:
-            me_in_diag = 0
-            other_in_diag = 0
-            if board[x][y] == me:
-                me_in_diag += 1
-            elif board[x][y] != None:
-                other_in_diag += 1
-            if me_in_diag >= 2 and other_in_diag == 0:
-                two_in_a_row += 1
-        return corners + 3*two_in_a_row
\ No newline at end of file
+        based on other factors of the player to move making the move
+        (x,y)."""
+        return (self._core.score_move(3*x + y),
+                _lookup_factors(snapshot.play(x, y).pieces, snapshot.turn))
+
+# The corner squares, numbered as in bitboard.py
+CORNERS = 0b101000101
+
+def other_factors(bits: Bits, me: str) -> int:
+    """Return the score UltimateAI gives a board for me besides its
+    minimax score: one point for each corner me holds and three for
+    each line holding two or three of me's pieces and none of the other
+    player's.
+
+    This is how the table UltimateAI looks scores up in is generated,
+    and so is the reference to test the table against.
+    """
+    mine, theirs = bits if me == "O" else (bits[1], bits[0])
+    corners = len(BITS_OF[mine & CORNERS])
+    two_in_a_row = 0
+    for line in LINES:
+        if len(BITS_OF[mine & line]) >= 2 and not theirs & line:
+            two_in_a_row += 1
+    return corners + 3*two_in_a_row
+
+# other_factors of every board for each player, indexed by the board's
+# base 3 index times two plus one if the player is X, built the first
+# time it is needed
+_factors = None
+
+def _lookup_factors(bits: Bits, me: str) -> int:
+    """Return other_factors of the bitboard for me from the table."""
+    if _factors == None:
+        _build_factors()
+    return _factors[position_index(bits) << 1 | (me == "X")]
+
+def _build_factors() -> None:
+    """Fill in the table of other_factors for every board."""
+    global _factors
+    factors = array("B", bytes(2 * 3**9))
+    for o in range(FULL + 1):
+        # Every set of squares X could hold alongside O's pieces
+        free = FULL & ~o
+        x = free
+        while True:
+            index = position_index((o, x)) << 1
+            factors[index] = other_factors((o, x), "O")
+            factors[index | 1] = other_factors((o, x), "X")
+            if x == 0:
+                break
+            x = (x - 1) & free
+    _factors = factors
+
+class TreeNode(ABC):
+    """A position in the search tree of a TreeSearchAI. Subclasses
+    hold the position in whatever form their game plays fastest in,
+    and say how a move is made from it.
+
+    Public Methods:
+    - add_child(move: int) -> TreeNode
+    """
+
+    def __init__(self, position, turn: int, parent: Optional[TreeNode],
+                 move: Optional[int], won: bool,
+                 moves: List[int]) -> None:
+        """Initialise a node for the position reached by the move, with
+        the moves that can be made from it unless that move won."""
+        self.position = position
+        self.turn = turn # 0 if it is O's turn, 1 if it is X's
+        self.parent = parent
+        self.move = move # Move leading here
+        self.won = won # Whether that move won the game
+        self.untried = [] if won else moves
+        self.over = won or not moves
+        self.children: List[TreeNode] = []
+        self.visits = 0
+        # Points scored by the player who moved here: 1 per win and 0.5
+        # per draw
+        self.points = 0.0
+
+    def add_child(self, move: int) -> TreeNode:
+        """Expand the move and return the new child."""
+        self.untried.remove(move)
+        child = self._play(move)
+        self.children.append(child)
+        return child
+
+    @abstractmethod
+    def _play(self, move: int) -> TreeNode:
+        """Return the node reached by making the move."""
+        pass
+
+class TreeSearchAI(TicTacToeAI):
+    """The base of the AIs that use Monte Carlo tree search: they play
+    many random games, steering them towards the moves that have done
+    best so far with the UCT formula, and play the move they tried the
+    most unless a move wins at once.
+
+    The search stops after a number of random games (rollouts) or, if
+    a time limit is given, when time runs out, so it can play within
+    any time limit. The tree is kept between moves, so the search of
+    the position reached after the opponent replies carries on from
+    the earlier searches.
+
+    Subclasses give the position to search, the nodes of the tree (see
+    TreeNode) and the random games played from them.
+
+    A seeded stream (see set_rng) only makes the moves reproducible when
+    the search is limited by rollouts, as a time limit lets the speed of
+    the machine decide how many are played.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - set_rng(rng: random.Random) -> None
+    - get_visits() -> Dict[Tuple[int, int], int]
+    """
+
+    def __init__(self, game: BoardGame, rollouts: int = 2000,
+                 time_limit: Optional[float] = None,
+                 exploration: float = math.sqrt(2),
+                 rng: Optional[random.Random] = None) -> None:
+        """Initialise an AI which plays the specified number of
+        rollouts per move, or searches for time_limit seconds if it is
+        given."""
+        super().__init__(game, rng=rng)
+        self._rollouts = rollouts
+        self._time_limit = time_limit
+        self._exploration = exploration
+        self._root = None
+
+    def set_rng(self, rng: random.Random) -> None:
+        super().set_rng(rng)
+        self._root = None # The tree was grown from the old rng
+
+    def get_visits(self) -> Dict[Tuple[int, int], int]:
+        """Return how many rollouts went through each move in the
+        position searched by the last call to find_move."""
+        if self._root == None:
+            return {}
+        return {self._to_square(child.move): child.visits
+                for child in self._root.children}
+
+    def find_move(self) -> Option[Tuple[int, int]]:
+        self._root = self._find_root(*self._get_position())
+        if self._root.over:
+            return None
+        if self._time_limit != None:
+            deadline = time.perf_counter() + self._time_limit
+            while True:
+                self._search()
+                if time.perf_counter() > deadline:
+                    break
+        else:
+            for i in range(self._passes()):
+                self._search()
+        # A move that wins the game outright is always played, since
+        # when every move is likely to win the visits barely differ
+        best = max(self._root.children,
+                   key=lambda child: (child.won, child.visits))
+        return self._to_square(best.move)
+
+    @abstractmethod
+    def _get_position(self) -> Tuple[object, int]:
+        """Return the game's position, in the form the nodes hold it,
+        and whose turn it is."""
+        pass
+
+    @abstractmethod
+    def _new_node(self, position, turn: int) -> TreeNode:
+        """Return a node with no parent for the position."""
+        pass
+
+    @abstractmethod
+    def _to_square(self, move: int) -> Tuple[int, int]:
+        """Return the (x,y) square a move is made on."""
+        pass
+
+    @abstractmethod
+    def _rollout(self, node: TreeNode) -> float:
+        """Play random moves from the node's position to the end of the
+        game and return the points scored by the player who moved into
+        the node."""
+        pass
+
+    def _passes(self) -> int:
+        """Return the number of passes of the search that play the
+        rollouts."""
+        return self._rollouts
+
+    def _playout(self, node: TreeNode) -> Tuple[int, float]:
+        """Score the node by playing out the rest of the game from it,
+        and return the number of games played and the points scored in
+        them by the player who moved into the node."""
+        if node.won:
+            return 1, 1.0
+        if node.over:
+            return 1, 0.5
+        return 1, self._rollout(node)
+
+    def _find_root(self, position, turn: int) -> TreeNode:
+        """Return the node for the position from the tree kept from the
+        last search if it is there; otherwise, return a new tree."""
+        if self._root != None:
+            # The position is usually two moves on from the last one
+            nodes = [self._root]
+            for depth in range(3):
+                for node in nodes:
+                    if node.position == position and node.turn == turn:
+                        node.parent = None # Let the rest of the tree go
+                        return node
+                nodes = [child for node in nodes for child in node.children]
+        return self._new_node(position, turn)
+
+    def _count_with(self, counters: SearchCounters) -> None:
+        self._search = self._search_counted
+
+    def _search_counted(self) -> TreeNode:
+        """Carry out one pass of the search as _search does, counting
+        it as a node along with the depth it reached."""
+        leaf = TreeSearchAI._search(self)
+        self._counters.nodes += 1
+        depth = 0
+        node = leaf
+        while node != self._root:
+            depth += 1
+            node = node.parent
+        if depth > self._counters.max_depth:
+            self._counters.max_depth = depth
+        return leaf
+
+    def _search(self) -> TreeNode:
+        """Carry out one pass of selection, expansion, simulation and
+        backpropagation, and return the node played out from."""
+        node = self._root
+        # Select a path down the tree until a move hasn't been tried
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children,
+                       key=lambda child: child.points / child.visits
+                       + self._exploration
+                       * math.sqrt(log_visits / child.visits))
+        # Expand one of the untried moves
+        if node.untried:
+            node = node.add_child(self._rng.choice(node.untried))
+        visits, points = self._playout(node)
+        # Pass the results back up the tree, switching perspective at
+        # each level
+        leaf = node
+        while node != None:
+            node.visits += visits
+            node.points += points
+            points = visits - points
+            node = node.parent
+        return leaf
+
+class _Node(TreeNode):
+    """A position in the search tree of MCTSAI, held as a bitboard with
+    moves numbered by square (see bitboard.py)."""
+
+    def __init__(self, bits: Bits, turn: int, parent: Optional[_Node],
+                 square: Optional[int], won: bool) -> None:
+        super().__init__(bits, turn, parent, square, won,
+                         list(BITS_OF[FULL & ~(bits[0] | bits[1])]))
+
+    def _play(self, square: int) -> _Node:
+        pieces = list(self.position)
+        pieces[self.turn] |= 1 << square
+        won = any(pieces[self.turn] & line == line
+                  for line in LINES_THROUGH[square])
+        return _Node((pieces[0], pieces[1]), self.turn ^ 1, self, square,
+                     won)
+
+class MCTSAI(TreeSearchAI):
+    """A Tic Tac Toe AI that uses Monte Carlo tree search (see
+    TreeSearchAI), playing its random games on bitboards.
+
+    With batch greater than 1, each new position in the tree is scored
+    by playing batch random games from it at once with NumPy (see
+    simulator.py), which needs far fewer trips around the tree.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - set_rng(rng: random.Random) -> None
+    - get_visits() -> Dict[Tuple[int, int], int]
+    """
+
+    SNAPSHOTS = True
+
+    def __init__(self, game: TicTacToe, rollouts: int = 2000,
+                 time_limit: Optional[float] = None,
+                 exploration: float = math.sqrt(2),
+                 batch: int = 1,
+                 rng: Optional[random.Random] = None) -> None:
+        """Initialise an AI which plays the specified number of
+        rollouts per move, or searches for time_limit seconds if it is
+        given."""
+        super().__init__(game, rollouts, time_limit, exploration, rng)
+        self._batch = batch
+        self._simulator = None
+        self._new_simulator()
+
+    def set_rng(self, rng: random.Random) -> None:
+        super().set_rng(rng)
+        # The simulator's stream was drawn from the old rng too
+        self._new_simulator()
+
+    def _new_simulator(self) -> None:
+        """Give a batched AI a simulator seeded from its stream."""
+        if self._batch > 1:
+            # NumPy is only needed for batches so only import it then
+            from simulator import LockstepSimulator
+            self._simulator = LockstepSimulator(
+                "random", "random", self._rng.getrandbits(64), self._batch)
+
+    def _get_position(self) -> Tuple[Bits, int]:
+        bits, turn = self._game.get_snapshot()
+        return bits, 0 if turn == "O" else 1
+
+    def _new_node(self, bits: Bits, turn: int) -> _Node:
+        won = any(bits[0] & line == line or bits[1] & line == line
+                  for line in LINES)
+        return _Node(bits, turn, None, None, won)
+
+    def _to_square(self, square: int) -> Tuple[int, int]:
+        return SQUARES[square]
+
+    def _passes(self) -> int:
+        return max(self._rollouts // self._batch, 1)
+
+    def _playout(self, node: _Node) -> Tuple[int, float]:
+        if self._simulator == None:
+            return super()._playout(node)
+        if node.won:
+            return self._batch, float(self._batch)
+        wins = self._simulator.play_from(node.position, "OX"[node.turn],
+                                         self._batch)
+        return self._batch, wins[node.turn ^ 1] + wins[2]/2
+
+    def _rollout(self, node: _Node) -> float:
+        pieces = list(node.position)
+        turn = node.turn
+        empty = FULL & ~(pieces[0] | pieces[1])
+        while empty:
+            square = self._rng.choice(BITS_OF[empty])
+            pieces[turn] |= 1 << square
+            empty ^= 1 << square
+            for line in LINES_THROUGH[square]:
+                if pieces[turn] & line == line:
+                    return 0.0 if turn == node.turn else 1.0
+            turn ^= 1
+        return 0.5
+
+class LearnedAI(TicTacToeAI):
+    """A Tic Tac Toe AI that plays the move leading to the position
+    with the highest value in a table learned by self-play (see
+    learner.py), without searching.
+
+    The table is loaded from disk the first time it is needed and is
+    shared between all AIs using the same path.
+    """
+
+    SNAPSHOTS = True
+
+    def __init__(self, game: TicTacToe, bitboard: bool = False,
+                 path: str = DEFAULT_VALUES) -> None:
+        super().__init__(game, bitboard)
+        self._path = path
+
+    def find_move(self) -> Option[Tuple[int, int]]:
+        snapshot = self._game.get_snapshot()
+        legal = snapshot.get_empty()
+        if not legal: # Board is full
+            return None
+        values = get_values(self._path)
+        return max(legal, key=lambda move:
+                   values.get(snapshot.play(*move).pieces))
+
+# The AIs that can be chosen by name, from weakest to strongest
+AIS = {"random": RandomAI,
+       "winning": WinningAI,
+       "winning-losing": WinningLosingAI,
+       "mcts": MCTSAI,
+       "learned": LearnedAI,
+       "perfect": PerfectAI,
+       "solved": SolvedAI,
+       "cache-perfect": CachePerfectAI,
+       "alpha-beta": AlphaBetaPerfectAI,
+       "quick-perfect": QuickPerfectAI,
+       "ultimate": UltimateAI}
+
+def create_ai(name: str, game: TicTacToe, 
+              tables: Dict[str, TranspositionTable],
+              scores: Optional[ScoreCache] = None) -> TicTacToeAI:
+    """Create the AI with the specified name for the game.
+
+    AIs that cache scores use the table stored under their name in
+    tables (adding one if there isn't one yet), so that every AI of
+    the same kind created with the same tables shares its cache. They
+    also look scores up in the score cache, if one is specified.
+    """
+    if name not in AIS:
+        raise ValueError(f"Invalid AI specified.\nPlease choose from one of "
+                         + "the following options:\n" 
+                         + "\n".join(f"- {ai}" for ai in AIS))
+    ai = AIS[name]
+    if issubclass(ai, CachePerfectAI):
+        if name not in tables:
+            tables[name] = TranspositionTable()
+        return ai(game, table=tables[name], scores=scores)
+    return ai(game)
@@ -0,0 +1,264 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from bitboard import Bits, canonical_index
+
+"""This module contains the transposition table used by the caching
+Tic Tac Toe AIs.
+
+Classes:
+- TranspositionTable
+- LRUTable
+- DepthPreferredTable
+
+Functions:
+- new_table(policy: str = "unbounded", entries: Optional[int] = None,
+  size: Optional[int] = None) -> TranspositionTable
+"""
+
+# Kinds of bound a score found by an alpha-beta search can be
+EXACT = 0 # The score is the board's minimax score
+LOWER = 1 # The minimax score is at least the score
+UPPER = 2 # The minimax score is at most the score
+
+class TranspositionTable:
+    """A cache of search results keyed by position.
+
+    Positions that are rotations or mirrors of each other share a
+    key, so a result found for one position is reused for all of its
+    symmetries. A table may be shared by any number of AIs and kept
+    across games.
+
+    The table keeps every entry it is given. LRUTable and
+    DepthPreferredTable are drop-in replacements which hold at most a
+    set number of entries, for searches too big to cache in full.
+
+    Public Methods:
+    - key(bits: Bits, turn: str) -> int
+    - get(key: int) -> Optional[Any]
+    - put(key: int, value: Any, depth: int = 0) -> None
+    - clear() -> None
+    - get_hits() -> int
+    - get_misses() -> int
+    - get_inserts() -> int
+    - get_evictions() -> int
+    - get_hit_rate() -> float
+    - get_capacity() -> Optional[int]
+    - __len__() -> int
+    """
+
+    # Rough memory used by each entry, in bytes, as measured with
+    # tracemalloc for integer keys and tuples of a few small values
+    ENTRY_BYTES = 200
+
+    def __init__(self) -> None:
+        """Initialise an empty transposition table."""
+        self._entries: Dict[int, Any] = {}
+        self._hits = 0
+        self._misses = 0
+        self._inserts = 0
+        self._evictions = 0
+
+    def key(self, bits: Bits, turn: str) -> int:
+        """Return the key for a position when it is turn's move."""
+        return canonical_index(bits) << 1 | (turn == "X")
+
+    def get(self, key: int) -> Optional[Any]:
+        """Return the value stored for the key, or None if there isn't
+        one."""
+        value = self._entries.get(key)
+        if value == None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return value
+
+    def put(self, key: int, value: Any, depth: int = 0) -> None:
+        """Store a value for the key, found by a search depth moves
+        deep (which tables that must evict entries use to decide what
+        to keep)."""
+        self._entries[key] = value
+        self._inserts += 1
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+        self._inserts = 0
+        self._evictions = 0
+
+    def get_hits(self) -> int:
+        """Return the number of lookups that found a value."""
+        return self._hits
+
+    def get_misses(self) -> int:
+        """Return the number of lookups that didn't find a value."""
+        return self._misses
+
+    def get_inserts(self) -> int:
+        """Return the number of values that have been stored."""
+        return self._inserts
+
+    def get_evictions(self) -> int:
+        """Return the number of entries removed to make room for
+        others."""
+        return self._evictions
+
+    def get_hit_rate(self) -> float:
+        """Return the fraction of lookups that found a value."""
+        return self._hits / max(self._hits + self._misses, 1)
+
+    def get_capacity(self) -> Optional[int]:
+        """Return the most entries the table holds, or None if there
+        is no limit."""
+        return None
+
+    def __len__(self) -> int:
+        """Return the number of entries in the table."""
+        return len(self._entries)
+
+def _capacity(cls: type, entries: Optional[int],
+              size: Optional[int]) -> int:
+    """Return the number of entries a table of the class may hold to
+    keep within entries and within size bytes."""
+    if entries == None and size == None:
+        raise ValueError("Either entries or size must be specified.")
+    capacity = entries
+    if size != None:
+        by_size = size // cls.ENTRY_BYTES
+        capacity = by_size if capacity == None else min(capacity, by_size)
+    if capacity < 1:
+        raise ValueError("Table must hold at least one entry.")
+    return capacity
+
+class LRUTable(TranspositionTable):
+    """A transposition table holding at most a set number of entries,
+    which evicts the least recently used entry to make room for a new
+    one.
+
+    The limit is given as a number of entries, a size in bytes (which
+    is converted using ENTRY_BYTES), or both, in which case the smaller
+    limit applies.
+    """
+
+    ENTRY_BYTES = 250
+
+    def __init__(self, entries: Optional[int] = None,
+                 size: Optional[int] = None) -> None:
+        """Initialise an empty table within the specified limits."""
+        super().__init__()
+        self._entries: OrderedDict[int, Any] = OrderedDict()
+        self._capacity = _capacity(type(self), entries, size)
+
+    def get(self, key: int) -> Optional[Any]:
+        value = super().get(key)
+        if value != None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: int, value: Any, depth: int = 0) -> None:
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self._capacity:
+            entries.popitem(last=False)
+            self._evictions += 1
+        entries[key] = value
+        self._inserts += 1
+
+    def get_capacity(self) -> Optional[int]:
+        return self._capacity
+
+class DepthPreferredTable(TranspositionTable):
+    """A transposition table of fixed size in the style of chess
+    engines, where each key can only be stored in one bucket of two
+    slots.
+
+    The first slot of a bucket keeps the entry found by the deepest
+    search, since it saves the most work, and the second slot is
+    always replaced, so that recent entries are kept too. An entry at
+    least as deep as the first slot's takes its place and moves the
+    entry there into the second slot; any other entry goes into the
+    second slot.
+
+    The limit is given as for LRUTable; the table is split into
+    buckets when it is created, so it never grows beyond its limit.
+    """
+
+    ENTRY_BYTES = 170
+
+    def __init__(self, entries: Optional[int] = None,
+                 size: Optional[int] = None) -> None:
+        """Initialise an empty table within the specified limits."""
+        super().__init__()
+        self._buckets = max(_capacity(type(self), entries, size) // 2, 1)
+        # Slot 2*i is bucket i's deep slot and 2*i + 1 its other slot
+        self._keys: List[Optional[int]] = [None] * (2 * self._buckets)
+        self._values: List[Any] = [None] * (2 * self._buckets)
+        self._depths = [0] * (2 * self._buckets)
+
+    def get(self, key: int) -> Optional[Any]:
+        deep = 2 * (key % self._buckets)
+        keys = self._keys
+        if keys[deep] == key:
+            self._hits += 1
+            return self._values[deep]
+        if keys[deep + 1] == key:
+            self._hits += 1
+            return self._values[deep + 1]
+        self._misses += 1
+        return None
+
+    def put(self, key: int, value: Any, depth: int = 0) -> None:
+        deep = 2 * (key % self._buckets)
+        keys = self._keys
+        self._inserts += 1
+        if keys[deep] in (None, key) or depth >= self._depths[deep]:
+            if keys[deep] not in (None, key):
+                # Move the entry down to the other slot
+                if keys[deep + 1] not in (None, key):
+                    self._evictions += 1
+                self._set(deep + 1, keys[deep], self._values[deep],
+                          self._depths[deep])
+            elif keys[deep + 1] == key: # Drop the older entry
+                self._set(deep + 1, None, None, 0)
+            self._set(deep, key, value, depth)
+        else:
+            if keys[deep + 1] not in (None, key):
+                self._evictions += 1
+            self._set(deep + 1, key, value, depth)
+
+    def clear(self) -> None:
+        super().clear()
+        self._keys = [None] * (2 * self._buckets)
+        self._values = [None] * (2 * self._buckets)
+        self._depths = [0] * (2 * self._buckets)
+
+    def get_capacity(self) -> Optional[int]:
+        return 2 * self._buckets
+
+    def __len__(self) -> int:
+        return len(self._keys) - self._keys.count(None)
+
+    def _set(self, slot: int, key: Optional[int], value: Any,
+             depth: int) -> None:
+        """Store the entry in the slot."""
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+
+# The kinds of table, by the name of the policy they follow
+POLICIES = {"unbounded": TranspositionTable, "lru": LRUTable,
+            "depth": DepthPreferredTable}
+
+def new_table(policy: str = "unbounded", entries: Optional[int] = None,
+              size: Optional[int] = None) -> TranspositionTable:
+    """Return an empty table following the named policy, within the
+    specified limits on its entries and its size in bytes (which are
+    ignored if the policy is unbounded)."""
+    if policy not in POLICIES:
+        raise ValueError(f"Invalid table policy {policy} specified.")
+    if policy == "unbounded":
+        return TranspositionTable()
+    return POLICIES[policy](entries, size)
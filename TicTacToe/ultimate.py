@@ -0,0 +1,331 @@
+from __future__ import annotations
+import argparse
+from typing import List, NamedTuple, Optional, Tuple
+
+from bitboard import Bits, BITS_OF, FULL, LINES
+from tictactoe import BoardGame
+from tictactoe_ai import (RandomAI, TreeNode, TreeSearchAI, WinningAI,
+                          WinningLosingAI)
+
+"""This module contains Ultimate Tic Tac Toe, played on nine Tic Tac
+Toe boards arranged in a 3x3 meta-board, along with an AI that can play
+it within a time limit, as well as code for running the program from
+the command line.
+
+A move is made on one of the small boards, and sends the other player
+to the small board in the same position on the meta-board as the
+square played. Winning a small board claims its square on the
+meta-board and the game is won with three small boards in a row. Once
+a small board is won or full nobody can play there, and a player sent
+there may play on any board still open.
+
+Classes:
+- UltimateState
+- UltimateTicTacToe
+- UltimateMCTSAI
+
+Functions:
+- legal_moves(state: UltimateState) -> List[int]
+- play(state: UltimateState, move: int, turn: int) -> UltimateState
+- perft(state: UltimateState, turn: int, depth: int) -> int
+"""
+
+# Type aliases
+Piece = Optional[str]
+Move = Tuple[int, int]
+
+ANY = -1 # Forced board index when any open board may be played
+
+# Whether the pieces of a player, as a 9-bit mask, contain a line
+_WON = tuple(any(mask & line == line for line in LINES)
+             for mask in range(FULL + 1))
+
+class UltimateState(NamedTuple):
+    """An immutable position of Ultimate Tic Tac Toe.
+
+    Small board b is the one in the (b // 3, b % 3) square of the
+    meta-board and holds its pieces as a bitboard (see bitboard.py),
+    so a move is numbered 9*b + s where s is the square on the small
+    board. On the whole 9x9 board the move is the
+    (3*(b // 3) + s // 3, 3*(b % 3) + s % 3) square.
+    """
+
+    boards: Tuple[Bits, ...] # Bitboard of each small board
+    meta: Bits # Small boards won by O and by X, as a bitboard
+    closed: int # Mask of the small boards which are won or full
+    forced: int # Small board the next move must be made on, or ANY
+
+EMPTY_STATE = UltimateState(((0, 0),) * 9, (0, 0), 0, ANY)
+
+def _to_square(move: int) -> Move:
+    """Return the (x,y) square of the 9x9 board a move is made on."""
+    b, s = divmod(move, 9)
+    return (3*(b // 3) + s // 3, 3*(b % 3) + s % 3)
+
+def _to_move(x: int, y: int) -> int:
+    """Return the move made on the (x,y) square of the 9x9 board."""
+    return 9*(3*(x // 3) + y // 3) + 3*(x % 3) + y % 3
+
+def legal_moves(state: UltimateState) -> List[int]:
+    """Return the moves that can be made in the state, in ascending
+    order, whether or not the game is over."""
+    if state.forced == ANY:
+        boards = BITS_OF[FULL & ~state.closed]
+    else:
+        boards = (state.forced,)
+    moves = []
+    for b in boards:
+        o, x = state.boards[b]
+        moves.extend(9*b + s for s in BITS_OF[FULL & ~(o | x)])
+    return moves
+
+def play(state: UltimateState, move: int, turn: int) -> UltimateState:
+    """Return the state after the move is made by the player whose
+    turn it is (0 for O and 1 for X). The move must be legal."""
+    b, s = divmod(move, 9)
+    pieces = list(state.boards[b])
+    pieces[turn] |= 1 << s
+    boards = state.boards[:b] + ((pieces[0], pieces[1]),) \
+        + state.boards[b + 1:]
+    meta = state.meta
+    closed = state.closed
+    if _WON[pieces[turn]]:
+        meta = list(meta)
+        meta[turn] |= 1 << b
+        meta = (meta[0], meta[1])
+        closed |= 1 << b
+    elif pieces[0] | pieces[1] == FULL:
+        closed |= 1 << b
+    return UltimateState(boards, meta, closed,
+                         ANY if closed >> s & 1 else s)
+
+def perft(state: UltimateState, turn: int, depth: int) -> int:
+    """Return the number of sequences of depth moves that can be made
+    from the state, stopping at games which are over, to test and time
+    the move generator."""
+    if depth == 0:
+        return 1
+    if _WON[state.meta[turn ^ 1]] or state.closed == FULL:
+        return 0
+    moves = legal_moves(state)
+    if depth == 1:
+        return len(moves)
+    return sum(perft(play(state, move, turn), turn ^ 1, depth - 1)
+               for move in moves)
+
+class UltimateTicTacToe(BoardGame):
+    """This is a class for Ultimate Tic Tac Toe. The board is an
+    UltimateState rather than a matrix, since whose move it is isn't
+    all that decides where the next move may be made, and the squares
+    are addressed as (x,y) on the whole 9x9 board.
+
+    It has the same methods as BoardGame, so that games can be played
+    and AIs tested in the same way, and the board methods are what
+    the AIs using the game's own board (RandomAI, WinningAI and
+    WinningLosingAI) need to play it.
+    """
+
+    def _new_board(self) -> UltimateState:
+        """Return the state at the start of a game."""
+        return EMPTY_STATE
+
+    def get_width(self) -> int:
+        """Return the number of columns of the board."""
+        return 9
+
+    def get_height(self) -> int:
+        """Return the number of rows of the board."""
+        return 9
+
+    def get_square(self, x: int, y: int) -> Piece:
+        """Return the piece in the (x,y) square."""
+        b, s = divmod(_to_move(x, y), 9)
+        pieces = self._board.boards[b]
+        if pieces[0] >> s & 1:
+            return "O"
+        if pieces[1] >> s & 1:
+            return "X"
+        return None
+
+    def set_square(self, x: int, y: int, piece: Piece) -> None:
+        """Set the (x,y) square to the specified piece. The board to
+        play on next is left as it is."""
+        if not (piece == None or piece == "X" or piece == "O"):
+            if isinstance(piece, str):
+                raise ValueError("Invalid piece specified.")
+            else:
+                raise TypeError()
+        b, s = divmod(_to_move(x, y), 9)
+        state = self._board
+        pieces = [mask & ~(1 << s) for mask in state.boards[b]]
+        if piece != None:
+            pieces[piece == "X"] |= 1 << s
+        boards = list(state.boards)
+        boards[b] = (pieces[0], pieces[1])
+        meta = [mask & ~(1 << b) for mask in state.meta]
+        closed = state.closed & ~(1 << b)
+        for turn in (0, 1):
+            if _WON[pieces[turn]]:
+                meta[turn] |= 1 << b
+                closed |= 1 << b
+        if pieces[0] | pieces[1] == FULL:
+            closed |= 1 << b
+        self._board = UltimateState(tuple(boards), (meta[0], meta[1]),
+                                    closed, state.forced)
+
+    def get_board(self) -> UltimateState:
+        """Return the state of the game. It is immutable so it isn't
+        copied."""
+        return self._board
+
+    def make_move(self, board: UltimateState, x: int, y: int,
+                  turn: str) -> UltimateState:
+        """If the specified move is valid in the specified state,
+        return the state after that move is made; otherwise return an
+        empty list."""
+        if not (0 <= x <= 8 and 0 <= y <= 8):
+            return []
+        move = _to_move(x, y)
+        b, s = divmod(move, 9)
+        if board.closed >> b & 1 or board.forced not in (ANY, b):
+            return []
+        if (board.boards[b][0] | board.boards[b][1]) >> s & 1:
+            return []
+        return play(board, move, 0 if turn == "O" else 1)
+
+    def find_winner(self, board: UltimateState) -> Optional[str]:
+        """If there is a winner return one; otherwise, return None."""
+        if _WON[board.meta[0]]:
+            return "O"
+        if _WON[board.meta[1]]:
+            return "X"
+        return None
+
+    def board_full(self, board: UltimateState) -> bool:
+        """Return whether every small board is won or full."""
+        return board.closed == FULL
+
+    def legal_moves(self, board: UltimateState) -> List[Move]:
+        """Return the squares the next move may be made on."""
+        return [_to_square(move) for move in legal_moves(board)]
+
+    def _print(self) -> None:
+        """Print the board, with the small boards that may be played
+        on next marked with a *."""
+        state = self._board
+        playable = ({state.forced} if state.forced != ANY
+                    else set(BITS_OF[FULL & ~state.closed]))
+        # Each small board is three columns wide plus a second border
+        print("    " + " ".join("".join(f"{x:^4}" for x in range(b, b + 3))
+                                for b in range(0, 9, 3)))
+        print("   +" + ("---+"*3 + "+")*3)
+        for y in range(9):
+            row_print = f" {y} |"
+            for x in range(9):
+                piece = self.get_square(x, y)
+                b = 3*(x // 3) + y // 3
+                mark = "*" if b in playable and piece == None else " "
+                row_print += f" {piece or mark} |"
+                if x % 3 == 2:
+                    row_print += "|"
+            print(row_print)
+            print("   +" + ("---+"*3 + "+")*3)
+
+class _UltimateNode(TreeNode):
+    """A position in the search tree of UltimateMCTSAI."""
+
+    def __init__(self, state: UltimateState, turn: int,
+                 parent: Optional[_UltimateNode],
+                 move: Optional[int]) -> None:
+        super().__init__(state, turn, parent, move,
+                         _WON[state.meta[turn ^ 1]], legal_moves(state))
+
+    def _play(self, move: int) -> _UltimateNode:
+        return _UltimateNode(play(self.position, move, self.turn),
+                             self.turn ^ 1, self, move)
+
+class UltimateMCTSAI(TreeSearchAI):
+    """An Ultimate Tic Tac Toe AI that uses Monte Carlo tree search in
+    the same way as MCTSAI does for Tic Tac Toe (see TreeSearchAI).
+    The random games are played on plain lists of 9-bit masks, so that
+    each move costs a few integer operations.
+
+    Public Methods:
+    - find_move() -> Option[Tuple[int, int]]
+    - set_rng(rng: random.Random) -> None
+    - get_visits() -> Dict[Tuple[int, int], int]
+    """
+
+    def _get_position(self) -> Tuple[UltimateState, int]:
+        return (self._game.get_board(),
+                0 if self._game.get_turn() == "O" else 1)
+
+    def _new_node(self, state: UltimateState, turn: int) -> _UltimateNode:
+        return _UltimateNode(state, turn, None, None)
+
+    def _to_square(self, move: int) -> Move:
+        return _to_square(move)
+
+    def _rollout(self, node: _UltimateNode) -> float:
+        state = node.position
+        pieces = [[o for o, x in state.boards], [x for o, x in state.boards]]
+        meta = list(state.meta)
+        closed = state.closed
+        forced = state.forced
+        turn = node.turn
+        while True:
+            if forced == ANY:
+                b, s = divmod(self._rng.choice(
+                    [9*b + s for b in BITS_OF[FULL & ~closed]
+                     for s in BITS_OF[FULL & ~(pieces[0][b]
+                                               | pieces[1][b])]]), 9)
+            else:
+                b = forced
+                s = self._rng.choice(
+                    BITS_OF[FULL & ~(pieces[0][b] | pieces[1][b])])
+            mine = pieces[turn]
+            mine[b] |= 1 << s
+            if _WON[mine[b]]:
+                meta[turn] |= 1 << b
+                closed |= 1 << b
+                if _WON[meta[turn]]:
+                    return 0.0 if turn == node.turn else 1.0
+            elif pieces[0][b] | pieces[1][b] == FULL:
+                closed |= 1 << b
+            if closed == FULL:
+                return 0.5
+            forced = ANY if closed >> s & 1 else s
+            turn ^= 1
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Play Ultimate Tic Tac Toe on nine boards at once.")
+    parser.add_argument("-time", type=float, default=1.0,
+                        help="seconds the mcts AI may take per move")
+    parser.add_argument("-test", type=int, default=0, metavar="GAMES",
+                        help="play GAMES games between two AIs")
+    parser.add_argument("-workers", type=int, default=1,
+                        help="number of processes to run tests with")
+    parser.add_argument("-seed", type=int, default=None,
+                        help="seed for reproducible tests")
+    args = parser.parse_args()
+
+    game = UltimateTicTacToe()
+    players = {"random": RandomAI, "winning": WinningAI,
+               "winning-losing": WinningLosingAI, "mcts": UltimateMCTSAI}
+    for piece in ["O", "X"]:
+        player = input(f"Who would you like to have play as {piece}?: ")
+        if player == "mcts":
+            game.load(UltimateMCTSAI(game, time_limit=args.time), piece)
+        elif player in players:
+            game.load(players[player](game), piece)
+        elif player != "human":
+            raise ValueError(f"Invalid player for {piece} has been specified."
+                             + "\nPlease choose from one of the following "
+                             + "options:\n"
+                             + "".join(f"- {ai}\n" for ai in players)
+                             + "- human")
+    if args.test:
+        game.test(args.test, args.workers, args.seed)
+    else:
+        game.play()